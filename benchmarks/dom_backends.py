@@ -0,0 +1,113 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Compares the DOM backends (and BeautifulSoup parsers) on parsing, selector generation and selector queries.
+Also checks that all backends agree on the generated selectors and on the query results.
+
+Run on a synthetic page with ``python -m benchmarks.dom_backends --elements 20000``, or on a saved snapshot
+(see :func:`PageSnapshot.save`) with ``python -m benchmarks.dom_backends --snapshot path/to/snapshot``.
+"""
+
+import argparse
+import random
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, Tuple
+
+import bs4
+
+from webtraversallibrary.dom import BeautifulSoupBackend, DomBackend, LxmlBackend
+from webtraversallibrary.selector import Selector
+
+QUERIES = ["div", "div > p", "a[href]", "ul li:nth-of-type(2)", "div.c1 span", "body > *"]
+TAGS = ["div", "p", "span", "a", "ul", "li"]
+
+
+def synthetic_page(num_elements: int, seed: int = 0) -> str:
+    """Returns the HTML of a random page with roughly the given number of elements, all with a wtl-uid."""
+    rng = random.Random(seed)
+    soup = bs4.BeautifulSoup("<html><head></head><body></body></html>", "html.parser")
+    parents = [soup.body]
+    for _ in range(num_elements):
+        tag = soup.new_tag(rng.choice(TAGS), attrs={"class": f"c{rng.randrange(5)}"})
+        if tag.name == "a":
+            tag["href"] = "#"
+        tag.string = "text" if rng.random() < 0.3 else ""
+        rng.choice(parents[-50:]).append(tag)
+        parents.append(tag)
+    for wtl_uid, tag in enumerate(soup.find_all(True), start=1):
+        tag["wtl-uid"] = str(wtl_uid)
+    return str(soup)
+
+
+def timed(func: Callable):
+    start = perf_counter()
+    result = func()
+    return result, 1000 * (perf_counter() - start)
+
+
+def run(html: str) -> Dict[str, Tuple[DomBackend, Dict[int, Selector]]]:
+    """Prints timings for each backend and returns the backends along with their selectors."""
+    factories = {
+        "bs4/html5lib": lambda: BeautifulSoupBackend(bs4.BeautifulSoup(html, "html5lib")),
+        "bs4/html.parser": lambda: BeautifulSoupBackend(bs4.BeautifulSoup(html, "html.parser")),
+        "lxml": lambda: LxmlBackend(html),
+    }
+
+    results = {}
+    print(f"{'backend':<16}{'parse':>10}{'selectors':>12}{'queries':>10}{'subtrees':>10}   (ms)")
+    for name, factory in factories.items():
+        dom, parse_ms = timed(factory)
+        selectors, selectors_ms = timed(dom.selectors)
+        _, query_ms = timed(lambda: [dom.query(Selector(css)) for css in QUERIES])  # pylint: disable=cell-var-from-loop
+        uids = list(selectors)[:: max(1, len(selectors) // 100)]
+        _, subtree_ms = timed(lambda: [dom.subtree_uids(uid) for uid in uids])  # pylint: disable=cell-var-from-loop
+        print(f"{name:<16}{parse_ms:>10.1f}{selectors_ms:>12.1f}{query_ms:>10.1f}{subtree_ms:>10.1f}")
+        results[name] = (dom, selectors)
+    return results
+
+
+def check(results: Dict[str, Tuple[DomBackend, Dict[int, Selector]]]):
+    """Verifies that all backends generate the same selectors and answer queries identically."""
+    reference_name, (reference, reference_selectors) = next(iter(results.items()))
+    for name, (dom, selectors) in results.items():
+        mismatches = [uid for uid in reference_selectors if selectors.get(uid) != reference_selectors[uid]]
+        print(f"{name}: {len(selectors)} selectors, {len(mismatches)} differ from {reference_name}")
+        for css in QUERIES:
+            if dom.query(Selector(css))[1] != reference.query(Selector(css))[1]:
+                print(f"{name}: query '{css}' differs from {reference_name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=10000, help="Size of the synthetic page")
+    parser.add_argument("--snapshot", type=Path, help="Directory of a saved PageSnapshot to use instead")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        html = (args.snapshot / "source.html").read_text(encoding="utf8")
+    else:
+        html = synthetic_page(args.elements)
+
+    # Normalize the page through html5lib first, so that all parsers see the same tree
+    html = str(bs4.BeautifulSoup(html, "html5lib"))
+    check(run(html))
+
+
+if __name__ == "__main__":
+    main()
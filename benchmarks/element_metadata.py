@@ -0,0 +1,115 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Times the extraction of element metadata in a browser on synthetic pages of increasing size, comparing the
+current traversal with the previous one (kept in ``legacy_get_element_metadata.js``), which copied its work list
+for every element and checked the position of all ancestors of every element. Also checks that both find the same
+elements.
+
+Requires the browser given by the default configuration. Run with
+``python -m benchmarks.element_metadata --elements 10000 50000 100000``. Add e.g. ``--fields tag location size`` to
+time a projected scrape, see ``config.scraping.fields``.
+"""
+
+import argparse
+import random
+import tempfile
+from pathlib import Path
+from time import perf_counter
+from typing import List
+
+from webtraversallibrary.config import Config
+from webtraversallibrary.javascript import JavascriptWrapper
+from webtraversallibrary.webdrivers import setup_driver
+
+TAGS = ["div", "span", "section", "article", "em", "b"]
+SCRIPTS = {
+    "legacy": [Path(__file__).parent / "legacy_get_element_metadata.js"],
+    "current": [Path("element_metadata.js"), Path("get_element_metadata.js")],
+}
+
+
+def synthetic_page(num_elements: int, seed: int = 0) -> str:
+    """Returns the HTML of a random page with the given number of elements below the body, some of them fixed."""
+    rng = random.Random(seed)
+    children: List[List[int]] = [[] for _ in range(num_elements + 1)]
+    for element in range(1, num_elements + 1):
+        children[rng.randrange(max(0, element - 50), element)].append(element)
+
+    parts = ["<!DOCTYPE html><html><head></head>"]
+    to_visit = [(0, False)]
+    while to_visit:
+        element, closing = to_visit.pop()
+        tag = "body" if element == 0 else TAGS[element % len(TAGS)]
+        if closing:
+            parts.append(f"</{tag}>")
+            continue
+        style = ' style="position: fixed"' if element and rng.random() < 0.001 else ""
+        text = "text" if rng.random() < 0.3 else ""
+        parts.append(f'<{tag} class="c{rng.randrange(5)}"{style}>{text}')
+        to_visit.append((element, True))
+        to_visit.extend((child, False) for child in reversed(children[element]))
+    parts.append("</html>")
+    return "".join(parts)
+
+
+def summary(elements_metadata: List[dict]) -> List[tuple]:
+    """The elements found, independent of the order in which uids were assigned."""
+    return sorted(
+        (m["tag"], m["class"] or "", m["fixed_pos"], m["location"]["x"], m["location"]["y"]) for m in elements_metadata
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, nargs="+", default=[10000, 50000, 100000], help="Page sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per page and script, the fastest is reported")
+    parser.add_argument("--fields", nargs="+", default=[], help="Only extract these fields with the current script")
+    args = parser.parse_args()
+
+    config = Config.default(["headless"])
+    driver = setup_driver(config)
+    driver.set_script_timeout(3600)
+    js = JavascriptWrapper(driver, config)
+
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            print(f"{'elements':>10}" + "".join(f"{name:>12}" for name in SCRIPTS) + "   (ms)")
+            for num_elements in args.elements:
+                page = Path(folder) / f"page_{num_elements}.html"
+                page.write_text(synthetic_page(num_elements), encoding="utf8")
+
+                timings, results = {}, {}
+                for name, script in SCRIPTS.items():
+                    timings[name] = float("inf")
+                    for _ in range(args.repeat):
+                        # Reload the page to start without any wtl-uid attributes
+                        driver.get(page.as_uri())
+                        start = perf_counter()
+                        results[name] = js.execute_file(script, 0, {"fields": args.fields})
+                        timings[name] = min(timings[name], 1000 * (perf_counter() - start))
+
+                print(f"{num_elements:>10}" + "".join(f"{timings[name]:>12.0f}" for name in SCRIPTS))
+                if not args.fields and summary(results["legacy"]) != summary(results["current"]):
+                    print(f"{num_elements:>10}  the scripts found different elements!")
+    finally:
+        driver.quit()
+
+
+if __name__ == "__main__":
+    main()
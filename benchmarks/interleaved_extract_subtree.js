@@ -0,0 +1,64 @@
+// Licensed to the Apache Software Foundation (ASF) under one
+// or more contributor license agreements.  See the NOTICE file
+// distributed with this work for additional information
+// regarding copyright ownership.  The ASF licenses this file
+// to you under the Apache License, Version 2.0 (the
+// "License"); you may not use this file except in compliance
+// with the License.  You may obtain a copy of the License at
+//
+//   http://www.apache.org/licenses/LICENSE-2.0
+//
+// Unless required by applicable law or agreed to in writing,
+// software distributed under the License is distributed on an
+// "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+// KIND, either express or implied.  See the License for the
+// specific language governing permissions and limitations
+// under the License.
+
+// The traversal of element_metadata.js before uid tagging and metadata reads were split into two phases: every
+// element is tagged right before its style and layout are read. Loaded after element_metadata.js to replace its
+// extractSubtree, for comparison in benchmarks/style_recalcs.py.
+
+// Assigns uids to untagged elements below root and returns the metadata of the subtree in pre-order.
+// The counter object holds the latest assigned uid and is updated in place.
+function extractSubtree(root, counter) {
+    const elements = [];
+    const res = [];
+    const visitedChildren = [];
+
+    // Elements left to visit, along with the fixed_pos flag of their parents
+    const toVisit = [root];
+    const parentFixedPos = [undefined];
+
+    while (toVisit.length > 0) {
+        const el = toVisit.pop();
+        if (el !== root) {
+            if (!el.hasAttribute('wtl-uid')) {
+                tagElement(el, ++counter.latestWTLUid);
+            }
+            // Elements moved since they were tagged need their parent pointer updated
+            const parentUid = el.parentElement.getAttribute('wtl-uid');
+            if (el.getAttribute('wtl-parent-uid') !== parentUid) {
+                el.attributes.setNamedItem(createCustomAttribute('wtl-parent-uid', parentUid));
+            }
+        }
+        const elementMetadata = extractMetadata(el, parentFixedPos.pop(), true);
+        elements.push(el);
+        res.push(elementMetadata);
+
+        const visitChildren = !skipHiddenSubtrees ||
+            window.getComputedStyle(el).getPropertyValue('display') !== 'none';
+        visitedChildren.push(visitChildren);
+        if (visitChildren) {
+            for (let child = el.lastElementChild; child; child = child.previousElementSibling) {
+                toVisit.push(child);
+                parentFixedPos.push(elementMetadata.fixed_pos === true);
+            }
+        }
+    }
+
+    aggregateSubtree(elements, res, visitedChildren);
+
+    window.wtlLatestUid = counter.latestWTLUid;
+    return res;
+}
@@ -0,0 +1,111 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Measures the memory held by a history of snapshots, as kept by a workflow with ``scraping.full_history`` enabled.
+
+Each step creates a snapshot from synthetic element metadata (decoded from JSON, like the metadata returned by
+the browser), touches the elements like a typical classifier would, and keeps the snapshot alive. Reports the
+peak resident set size after every ``--report`` steps.
+
+Run with ``python -m benchmarks.snapshot_memory --steps 100 --elements 3000``.
+"""
+
+import argparse
+import json
+import random
+import resource
+import sys
+from typing import List
+
+from webtraversallibrary.snapshot import PageSnapshot
+
+TAGS = ["div", "span", "a", "p", "li", "img", "button", "input"]
+DISPLAYS = ["block", "inline", "inline-block", "flex", "none"]
+WEIGHTS = ["400", "700"]
+SIZES = ["12px", "14px", "16px", "24px"]
+BACKGROUNDS = [
+    "rgba(0, 0, 0, 0) none repeat scroll 0% 0% / auto padding-box border-box",
+    "rgb(255, 255, 255) none repeat scroll 0% 0% / auto padding-box border-box",
+]
+
+
+def synthetic_metadata(num_elements: int, rng: random.Random) -> str:
+    """Returns JSON encoded element metadata, with the same fields as get_element_metadata.js."""
+    elements = []
+    for wtl_uid in range(num_elements):
+        tag = rng.choice(TAGS)
+        elements.append(
+            {
+                "id": None,
+                "tag": tag,
+                "class": f"c{rng.randrange(20)}",
+                "attributes": {"class": f"c{rng.randrange(20)}"},
+                "type": None,
+                "href": "#" if tag == "a" else None,
+                "size": {"width": rng.randrange(1000), "height": rng.randrange(100)},
+                "location": {"x": rng.randrange(1000), "y": rng.randrange(10000)},
+                "text": "text",
+                "text_local": "",
+                "children_count": 1,
+                "num_imgs": 0,
+                "num_svgs": 0,
+                "background": rng.choice(BACKGROUNDS),
+                "background_image": "none",
+                "fixed_pos": False,
+                "wtl_uid": wtl_uid,
+                "wtl_parent_uid": rng.randrange(wtl_uid) if wtl_uid else -1,
+                "display": rng.choice(DISPLAYS),
+                "visibility": "visible",
+                "font_weight": rng.choice(WEIGHTS),
+                "font_size": rng.choice(SIZES),
+            }
+        )
+    return json.dumps(elements)
+
+
+def rss_mb() -> float:
+    """Peak resident set size of this process, in MB."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 1024**2 if sys.platform == "darwin" else max_rss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--elements", type=int, default=3000, help="Number of elements per snapshot")
+    parser.add_argument("--report", type=int, default=25, help="Report every this many steps")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    payloads = [synthetic_metadata(args.elements, rng) for _ in range(4)]
+    history: List[PageSnapshot] = []
+    print(f"before: {rss_mb():.1f} MB")
+
+    for step in range(1, args.steps + 1):
+        snapshot = PageSnapshot(
+            None, {}, json.loads(payloads[step % len(payloads)]), raw_source="<html><body></body></html>"
+        )
+        for element in snapshot.elements:
+            _ = element.bounds, element.parent, element.font_size
+        history.append(snapshot)
+        if step % args.report == 0:
+            print(f"step {step}: {rss_mb():.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
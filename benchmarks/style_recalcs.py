@@ -0,0 +1,96 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+"""
+Counts the style recalculations and layouts of the browser during element metadata extraction on synthetic pages,
+comparing the current extraction, which tags all elements before reading any style or layout, with the previous
+one (see ``interleaved_extract_subtree.js``), which tagged every element right before reading it. The counts are
+read from the ``Performance`` domain of the DevTools Protocol, so this needs Chrome.
+
+Run with ``python -m benchmarks.style_recalcs --elements 10000 50000``. Browsers only restyle after an attribute
+change if a selector of the page depends on it; add ``--attribute-selector`` to include such a rule in the pages.
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+from time import perf_counter
+from typing import Dict
+
+from benchmarks.element_metadata import synthetic_page
+from webtraversallibrary.config import Config
+from webtraversallibrary.javascript import JavascriptWrapper
+from webtraversallibrary.webdrivers import send, setup_driver
+
+SCRIPTS = {
+    "interleaved": [
+        Path("element_metadata.js"),
+        Path(__file__).parent / "interleaved_extract_subtree.js",
+        Path("get_element_metadata.js"),
+    ],
+    "two-phase": [Path("element_metadata.js"), Path("get_element_metadata.js")],
+}
+METRICS = {"RecalcStyleCount": "recalcs", "LayoutCount": "layouts"}
+ATTRIBUTE_RULE = "<style>[wtl-uid] { outline-offset: 0 }</style>"
+
+
+def metrics(driver) -> Dict[str, float]:
+    return {metric["name"]: metric["value"] for metric in send(driver, "Performance.getMetrics")["metrics"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, nargs="+", default=[10000, 50000], help="Page sizes")
+    parser.add_argument("--attribute-selector", action="store_true", help="Style the pages by the wtl-uid attribute")
+    args = parser.parse_args()
+
+    config = Config.default(["headless"])
+    driver = setup_driver(config)
+    driver.set_script_timeout(3600)
+    js = JavascriptWrapper(driver, config)
+    send(driver, "Performance.enable")
+
+    columns = [f"{name} {column}" for name in SCRIPTS for column in ["ms", *METRICS.values()]]
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            print(f"{'elements':>10}" + "".join(f"{column:>24}" for column in columns))
+            for num_elements in args.elements:
+                html = synthetic_page(num_elements)
+                if args.attribute_selector:
+                    html = html.replace("<head></head>", f"<head>{ATTRIBUTE_RULE}</head>")
+                page = Path(folder) / f"page_{num_elements}.html"
+                page.write_text(html, encoding="utf8")
+
+                row = []
+                for script in SCRIPTS.values():
+                    # Reload the page to start without any wtl-uid attributes
+                    driver.get(page.as_uri())
+                    before = metrics(driver)
+                    start = perf_counter()
+                    js.execute_file(script, 0, {})
+                    row.append(1000 * (perf_counter() - start))
+                    after = metrics(driver)
+                    row.extend(after[metric] - before[metric] for metric in METRICS)
+
+                print(f"{num_elements:>10}" + "".join(f"{value:>24.0f}" for value in row))
+    finally:
+        driver.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,7 @@ setuptools.setup(
     install_requires=[
         "beautifulsoup4>=4.8",
         "html5lib>=1.0.1",
+        "numpy>=1.17",
         "pillow>=7.1",
         "requests>=2.24",
         "selenium>=3.141",
@@ -33,6 +34,7 @@ setuptools.setup(
         "urllib3",
         "prodict>=0.8"
     ],
+    extras_require={"lxml": ["lxml>=4.5", "cssselect>=1.1"], "zstd": ["zstandard>=0.15"]},
     classifiers=[
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
@@ -15,8 +15,6 @@
 # specific language governing permissions and limitations
 # under the License.
 
-from dataclasses import dataclass
-
 import bs4
 import pytest
 
@@ -127,20 +125,22 @@ def test_page_actions():
 
 
 def test_transformed_to_element():
-    @dataclass
-    class Temp:
-        x: int
-
-    class MockElements:
-        def __init__(self, results=3):
-            self._results = results
-
-        def by_selector(self, s):
-            return [Temp(len(s.css))] * self._results
-
-    element_action = wtl.actions.Click(wtl.Selector("abc"))
-    element_action = element_action.transformed_to_element(MockElements())
-    assert element_action.target.x == 3
+    source = '<html><body><div wtl-uid="1"><p wtl-uid="2"></p><p wtl-uid="3"></p></div></body></html>'
+    metadata = [
+        {"wtl_uid": 1, "wtl_parent_uid": -1},
+        {"wtl_uid": 2, "wtl_parent_uid": 1},
+        {"wtl_uid": 3, "wtl_parent_uid": 1},
+    ]
+    snapshot = wtl.PageSnapshot(bs4.BeautifulSoup(source, "html.parser"), {}, metadata)
+
+    selector = wtl.Selector("div > p")
+    element_action = wtl.actions.Click(selector)
+    element_action = element_action.transformed_to_element(snapshot.elements)
+    assert isinstance(element_action.target, wtl.PageElement)
+    assert element_action.target == snapshot.elements.by_uid(2)
+    assert element_action.target.selector is selector
+    assert element_action.selector is selector
+    assert snapshot.elements.by_uid(2).selector is not selector
 
     with pytest.raises(AssertionError):
-        element_action = element_action.transformed_to_element(MockElements(0))
+        wtl.actions.Click(wtl.Selector("span")).transformed_to_element(snapshot.elements)
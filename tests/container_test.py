@@ -0,0 +1,85 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import pytest
+
+from webtraversallibrary.container import (
+    CODECS,
+    HAS_ZSTD,
+    MAGIC,
+    ContainerError,
+    ContainerReader,
+    ContainerWriter,
+    compress,
+    decompress,
+    is_container,
+)
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_compress(codec):
+    if codec == "zstd" and not HAS_ZSTD:
+        pytest.skip("zstandard is not installed")
+    data = b"hello world " * 100
+    assert decompress(compress(data, codec), codec) == data
+
+
+def test_container(tmp_path):
+    path = tmp_path / "snapshot.wtl"
+    with ContainerWriter(path, codec="gzip") as writer:
+        writer.add("a.json", b'{"a": 1}')
+        writer.add("b.png", b"\x89PNG", codec="none")
+        writer.add("empty", b"")
+        with pytest.raises(ContainerError):
+            writer.add("a.json", b"")
+
+    assert is_container(path)
+    assert not is_container(tmp_path)
+    assert [p.name for p in tmp_path.iterdir()] == ["snapshot.wtl"]
+
+    with ContainerReader(path) as reader:
+        assert reader.names == ["a.json", "b.png", "empty"]
+        assert "b.png" in reader
+        assert reader.read("b.png") == b"\x89PNG"
+        assert reader.read("a.json") == b'{"a": 1}'
+        assert reader.read("empty") == b""
+        with pytest.raises(KeyError):
+            reader.read("c")
+
+
+def test_container_errors(tmp_path):
+    path = tmp_path / "snapshot.wtl"
+    with pytest.raises(RuntimeError):
+        with ContainerWriter(path) as writer:
+            writer.add("a", b"a")
+            raise RuntimeError()
+    assert not list(tmp_path.iterdir())
+
+    path.write_bytes(b"not a container")
+    with pytest.raises(ContainerError):
+        ContainerReader(path)
+
+    with ContainerWriter(path) as writer:
+        writer.add("a", b"a")
+    path.write_bytes(path.read_bytes()[:-4])
+    with pytest.raises(ContainerError):
+        ContainerReader(path)
+
+    # Too short to even hold the footer
+    path.write_bytes(MAGIC + b"x")
+    with pytest.raises(ContainerError):
+        ContainerReader(path)
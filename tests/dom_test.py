@@ -0,0 +1,71 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import bs4
+import pytest
+
+from webtraversallibrary.dom import BeautifulSoupBackend, LxmlBackend
+from webtraversallibrary.selector import Selector
+
+pytest.importorskip("lxml")
+pytest.importorskip("cssselect")
+
+SOURCE = """<html><head><title>T</title></head><body>
+<div class="a"><div><div class="b"><span>Hi</span><span>Hey</span></div></div></div>
+<!-- comment -->
+<div class="a"><p><a href="#"></a></p><p></p><a></a></div>
+<ul><li>1</li><li>2</li><li>3</li></ul>
+</body></html>"""
+
+
+@pytest.fixture(name="backends")
+def fixture_backends():
+    soup = bs4.BeautifulSoup(SOURCE, "html5lib")
+    for wtl_uid, tag in enumerate(soup.find_all(True), start=1):
+        tag["wtl-uid"] = str(wtl_uid)
+    soup_dom = BeautifulSoupBackend(soup)
+    return soup_dom, LxmlBackend(str(soup), fallback=lambda: soup_dom)
+
+
+def test_selectors(backends):
+    soup_dom, lxml_dom = backends
+    selectors = lxml_dom.selectors()
+    assert selectors == soup_dom.selectors()
+    for wtl_uid, selector in selectors.items():
+        assert lxml_dom.selector(wtl_uid) == selector
+
+
+def test_query(backends):
+    soup_dom, lxml_dom = backends
+    for css in ["div.a", "div > p", "ul li:nth-of-type(2)", "a[href]", "html", "body > *", "span:first-child"]:
+        _, expected = soup_dom.query(Selector(css))
+        nodes, wtl_uids = lxml_dom.query(Selector(css))
+        assert wtl_uids == expected
+        assert len(nodes) == len(expected)
+
+
+def test_query_fallback(backends):
+    soup_dom, lxml_dom = backends
+    selector = Selector("body > *:first-of-type")
+    assert lxml_dom.query(selector)[1] == soup_dom.query(selector)[1]
+
+
+def test_subtree_uids(backends):
+    soup_dom, lxml_dom = backends
+    for wtl_uid in soup_dom.tags_by_uid:
+        assert lxml_dom.subtree_uids(wtl_uid) == soup_dom.subtree_uids(wtl_uid)
+        assert lxml_dom.by_uid(wtl_uid).get("wtl-uid") == str(wtl_uid)
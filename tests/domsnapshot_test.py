@@ -0,0 +1,125 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+from webtraversallibrary.domsnapshot import COMPUTED_STYLES, elements_metadata_from_snapshot
+
+VISIBLE = {
+    "display": "block",
+    "visibility": "visible",
+    "position": "static",
+    "font-weight": "400",
+    "font-size": "16px",
+    "background": "none",
+    "background-image": "none",
+    "white-space": "normal",
+    "text-transform": "none",
+}
+
+
+def _snapshot(nodes):
+    """
+    Builds a minimal DOM snapshot from (parent, name, value, attributes, style, bounds) tuples,
+    where nodes without a style have no layout box.
+    """
+    strings = []
+
+    def intern(value):
+        if value is None:
+            return -1
+        if value not in strings:
+            strings.append(value)
+        return strings.index(value)
+
+    layout = {"nodeIndex": [], "styles": [], "bounds": []}
+    for index, (_, _, _, _, style, bounds) in enumerate(nodes):
+        if style is not None:
+            layout["nodeIndex"].append(index)
+            layout["styles"].append([intern({**VISIBLE, **style}[name]) for name in COMPUTED_STYLES])
+            layout["bounds"].append(bounds)
+
+    document = {
+        "nodes": {
+            "parentIndex": [parent for parent, *_ in nodes],
+            "nodeType": [3 if name == "#text" else 1 for _, name, *_ in nodes],
+            "nodeName": [intern(name.upper()) for _, name, *_ in nodes],
+            "nodeValue": [intern(value) for _, _, value, *_ in nodes],
+            "attributes": [[intern(s) for item in attrs.items() for s in item] for _, _, _, attrs, *_ in nodes],
+        },
+        "layout": layout,
+        "scrollOffsetX": 0,
+        "scrollOffsetY": 100,
+    }
+    return {"strings": strings, "documents": [document]}
+
+
+SNAPSHOT = _snapshot(
+    [
+        (-1, "html", None, {}, {}, [0, 0, 800, 600]),
+        (0, "body", None, {"wtl-uid": "0"}, {}, [0, 0, 800, 600]),
+        (1, "div", None, {"wtl-uid": "1", "wtl-parent-uid": "0", "id": "a"}, {}, [10, 20, 300, 40]),
+        (2, "#text", "  Hello   world ", {}, {"display": "inline"}, [10, 20, 80, 16]),
+        (2, "img", None, {"wtl-uid": "2", "wtl-parent-uid": "1", "src": "a.png"}, {"display": "inline"}, [0, 0, 5, 5]),
+        (1, "div", None, {"wtl-uid": "3", "wtl-parent-uid": "0"}, None, None),
+        (5, "span", None, {"wtl-uid": "4", "wtl-parent-uid": "3"}, None, None),
+        (6, "#text", "secret", {}, None, None),
+        (1, "div", None, {"wtl-uid": "5", "wtl-parent-uid": "0"}, {"position": "fixed"}, [0, 500, 800, 100]),
+        (8, "p", None, {"wtl-uid": "6", "wtl-parent-uid": "5"}, {}, [0, 500, 800, 20]),
+        (9, "#text", "Para", {}, {"display": "inline"}, [0, 500, 30, 20]),
+        (8, "img", None, {"wtl-uid": "7", "wtl-parent-uid": "5", "src": "b.svg"}, {"display": "inline"}, [0, 0, 5, 5]),
+    ]
+)
+
+
+def test_elements_metadata_from_snapshot():
+    elements = {element["wtl_uid"]: element for element in elements_metadata_from_snapshot(SNAPSHOT)}
+    assert list(elements) == list(range(8))
+
+    body = elements[0]
+    assert body["tag"] == "body"
+    assert body["wtl_parent_uid"] == -1
+    assert body["children_count"] == 3
+    assert body["num_imgs"] == 1
+    assert body["num_svgs"] == 1
+    assert body["text"] == "Hello world\n\nPara"
+
+    div = elements[1]
+    assert div["id"] == "a"
+    assert div["attributes"] == {"wtl-uid": "1", "wtl-parent-uid": "0", "id": "a"}
+    assert div["location"] == {"x": 10, "y": 20}
+    assert div["size"] == {"width": 300, "height": 40}
+    assert div["text"] == "Hello world"
+    assert div["text_local"] == "Hello   world"
+    assert div["display"] == "block"
+    assert not div["fixed_pos"]
+
+    hidden = elements[3]
+    assert hidden["display"] == "none"
+    assert hidden["visibility"] == "visible"
+    assert hidden["location"] == {"x": 0, "y": 100}
+    assert hidden["size"] == {"width": 0, "height": 0}
+    assert hidden["text"] == "secret"
+
+    assert elements[5]["fixed_pos"]
+    assert elements[6]["fixed_pos"]
+    assert elements[6]["text"] == "Para"
+
+
+def test_elements_metadata_from_snapshot_options():
+    elements = elements_metadata_from_snapshot(SNAPSHOT, fields=["tag"], skip_hidden_subtrees=True)
+    assert [element["wtl_uid"] for element in elements] == [0, 1, 2, 3, 5, 6, 7]
+    assert elements[1] == {"tag": "div", "wtl_uid": 1, "wtl_parent_uid": 0}
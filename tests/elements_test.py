@@ -16,9 +16,12 @@
 # under the License.
 
 import bs4
+import numpy as np
 import pytest
+from PIL import Image
 
 import webtraversallibrary as wtl
+from webtraversallibrary.screenshot import Screenshot
 
 
 def test_by_score_and_uid():
@@ -91,3 +94,103 @@ def test_by_selector():
 
     with pytest.raises(AssertionError):
         elements.by_subtree(wtl.Selector("does-not-exist"))
+
+
+def test_index_lookups():
+    metadata = [
+        {"wtl_uid": 0, "wtl_parent_uid": -1},
+        {"wtl_uid": 1, "wtl_parent_uid": 0, "x": 0.5},
+        {"wtl_uid": 2, "wtl_parent_uid": 1},
+        {"wtl_uid": 3, "wtl_parent_uid": 1, "x": 1.5},
+        {"wtl_uid": 4, "wtl_parent_uid": 0},
+    ]
+    snapshot = wtl.PageSnapshot(bs4.BeautifulSoup("", "html5lib"), {}, metadata)
+    elements = snapshot.elements
+
+    assert elements.by_uid(3).metadata["x"] == 1.5
+    assert elements.by_uid(99) is None
+    assert elements.by_uid(2).parent.parent.wtl_uid == 0
+    assert [e.wtl_uid for e in elements.by_uid(1).children] == [2, 3]
+    assert [e.wtl_uid for e in elements.by_parent_uid(0)] == [1, 4]
+
+    assert len(elements.by_score("x")) == 2
+    elements.by_uid(4).set_score("x", 2.5, raw_score=25.0)
+    assert [e.wtl_uid for e in elements.by_score("x", limit=1.0)] == [3, 4]
+    assert [e.wtl_uid for e in elements.by_raw_score("x")] == [4]
+
+    # Subsets only return their own members, in their own order
+    subset = wtl.snapshot.Elements([elements.by_uid(4), elements.by_uid(1), elements.by_uid(2)])
+    assert [e.wtl_uid for e in subset.by_score("x")] == [4, 1]
+    assert [e.wtl_uid for e in subset.by_parent_uid(1)] == [2]
+
+    # Lists of the same length as the page are not mistaken for it
+    same_length = wtl.snapshot.Elements([elements.by_uid(4)] * len(elements), element_index=elements.element_index)
+    assert [e.wtl_uid for e in same_length.by_score("x")] == [4] * len(elements)
+    assert same_length.by_uid(1) is None
+    assert elements.index(elements.by_uid(3)) == 3
+
+    # Tree queries use the pre-order intervals
+    assert [e.wtl_uid for e in elements.by_subtree(elements.by_uid(1))] == [2, 3, 1]
+    assert [e.wtl_uid for e in elements.by_subtree(elements.by_uid(0), include_root=False)] == [1, 2, 3, 4]
+    assert [e.wtl_uid for e in subset.by_subtree(elements.by_uid(0), include_root=False)] == [4, 1, 2]
+    assert [e.depth for e in elements] == [0, 1, 2, 2, 1]
+    assert elements.by_uid(0).is_ancestor_of(elements.by_uid(3))
+    assert elements.by_uid(1).is_ancestor_of(elements.by_uid(2))
+    assert not elements.by_uid(1).is_ancestor_of(elements.by_uid(4))
+    assert not elements.by_uid(2).is_ancestor_of(elements.by_uid(2))
+
+
+def test_index_after_changes():
+    metadata = [{"wtl_uid": i, "wtl_parent_uid": -1, "x": float(i), "raw_scores": {"x": float(i)}} for i in range(4)]
+    snapshot = wtl.PageSnapshot(bs4.BeautifulSoup("", "html5lib"), {}, metadata)
+    elements = snapshot.elements
+
+    # The page list keeps its own order once reordered
+    elements.sort_by("x", reverse=True)
+    assert [e.wtl_uid for e in elements.by_score("x")] == [3, 2, 1]
+    elements.append(elements.pop(0))
+    assert [e.wtl_uid for e in elements.by_score("x")] == [2, 1, 3]
+
+    # Scores set through other elements for the same metadata are seen, and others are not mistaken for them
+    assert not elements.by_score("y")
+    assert np.isnan(snapshot.table.score("y")).all()
+    copy = wtl.PageElement(snapshot, elements.by_uid(1).metadata)
+    copy.set_score("y", 0.5)
+    other = wtl.PageElement(snapshot, {"wtl_uid": 2, "wtl_parent_uid": -1})
+    other.set_score("y", 1.5)
+    assert [e.wtl_uid for e in elements.by_score("y")] == [1]
+    assert np.array_equal(snapshot.table.score("y"), [np.nan, 0.5, np.nan, np.nan], equal_nan=True)
+
+
+def test_screenshots():
+    def element(wtl_uid, x, y, width, height, fixed_pos=False):
+        return {
+            "wtl_uid": wtl_uid,
+            "wtl_parent_uid": -1,
+            "location": {"x": x, "y": y},
+            "size": {"width": width, "height": height},
+            "fixed_pos": fixed_pos,
+        }
+
+    full = Image.fromarray(np.arange(40 * 30 * 3, dtype=np.uint8).reshape(40, 30, 3))
+    first = Image.new("RGB", (30, 20), (255, 0, 0))
+    metadata = [
+        element(0, 2, 3, 10, 5),
+        element(1, 25, 35, 10, 10),
+        element(2, 5, 5, 4, 4, True),
+        element(3, 50, 0, 5, 5),
+    ]
+    screenshots = {"first": Screenshot("first", first), "full": Screenshot("full", full)}
+    snapshot = wtl.PageSnapshot(bs4.BeautifulSoup("", "html5lib"), {}, metadata, screenshots)
+
+    crops = snapshot.elements.screenshots()
+    for e, crop in zip(snapshot.elements, crops):
+        assert (crop is None and e.screenshot is None) or np.array_equal(crop, np.asarray(e.screenshot))
+    assert crops[3] is None
+
+    batch = snapshot.elements.screenshots(size=(8, 8))
+    assert batch.shape == (4, 8, 8, 3)
+    assert np.array_equal(batch[0, :5, :8], crops[0][:, :8])
+    assert np.array_equal(batch[1, :5, :5], crops[1])
+    assert (batch[2, :4, :4] == (255, 0, 0)).all()
+    assert not batch[3].any()
@@ -117,6 +117,9 @@ def test_monkeypatches():
     assert patches.check(snapshot, e4) == "CCC"
     assert patches.check(snapshot, e1) == "AAA"
 
+    # Other elements for the same metadata match too
+    assert patches.check(snapshot, wtl.snapshot.PageElement(None, e2.metadata)) == "BBB"
+
 
 def test_frame_switcher():
     js = MockJavascriptWrapper()
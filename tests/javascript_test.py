@@ -14,8 +14,12 @@
 # KIND, either express or implied.  See the License for the
 # specific language governing permissions and limitations
 # under the License.
+import json
+
+import pytest
 
 import webtraversallibrary as wtl
+from webtraversallibrary.error import ScrapingError
 from webtraversallibrary.javascript import JavascriptWrapper
 
 
@@ -91,3 +95,53 @@ def test_javascript_wrapper():
     result = js.find_viewport()
     assert result.bounds == (1, 2, 4, 6)
     assert driver.calls == 20
+
+
+class BufferingWebDriver:
+    def __init__(self, elements):
+        self.buffer = elements
+        self.reads = []
+        self.broken_chunks = {}
+        self.chunk_size = 0
+        self.options = None
+
+    def execute_script(self, script, *args, **__):
+        if "wtlMetadataBuffer = chunks" in script:
+            self.chunk_size, self.options = args
+            if not self.chunk_size or len(self.buffer) <= self.chunk_size:
+                return self.buffer
+            return {"buffered": len(self.buffer), "chunks": -(-len(self.buffer) // self.chunk_size)}
+        (index,) = args
+        self.reads.append(index)
+        if index in self.broken_chunks:
+            return self.broken_chunks[index]
+        return json.dumps(self.buffer[index * self.chunk_size : (index + 1) * self.chunk_size])
+
+    def get_log(self, *_, **__):
+        return []
+
+
+def test_chunked_element_metadata():
+    elements = [{"wtl_uid": uid} for uid in range(10)]
+
+    driver = BufferingWebDriver(elements)
+    assert JavascriptWrapper(driver).get_element_metadata() == elements
+    assert not driver.reads
+
+    assert JavascriptWrapper(driver).get_element_metadata(chunk_size=4) == elements
+    assert driver.reads == [0, 1, 2]
+
+    # Metadata that fits in one chunk is returned right away
+    driver.reads = []
+    assert JavascriptWrapper(driver).get_element_metadata(chunk_size=10) == elements
+    assert not driver.reads
+    assert driver.options == {"fields": [], "skip_hidden_subtrees": False}
+
+    JavascriptWrapper(driver).get_element_metadata(fields=("tag", "location"), skip_hidden_subtrees=True)
+    assert driver.options == {"fields": ["tag", "location"], "skip_hidden_subtrees": True}
+
+    # Chunks that cannot be read are errors, not pages without elements
+    for broken in (None, '[{"wtl_uid": 4}'):
+        driver.broken_chunks = {1: broken}
+        with pytest.raises(ScrapingError, match="chunk 1 of 3"):
+            JavascriptWrapper(driver).get_element_metadata(chunk_size=4)
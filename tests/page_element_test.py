@@ -15,6 +15,11 @@
 # specific language governing permissions and limitations
 # under the License.
 
+from dataclasses import FrozenInstanceError
+
+import pytest
+
+from webtraversallibrary.error import FieldNotScrapedError
 from webtraversallibrary.snapshot import Elements, PageElement
 
 
@@ -29,7 +34,26 @@ def test_page_element():
     assert element.size.x == 10
     assert element.size.y == 11
 
-    assert element.bounds.area == 110
+    bounds = element.bounds
+    assert bounds.area == 110
+    assert element.bounds is bounds
+
+    assert not hasattr(element, "__dict__")
+    with pytest.raises(FrozenInstanceError):
+        element.metadata = {}
+    assert element == PageElement(None, {"location": location, "size": size})
+    assert element != PageElement(None, {"location": location})
+
+
+def test_field_not_scraped():
+    element = PageElement(None, {"wtl_uid": 3, "location": {"x": 1, "y": 2}})
+    assert element.field("location") == {"x": 1, "y": 2}
+    assert element.location.x == 1
+
+    with pytest.raises(FieldNotScrapedError, match="'size' was not scraped for PageElement\\(wtl_uid=3\\)"):
+        _ = element.size
+    with pytest.raises(KeyError):
+        element.field("font_size")
 
 
 def test_parse_resolved_size():
@@ -54,6 +78,5 @@ def test_uid_and_parent():
 
     page.elements = Elements([b, c, a])
 
-    assert a.parent == b
-    assert b.parent == c
-    assert c.parent is None
+    parents = [e.parent for e in (a, b, c)]
+    assert parents == [b, c, None]
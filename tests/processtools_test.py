@@ -20,7 +20,7 @@ from time import sleep
 import pytest
 
 from webtraversallibrary.driver_check import OS, get_current_os
-from webtraversallibrary.processtools import TimeoutContext
+from webtraversallibrary.processtools import TimeoutContext, cached_slot_property
 
 
 def test_timeout_context_within_limits():
@@ -36,3 +36,22 @@ def test_timeout_context_exceeds():
     with pytest.raises(TimeoutError):
         with TimeoutContext(n_seconds=1):
             sleep(2)
+
+
+def test_cached_slot_property():
+    class Slotted:
+        __slots__ = ("calls", "_value")
+
+        def __init__(self):
+            self.calls = 0
+
+        @cached_slot_property
+        def value(self):
+            self.calls += 1
+            return [self.calls]
+
+    obj = Slotted()
+    values = [obj.value, obj.value]
+    assert values == [[1], [1]]
+    assert id(values[0]) == id(values[1])
+    assert obj.calls == 1
@@ -15,6 +15,10 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import json
+
+import pytest
+
 import webtraversallibrary as wtl
 
 
@@ -72,3 +76,170 @@ def test_simple():
 
     mhtml_page = scraper.get_page_as_mhtml()
     assert mhtml_page is None
+
+
+def test_unknown_fields():
+    config = wtl.Config.default()
+    config.scraping.fields = ["tag", "colour"]
+    with pytest.raises(ValueError, match="colour"):
+        wtl.Scraper(MockWebDriver(), config)
+
+
+def _metadata(uid, parent_uid, y=0, text=""):
+    return {
+        "wtl_uid": uid,
+        "wtl_parent_uid": parent_uid,
+        "tag": "div",
+        "location": {"x": 0, "y": y},
+        "size": {"width": 10, "height": 10},
+        "text": text,
+    }
+
+
+def _page():
+    # 0 -> (1 -> (2, 3), 4)
+    return [_metadata(0, -1), _metadata(1, 0, 1), _metadata(2, 1, 2), _metadata(3, 1, 3), _metadata(4, 0, 4)]
+
+
+def test_merge_incremental_metadata():
+    previous = _page()
+    previous[4]["score"] = 0.5
+
+    result = {
+        "roots": [[_metadata(1, 0, 1, "new"), _metadata(5, 1, 2)]],
+        "ancestors": [_metadata(0, -1, text="new")],
+    }
+    merged = wtl.scraper.merge_incremental_metadata(previous, result)
+    assert [m["wtl_uid"] for m in merged] == [0, 1, 5, 4]
+    assert merged[0]["text"] == merged[1]["text"] == "new"
+    assert merged[3] == _metadata(4, 0, 4)
+    assert "score" in previous[4]
+
+    unchanged = wtl.scraper.merge_incremental_metadata(previous, {"roots": [], "ancestors": []})
+    assert unchanged == _page()
+
+
+def test_merge_incremental_metadata_fallback():
+    moved = {"roots": [[_metadata(2, 1, 20)]], "ancestors": [_metadata(0, -1), _metadata(1, 0, 1)]}
+    assert wtl.scraper.merge_incremental_metadata(_page(), moved) is None
+
+    unknown = {"roots": [[_metadata(7, 1)]], "ancestors": []}
+    assert wtl.scraper.merge_incremental_metadata(_page(), unknown) is None
+
+    duplicate = {"roots": [[_metadata(2, 1, 2), _metadata(4, 2)]], "ancestors": []}
+    assert wtl.scraper.merge_incremental_metadata(_page(), duplicate) is None
+
+
+class IncrementalWebDriver(MockWebDriver):
+    def __init__(self, results):
+        self.results = results
+        self.known_ids = []
+
+    def execute_script(self, *args, **__):
+        if "wtlMutationState" not in args[0]:
+            return None
+        self.known_ids.append(args[1])
+        return self.results.pop(0)
+
+
+def test_incremental():
+    config = wtl.Config.default()
+    config.scraping.incremental = True
+
+    full = {"id": "a", "full": True, "reason": "new document", "elements": _page()}
+    update = {"id": "a", "full": False, "roots": [[_metadata(3, 1, 3, "new")]], "ancestors": []}
+    moved = {"id": "a", "full": False, "roots": [[_metadata(3, 1, 30)]], "ancestors": []}
+    driver = IncrementalWebDriver([full, update, moved, {**full, "id": "b"}, {**update, "id": "b"}])
+    scraper = wtl.Scraper(driver, config)
+
+    assert scraper.get_elements_metadata() == _page()
+    assert scraper.get_elements_metadata()[3]["text"] == "new"
+    assert [m["wtl_uid"] for m in scraper.get_elements_metadata()] == [0, 1, 2, 3, 4]
+    assert scraper.get_elements_metadata()[3]["text"] == "new"
+    # Both scrapes are remembered, most recent last
+    assert driver.known_ids == [[], ["a"], ["a"], [], ["a", "b"]]
+
+
+class FusedWebDriver(MockWebDriver):
+    # Counts round trips to the browser, and buffers element metadata like element_metadata.js does
+    def __init__(self, elements, failed_reads=0):
+        self.elements = elements
+        self.chunks = []
+        self.failed_reads = failed_reads
+        self.round_trips = 0
+        self.refreshes = 0
+
+    def refresh(self):
+        self.refreshes += 1
+
+    def find_element(self, *_):
+        raise AssertionError("The page source should come from the scrape script")
+
+    def get_log(self, _):
+        self.round_trips += 1
+        return []
+
+    def execute_script(self, *args, **__):
+        self.round_trips += 1
+        if "buffer[index]" in args[0]:
+            if self.failed_reads:
+                self.failed_reads -= 1
+                return None
+            return self.chunks[args[1]]
+        if "timings.source" not in args[0]:
+            return None
+
+        chunk_size = args[1]
+        elements = self.elements
+        if chunk_size and len(elements) > chunk_size:
+            self.chunks = [json.dumps(elements[i : i + chunk_size]) for i in range(0, len(elements), chunk_size)]
+            elements = {"buffered": len(elements), "chunks": len(self.chunks)}
+        return {
+            "elements": elements,
+            "source": "<body><div>Fused</div></body>",
+            "title": "Fused title",
+            "url": "Fused URL",
+            "full_height": 1234,
+            "timings": {"metadata": 5.0, "source": 1.0},
+        }
+
+
+def test_single_round_trip():
+    driver = FusedWebDriver(_page())
+    scraper = wtl.Scraper(driver, wtl.Config.default())
+    round_trips = driver.round_trips
+
+    page = scraper.scrape_current_page()
+    assert driver.round_trips == round_trips + 1
+    assert "Fused" in str(page.page_source)
+    assert page.page_metadata["title"] == "Fused title"
+    assert page.page_metadata["url"] == "Fused URL"
+    assert page.page_metadata["full_page_size"][1] == 1234
+    assert page.page_metadata["timings"]["metadata"] == 5.0
+    assert "scrape" in page.page_metadata["timings"]
+    assert len(page.elements) == 5
+
+    # The browser log of the scrape is fetched after the next script
+    scraper.js.execute_script("return 1;")
+    assert driver.round_trips == round_trips + 3
+
+
+def test_chunked_round_trips():
+    config = wtl.Config.default()
+    config.scraping.metadata_chunk_size = 2
+    driver = FusedWebDriver(_page())
+    scraper = wtl.Scraper(driver, config)
+    round_trips = driver.round_trips
+
+    page = scraper.scrape_current_page()
+    assert driver.round_trips == round_trips + 4
+    assert page.elements_metadata == _page()
+
+    # A chunk that cannot be read fails the scrape, which is tried again after reloading the page
+    config.scraping.page_load_timeout = 0
+    config.scraping.wait_loading = 0
+    config.scraping.prescroll = False
+    driver = FusedWebDriver(_page(), failed_reads=1)
+    page = wtl.Scraper(driver, config).scrape_current_page()
+    assert driver.refreshes == 1
+    assert page.elements_metadata == _page()
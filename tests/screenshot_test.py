@@ -15,9 +15,12 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import base64
 import io
+import json
 from pathlib import Path
 
+import numpy as np
 from PIL import Image
 
 import webtraversallibrary as wtl
@@ -44,6 +47,27 @@ class MockWebDriver:
         return None
 
 
+class MockCommandExecutor:
+    def __init__(self, response: dict):
+        self._url = "http://localhost"
+        self.response = response
+        self.commands = []
+
+    def _request(self, _, url, body):
+        assert url.endswith("/session/1/chromium/send_command_and_get_result")
+        self.commands.append(json.loads(body))
+        return self.response
+
+
+class MockChromeWebDriver(MockWebDriver):
+    name = "chrome"
+    session_id = "1"
+
+    def __init__(self, filename: str, response: dict):
+        super().__init__(filename)
+        self.command_executor = MockCommandExecutor(response)
+
+
 def test_capture_viewport():
     driver = MockWebDriver("crop.png")
     result = Screenshot.capture_viewport("testing", driver)
@@ -81,10 +105,144 @@ def test_capture(mocker):
         "webtraversallibrary.javascript.JavascriptWrapper.find_viewport",
         return_value=wtl.Rectangle(wtl.Point(0, 0), wtl.Point(256, 256)),
     )
-    mocker.patch("webtraversallibrary.javascript.JavascriptWrapper.hide_position_fixed_elements", return_value={})
+    hide = mocker.patch("webtraversallibrary.javascript.JavascriptWrapper.hide_fixed_elements", return_value={"0": ""})
+    show = mocker.patch("webtraversallibrary.javascript.JavascriptWrapper.show_position_fixed_elements")
+    scroll = mocker.patch(
+        "webtraversallibrary.javascript.JavascriptWrapper.scroll_to_settled", side_effect=lambda x, y, _: y
+    )
 
     result = Screenshot.capture("testing", driver, max_page_height=900)
     reference = Image.open(ORIGINAL_DIR / "page.png")
 
     assert result.name == "testing"
     assert equal_images(result.image, reference)
+    assert [c.args[1] for c in scroll.call_args_list] == [0, 256, 512, 768]
+    hide.assert_called_once()
+    show.assert_called_once_with({"0": ""})
+
+
+def test_capture_end_of_page(mocker):
+    driver = MockWebDriver("cat.png")
+
+    mocker.patch("webtraversallibrary.javascript.JavascriptWrapper.get_full_height", return_value=400)
+    mocker.patch(
+        "webtraversallibrary.javascript.JavascriptWrapper.find_viewport",
+        return_value=wtl.Rectangle(wtl.Point(0, 0), wtl.Point(128, 128)),
+    )
+    # The browser stops scrolling at the end of the page
+    mocker.patch(
+        "webtraversallibrary.javascript.JavascriptWrapper.scroll_to_settled", side_effect=lambda x, y, _: min(y, 272)
+    )
+
+    result = Screenshot.capture("testing", driver, scale=0.5, max_page_height=1000)
+    cat = Image.open(ORIGINAL_DIR / "cat.png").convert("RGB").resize((128, 128))
+
+    assert result.size == wtl.Point(128, 400)
+    assert equal_images(result.image.crop((0, 0, 128, 128)), cat)
+    assert equal_images(result.image.crop((0, 384, 128, 400)), cat.crop((0, 112, 128, 128)))
+
+
+def test_capture_cdp(mocker):
+    data = base64.b64encode((ORIGINAL_DIR / "page.png").read_bytes()).decode()
+    driver = MockChromeWebDriver("cat.png", {"value": {"data": data}})
+
+    mocker.patch("webtraversallibrary.javascript.JavascriptWrapper.get_full_height", return_value=2048)
+    mocker.patch(
+        "webtraversallibrary.javascript.JavascriptWrapper.find_viewport",
+        return_value=wtl.Rectangle(wtl.Point(0, 100), wtl.Point(256, 356)),
+    )
+    hide = mocker.patch("webtraversallibrary.javascript.JavascriptWrapper.hide_fixed_elements", return_value={})
+
+    result = Screenshot.capture("testing", driver, scale=0.5, max_page_height=900)
+
+    assert equal_images(result.image, Image.open(ORIGINAL_DIR / "page.png"))
+    assert not hide.called
+    assert driver.command_executor.commands == [
+        {
+            "cmd": "Page.captureScreenshot",
+            "params": {
+                "format": "png",
+                "captureBeyondViewport": True,
+                "clip": {"x": 0, "y": 0, "width": 256, "height": 900, "scale": 0.5},
+            },
+        }
+    ]
+
+    # Falls back to stitching if the command fails
+    mocker.patch("webtraversallibrary.javascript.JavascriptWrapper.scroll_to_settled", side_effect=lambda x, y, _: y)
+    driver = MockChromeWebDriver("cat.png", {"value": {"error": "unknown command"}})
+    result = Screenshot.capture("testing", driver, max_page_height=768)
+    assert hide.called
+    assert result.size == wtl.Point(256, 768)
+
+
+def test_encoded(mocker, tmpdir):
+    driver = MockWebDriver("crop.png")
+    result = Screenshot.capture_viewport("testing", driver)
+    png = driver.get_screenshot_as_png()
+    open_image = mocker.spy(Image, "open")
+
+    assert result.image_format == "png"
+    assert bytes(result.encoded) == png
+    result.save(tmpdir)
+    assert (tmpdir / "testing.png").read_binary() == png
+    assert not open_image.called
+
+    # Only the header is read for the size
+    reference = Image.open(ORIGINAL_DIR / "crop.png")
+    assert result.size == wtl.Point(*reference.size)
+    assert result.encoded is not None
+
+    # Drawing drops the encoded image
+    result.highlight(wtl.Rectangle(wtl.Point(0, 0), wtl.Point(2, 2)), wtl.Color(255, 0, 0))
+    assert result.encoded is None
+    assert not equal_images(result.image, reference)
+
+
+def test_encoded_jpeg(tmpdir):
+    driver = MockWebDriver("crop.png")
+    result = Screenshot.capture_viewport("testing", driver, image_format="jpeg", quality=80)
+
+    assert result.image_format == "jpeg"
+    assert result.to_bytes()[:2] == b"\xff\xd8"
+    result.save(tmpdir, "mytest")
+    assert (tmpdir / "testing_mytest.jpg").read_binary() == result.to_bytes()
+    assert result.image.size == Image.open(ORIGINAL_DIR / "crop.png").size
+
+
+def test_copy_on_write():
+    original = Screenshot("original", Image.new("RGB", (4, 3), (0, 0, 255)))
+    copy = original.copy("copy")
+    assert copy.readonly_image is original.readonly_image
+
+    copy.highlight(wtl.Rectangle(wtl.Point(0, 0), wtl.Point(3, 2)), wtl.Color(255, 0, 0))
+    assert copy.image.getpixel((0, 0)) == (255, 0, 0)
+    assert original.image.getpixel((0, 0)) == (0, 0, 255)
+
+
+def test_crops():
+    image = Image.open(ORIGINAL_DIR / "cat.png").convert("RGB")
+    screenshot = Screenshot("testing", image)
+    rects = [
+        wtl.Rectangle(wtl.Point(10, 20), wtl.Point(50, 40)),
+        wtl.Rectangle(wtl.Point(200, 240), wtl.Point(300, 300)),
+        wtl.Rectangle(wtl.Point(300, 0), wtl.Point(400, 10)),
+    ]
+
+    crops = screenshot.crops(rects)
+    assert np.array_equal(crops[0], np.asarray(image.crop((10, 20, 50, 40))))
+    assert np.array_equal(crops[1], np.asarray(image.crop((200, 240, 256, 256))))
+    assert crops[2] is None
+    assert np.shares_memory(crops[0], screenshot.pixels)
+    assert not crops[0].flags.writeable
+
+    batch = screenshot.crops(np.array([rect.bounds for rect in rects]), size=(32, 32))
+    assert batch.shape == (3, 32, 32, 3)
+    assert np.array_equal(batch[0, :20], crops[0][:, :32])
+    assert not batch[0, 20:].any()
+    assert np.array_equal(batch[1, :16, :32], crops[1][:16, :32])
+    assert not batch[2].any()
+
+    # Drawing on the screenshot updates the pixels
+    screenshot.highlight(rects[0], wtl.Color(255, 0, 0))
+    assert tuple(screenshot.crops(rects)[0][0, 0]) == (255, 0, 0)
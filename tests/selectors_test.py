@@ -17,7 +17,7 @@
 
 import bs4
 
-from webtraversallibrary.selector import Selector
+from webtraversallibrary.selector import Selector, compile_css
 
 
 def test_selector_ordering():
@@ -88,6 +88,10 @@ def test_selector_build():
     assert selector.css == "html>body>div:nth-of-type(1)"
     assert selector.xpath == "/html/body/div[1]"
 
+    selector = Selector.build(soup, 12, tags_by_uid={12: soup.body.select(".a")[0]})
+    assert selector.css == "html>body>div:nth-of-type(1)"
+    assert Selector.build(soup, 13, tags_by_uid={}).css == "bad_wtl_uid_no_matches"
+
     # Unsafe names
     source = """<html><body>
 <div:nonstandard><a></a></div>
@@ -102,3 +106,29 @@ def test_selector_build():
     selector = Selector.build(soup, 23)
     assert selector.css == "bad_wtl_uid_no_matches"
     assert selector.xpath == "bad_wtl_uid_no_matches"
+
+
+def test_selector_build_all():
+    source = """<html><body>
+<div class="a"><div><div class="b"><span>Hi</span><span>Hey</span></div></div></div>
+<div class="a"><p><a></a></p><p></p><a></a></div>
+<div:nonstandard><a></a></div>
+</body></html>"""
+    soup = bs4.BeautifulSoup(source, "html5lib")
+    for wtl_uid, tag in enumerate(soup.find_all(True), start=1):
+        tag["wtl-uid"] = str(wtl_uid)
+
+    selectors = Selector.build_all(soup)
+    assert len(selectors) == len(soup.find_all(True))
+    for wtl_uid, selector in selectors.items():
+        assert selector == Selector.build(soup, wtl_uid)
+
+
+def test_selector_select():
+    soup = bs4.BeautifulSoup("<html><body><div><p></p><p></p></div><p></p></body></html>", "html5lib")
+    selector = Selector("div > p")
+
+    compile_css.cache_clear()
+    assert selector.select(soup.html) == soup.html.select("div > p")
+    assert len(Selector("div > p").select(soup.html)) == 2
+    assert compile_css.cache_info().hits == 1
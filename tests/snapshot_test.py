@@ -15,11 +15,23 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import copy
+import io
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import bs4
+import pytest
+from PIL import Image
 
+from webtraversallibrary import container
 from webtraversallibrary.config import Config
+from webtraversallibrary.screenshot import Screenshot
 from webtraversallibrary.selector import Selector
 from webtraversallibrary.snapshot import PageSnapshot
+from webtraversallibrary.store import SnapshotStore
 
 
 def test_page_snapshot(tmpdir):
@@ -52,6 +64,13 @@ def test_page_snapshot(tmpdir):
     assert len(elements.by_subtree(Selector("div"))) == 5
     assert len(elements.by_selector(Selector("p"))) == 3
 
+    assert snapshot.query_cache.hits == 1
+    assert snapshot.query_cache.misses == 2
+
+    assert sorted(snapshot.tags_by_uid) == [7, 12, 15, 19, 23]
+    assert elements.by_uid(15).tag is snapshot.tags_by_uid[15]
+    assert elements.by_uid(19).selector.css == "html>body>div>p:nth-of-type(1)"
+
     counter = 0.3
     for p in elements.by_selector(Selector("p")):
         p.metadata["a"] = counter
@@ -75,3 +94,180 @@ def test_page_snapshot(tmpdir):
     assert len(snapshot.elements) == len(snapshot_2.elements)
     assert len(snapshot.elements_metadata) == len(snapshot_2.elements_metadata)
     assert snapshot.screenshots == snapshot_2.screenshots
+
+
+def test_lazy_page_source(tmpdir):
+    source = '<html><body><div wtl-uid="1"><p wtl-uid="2"></p></div></body></html>'
+    metadata = [{"wtl_uid": 1, "wtl_parent_uid": -1}, {"wtl_uid": 2, "wtl_parent_uid": 1}]
+
+    snapshot = PageSnapshot(None, {}, metadata, bs4_parser="html.parser", raw_source=source)
+    assert not snapshot.is_parsed
+    assert snapshot.parse_milliseconds == 0.0
+    assert len(snapshot.elements.by_subtree(snapshot.elements.by_uid(1))) == 2
+    assert not snapshot.is_parsed
+
+    # Saving writes the raw source as-is
+    snapshot.save(tmpdir)
+    assert not snapshot.is_parsed
+    assert (tmpdir / "source.html").read_text(encoding="utf8") == source
+
+    assert snapshot.elements.by_uid(2).tag.name == "p"
+    assert snapshot.is_parsed
+    assert snapshot.parse_milliseconds > 0.0
+    assert isinstance(snapshot.page_source, bs4.BeautifulSoup)
+
+    snapshot_2 = PageSnapshot.load(tmpdir)
+    assert not snapshot_2.is_parsed
+    assert len(snapshot_2.elements.by_selector(Selector("p"))) == 1
+    assert snapshot_2.is_parsed
+
+
+def test_lazy_page_source_threads():
+    calls = []
+
+    def read_source():
+        calls.append(1)
+        time.sleep(0.05)
+        return '<html><body><p wtl-uid="1"></p></body></html>'
+
+    snapshot = PageSnapshot(None, {}, [{"wtl_uid": 1, "wtl_parent_uid": -1}], raw_source=read_source)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        sources = list(executor.map(lambda _: snapshot.page_source, range(4)))
+        elements = list(executor.map(lambda _: snapshot.elements, range(4)))
+
+    assert len(calls) == 1
+    assert all(source is sources[0] for source in sources)
+    assert all(e is elements[0] for e in elements)
+
+
+def test_pickle(tmpdir):
+    source = '<html><body><div wtl-uid="1"><p wtl-uid="2"></p></div></body></html>'
+    metadata = [{"wtl_uid": 1, "wtl_parent_uid": -1}, {"wtl_uid": 2, "wtl_parent_uid": 1}]
+    screenshot = Screenshot("full", Image.new("RGB", (4, 3), (255, 0, 0)))
+    PageSnapshot(
+        None, {"screenshots": ["full"]}, metadata, {"full": screenshot}, mhtml_source=b"mhtml", raw_source=source
+    ).save(tmpdir)
+
+    # Pending loaders are resolved when pickling
+    snapshot = PageSnapshot.load(tmpdir)
+    snapshot_2 = pickle.loads(pickle.dumps(snapshot))
+    assert not snapshot_2.is_parsed
+    assert snapshot_2.source_html == source
+    assert snapshot_2.mhtml_source == b"mhtml"
+    assert snapshot_2.screenshots["full"].image.getpixel((0, 0)) == (255, 0, 0)
+    assert snapshot_2.elements.by_uid(2).tag.name == "p"
+
+    snapshot.elements.by_uid(1).set_score("x", 0.5)
+    assert snapshot.elements.by_uid(1).tag.name == "div"
+    snapshot_3 = copy.deepcopy(snapshot)
+    assert snapshot_3.is_parsed
+    assert snapshot_3.elements_metadata == snapshot.elements_metadata
+    assert [e.wtl_uid for e in snapshot_3.elements.by_score("x")] == [1]
+    assert snapshot_3.elements.by_uid(2).tag.name == "p"
+
+
+def test_lxml_dom_backend():
+    pytest.importorskip("lxml")
+    source = '<html><body><div wtl-uid="1"><p wtl-uid="2"></p><p wtl-uid="3"></p></div></body></html>'
+    metadata = [
+        {"wtl_uid": 1, "wtl_parent_uid": -1},
+        {"wtl_uid": 2, "wtl_parent_uid": 1},
+        {"wtl_uid": 3, "wtl_parent_uid": 1},
+    ]
+
+    snapshot = PageSnapshot(None, {}, metadata, bs4_parser="html.parser", dom_backend="lxml", raw_source=source)
+    assert [e.wtl_uid for e in snapshot.elements.by_selector(Selector("div > p"))] == [2, 3]
+    assert snapshot.elements.by_uid(3).selector.css == "html>body>div>p:nth-of-type(2)"
+    assert not snapshot.is_parsed
+    assert snapshot.selectors == PageSnapshot(None, {}, metadata, bs4_parser="html.parser", raw_source=source).selectors
+
+
+def test_lazy_elements():
+    metadata = [{"wtl_uid": 1, "wtl_parent_uid": -1, "tag": "".join(["d", "iv"]), "display": "block"}]
+    snapshot = PageSnapshot(None, {}, metadata, raw_source="<html></html>")
+    assert "elements" not in snapshot.__dict__
+    assert snapshot.elements.by_uid(1).metadata["tag"] == "div"
+    assert "elements" in snapshot.__dict__
+
+    # Repeated strings are shared between elements and snapshots
+    metadata_2 = [{"wtl_uid": 1, "wtl_parent_uid": -1, "tag": "".join(["d", "iv"])}]
+    assert metadata_2[0]["tag"] is not metadata[0]["tag"]
+    PageSnapshot(None, {}, metadata_2, raw_source="<html></html>")
+    assert metadata_2[0]["tag"] is metadata[0]["tag"]
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip", None])
+def test_save_container(tmpdir, compression):
+    source = '<html><body><div wtl-uid="1"></div></body></html>'
+    metadata = [{"wtl_uid": 1, "wtl_parent_uid": -1}]
+    screenshot = Screenshot("full", Image.new("RGB", (4, 3), (255, 0, 0)))
+    page_metadata = {"url": "x", "screenshots": ["full"]}
+    snapshot = PageSnapshot(
+        None, page_metadata, metadata, {"full": screenshot}, mhtml_source=b"mhtml", raw_source=source
+    )
+
+    path = Path(tmpdir) / "3" / "tab"
+    snapshot.save(path, file_format="container", compression=compression)
+    assert not path.exists()
+    assert container.is_container(path.with_name("tab.wtl"))
+
+    snapshot_2 = PageSnapshot.load(path)
+    assert not snapshot_2.screenshots["full"].is_loaded
+    assert snapshot_2.source_html == source
+    assert snapshot_2.page_metadata == snapshot.page_metadata
+    assert snapshot_2.elements_metadata == metadata
+    assert snapshot_2.screenshots["full"].image.getpixel((3, 2)) == (255, 0, 0)
+    assert snapshot_2.mhtml_source == b"mhtml"
+    assert PageSnapshot.load(path.with_name("tab.wtl")).page_metadata == snapshot.page_metadata
+
+
+def test_lazy_load(tmpdir):
+    source = '<html><body><div wtl-uid="1"></div></body></html>'
+    page_metadata = {"screenshots": ["full"]}
+    screenshot = Screenshot("full", Image.new("RGB", (4, 3), (0, 0, 255)))
+    PageSnapshot(None, page_metadata, [], {"full": screenshot}, mhtml_source=b"mhtml", raw_source=source).save(tmpdir)
+
+    snapshot = PageSnapshot.load(tmpdir)
+    assert not snapshot.screenshots["full"].is_loaded
+    assert snapshot.screenshots["full"].width == 4
+    assert snapshot.screenshots["full"].is_loaded
+    assert "mhtml_source" not in snapshot.__dict__
+    assert snapshot.mhtml_source == b"mhtml"
+
+    # The page source is only read when needed
+    (tmpdir / "source.html").write_text("<html></html>", encoding="utf8")
+    assert snapshot.source_html == "<html></html>"
+
+
+@pytest.mark.parametrize("file_format", ["directory", "container", "store"])
+def test_lazy_load_pickle(tmpdir, file_format):
+    source = '<html><body><div wtl-uid="1"></div></body></html>'
+    page_metadata = {"screenshots": ["full"]}
+    screenshot = Screenshot("full", Image.new("RGB", (4, 3), (0, 0, 255)))
+    path = Path(tmpdir) / "tab"
+    store = SnapshotStore(Path(tmpdir) / "store") if file_format == "store" else None
+    PageSnapshot(None, page_metadata, [], {"full": screenshot}, mhtml_source=b"mhtml", raw_source=source).save(
+        path, file_format=file_format, store=store
+    )
+
+    # The loaders can be pickled, e.g. to hand a loaded snapshot to another process
+    snapshot = PageSnapshot.load(path)
+    assert pickle.loads(pickle.dumps(snapshot.raw_source))() == source
+    assert pickle.loads(pickle.dumps(snapshot.mhtml_loader))() == b"mhtml"
+    assert pickle.loads(pickle.dumps(snapshot.screenshots["full"])).width == 4
+
+
+@pytest.mark.parametrize("file_format", ["directory", "container"])
+def test_save_encoded_screenshots(tmpdir, file_format):
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 3), (255, 0, 0)).save(buffer, format="JPEG")
+    screenshots = {"first": Screenshot.from_bytes("first", buffer.getvalue())}
+    page_metadata = {"url": "x", "screenshots": ["first"]}
+
+    path = Path(tmpdir) / "tab"
+    PageSnapshot(None, page_metadata, [], screenshots, raw_source="<html></html>").save(path, file_format=file_format)
+    if file_format == "directory":
+        assert (path / "first.jpg").read_bytes() == buffer.getvalue()
+
+    snapshot = PageSnapshot.load(path)
+    assert snapshot.screenshots["first"].width == 4
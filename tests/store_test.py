@@ -0,0 +1,79 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import numpy as np
+from PIL import Image
+
+from webtraversallibrary.screenshot import Screenshot
+from webtraversallibrary.snapshot import PageSnapshot
+from webtraversallibrary.store import SnapshotStore
+
+
+def test_put_get(tmp_path):
+    store = SnapshotStore(tmp_path, compression="gzip")
+    descriptor = store.put(b"hello")
+    assert store.put(b"hello") == descriptor
+    assert store.put(b"hello", codec="none") != descriptor
+    assert store.get(descriptor) == b"hello"
+    assert store.objects_written == 2
+    assert store.objects_reused == 1
+
+
+def test_image_deltas(tmp_path):
+    store = SnapshotStore(tmp_path, screenshot_deltas=True, max_delta_chain=2)
+    rng = np.random.default_rng(0)
+    images = []
+    pixels = rng.integers(0, 255, (20, 10, 3), dtype=np.uint8)
+    for i in range(5):
+        pixels = pixels.copy()
+        pixels[i, i] = [i, i, i]
+        images.append(Image.fromarray(pixels))
+
+    descriptors = [store.put_image("full", image) for image in images]
+    assert [d.get("depth", 0) for d in descriptors] == [0, 1, 2, 0, 1]
+    for image, descriptor in zip(images, descriptors):
+        assert np.array_equal(np.asarray(store.get_image(descriptor)), np.asarray(image))
+
+    # Images of another size or name start a new chain
+    assert "base" not in store.put_image("full", Image.new("RGB", (5, 5)))
+    assert "base" not in store.put_image("first", images[-1])
+
+    grayscale = Image.new("L", (3, 2), 7)
+    assert store.get_image(store.put_image("gray", grayscale)).getpixel((2, 1)) == 7
+
+
+def test_save_store(tmp_path):
+    store = SnapshotStore(tmp_path / "objects", compression="gzip", screenshot_deltas=True)
+    metadata = [{"wtl_uid": 1, "wtl_parent_uid": -1}]
+    screenshot = Image.new("RGB", (4, 3), (0, 255, 0))
+
+    for step in range(3):
+        page_metadata = {"url": "x", "screenshots": ["full"]}
+        snapshot = PageSnapshot(
+            None, page_metadata, metadata, {"full": Screenshot("full", screenshot)}, raw_source="<html></html>"
+        )
+        snapshot.save(tmp_path / str(step) / "tab", file_format="store", store=store)
+
+    assert (tmp_path / "2" / "tab.snapshot.json").is_file()
+    # Everything but the first screenshot delta (which is all zeros) is reused after the first step
+    assert store.objects_written == 5
+    assert store.objects_reused == 7
+
+    snapshot_2 = PageSnapshot.load(tmp_path / "2" / "tab")
+    assert snapshot_2.source_html == "<html></html>"
+    assert snapshot_2.elements_metadata == metadata
+    assert snapshot_2.screenshots["full"].image.getpixel((3, 2)) == (0, 255, 0)
@@ -0,0 +1,79 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+import bs4
+import numpy as np
+
+import webtraversallibrary as wtl
+from webtraversallibrary.table import ElementTable
+
+
+def _metadata(uid, x, y, width, height, **kwargs):
+    return {
+        "wtl_uid": uid,
+        "wtl_parent_uid": uid - 1,
+        "location": {"x": x, "y": y},
+        "size": {"width": width, "height": height},
+        **kwargs,
+    }
+
+
+def test_table_columns():
+    table = ElementTable(
+        [
+            _metadata(0, 0, 0, 100, 200, display="block", visibility="visible", font_size="16px"),
+            _metadata(1, 10, 20, 30, 40, display="none", visibility="visible", fixed_pos=True),
+            {"x": 0.5},
+        ]
+    )
+
+    assert len(table) == 3
+    assert list(table.right[:2]) == [100, 40]
+    assert list(table.area[:2]) == [20000, 1200]
+    assert np.isnan(table.x[2])
+    assert table.font_size[0] == 16.0 and np.isnan(table.font_size[1])
+    assert list(table.fixed_pos) == [False, True, False]
+    assert list(table.wtl_uid) == [0, 1, -1]
+    assert list(table.equals("display", "none")) == [False, True, False]
+    assert not table.equals("display", "flex").any()
+    assert list(table.isin("visibility", ["visible", "hidden"])) == [True, True, False]
+    assert list(table.intersects(wtl.Rectangle.from_list(0, 30, 50, 50))) == [True, True, False]
+    assert list(table.inside(wtl.Rectangle.from_list(0, 0, 50, 80))) == [False, True, False]
+    assert list(np.nan_to_num(table.score("x"))) == [0.0, 0.0, 0.5]
+
+
+def test_elements_by_mask():
+    metadata = [
+        _metadata(0, 0, 0, 375, 2000, visibility="visible"),
+        _metadata(1, 0, 100, 60, 60, visibility="visible"),
+        _metadata(2, 0, 900, 60, 60, visibility="visible"),
+        _metadata(3, 0, 200, 60, 60, visibility="hidden"),
+    ]
+    snapshot = wtl.PageSnapshot(bs4.BeautifulSoup("", "html5lib"), {}, metadata)
+    table = snapshot.table
+
+    viewport = wtl.Rectangle.from_list(0, 0, 375, 812)
+    mask = (table.width > 50) & (table.height > 50) & table.inside(viewport) & table.equals("visibility", "visible")
+    assert [e.wtl_uid for e in snapshot.elements.by_mask(mask)] == [1]
+
+    snapshot.elements.by_uid(2).set_score("big", 1.0)
+    snapshot.elements.by_uid(3).set_score("big", 0.5)
+    assert [e.wtl_uid for e in snapshot.elements.by_mask(table.score("big") > 0.7)] == [2]
+
+    subset = snapshot.elements.by_score("big")
+    assert [e.wtl_uid for e in subset.by_mask(table.width < 100)] == [2, 3]
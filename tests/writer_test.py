@@ -0,0 +1,137 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+import threading
+
+import pytest
+from PIL import Image
+
+from webtraversallibrary.error import SnapshotSaveError
+from webtraversallibrary.screenshot import Screenshot
+from webtraversallibrary.snapshot import PageSnapshot
+from webtraversallibrary.writer import SnapshotWriter
+
+
+class FakeSnapshot:
+    def __init__(self, release: threading.Event = None, fail: bool = False):
+        self.release = release
+        self.fail = fail
+        self.saved = []
+
+    def detached_copy(self):
+        return self
+
+    def save(self, path, **kwargs):
+        if self.release:
+            self.release.wait(timeout=5)
+        if self.fail:
+            raise OSError("disk full")
+        self.saved.append((path, kwargs, threading.current_thread().name))
+
+
+def test_writer_saves_in_background():
+    writer = SnapshotWriter(workers=2, max_pending=4)
+    snapshots = [FakeSnapshot() for _ in range(10)]
+    for i, snapshot in enumerate(snapshots):
+        assert writer.submit(snapshot, f"path_{i}", file_format="container")
+    writer.close()
+
+    assert writer.pending == 0
+    for i, snapshot in enumerate(snapshots):
+        path, kwargs, thread_name = snapshot.saved[0]
+        assert path == f"path_{i}"
+        assert kwargs == {"file_format": "container"}
+        assert thread_name.startswith("wtl-writer")
+
+
+def test_writer_errors():
+    writer = SnapshotWriter()
+    writer.submit(FakeSnapshot(fail=True), "a")
+    writer.submit(FakeSnapshot(), "b")
+    writer.flush()
+
+    with pytest.raises(SnapshotSaveError, match="to a"):
+        writer.raise_errors()
+    writer.raise_errors()
+
+    writer.submit(FakeSnapshot(fail=True), "c")
+    with pytest.raises(SnapshotSaveError):
+        writer.close()
+
+
+@pytest.mark.parametrize("backpressure", ["drop", "sync"])
+def test_writer_backpressure(backpressure):
+    release = threading.Event()
+    writer = SnapshotWriter(max_pending=1, backpressure=backpressure)
+    blocked = FakeSnapshot(release)
+    writer.submit(blocked, "a")
+    assert writer.pending == 1
+
+    snapshot = FakeSnapshot()
+    assert writer.submit(snapshot, "b") == (backpressure == "sync")
+    assert writer.dropped == (backpressure == "drop")
+    if backpressure == "sync":
+        assert snapshot.saved[0][2] == threading.current_thread().name
+
+    release.set()
+    writer.close()
+    assert blocked.saved
+
+
+def test_writer_detaches_snapshots(tmp_path):
+    source = '<html><body><div wtl-uid="1"></div></body></html>'
+    screenshot = Screenshot("full", Image.new("RGB", (4, 3), (255, 0, 0)))
+    PageSnapshot(None, {"screenshots": ["full"]}, [{"wtl_uid": 1}], {"full": screenshot}, raw_source=source).save(
+        tmp_path / "original", file_format="container"
+    )
+
+    writer = SnapshotWriter(workers=2)
+    snapshot = PageSnapshot.load(tmp_path / "original")
+    for i in range(4):
+        writer.submit(snapshot, tmp_path / str(i), file_format="container")
+    # Loading and drawing on the snapshot while it is being saved does not change what is saved
+    assert snapshot.elements.by_uid(1).tag.name == "div"
+    snapshot.screenshots["full"].image.putpixel((0, 0), (0, 0, 255))
+    writer.close()
+
+    for i in range(4):
+        saved = PageSnapshot.load(tmp_path / str(i))
+        assert saved.source_html == source
+        assert saved.screenshots["full"].image.getpixel((0, 0)) == (255, 0, 0)
+
+
+def test_writer_copies_metadata(tmp_path):
+    source = '<html><body><div wtl-uid="1"><p wtl-uid="2"></p></div></body></html>'
+    metadata = [{"wtl_uid": 1, "wtl_parent_uid": -1}, {"wtl_uid": 2, "wtl_parent_uid": 1}]
+    snapshot = PageSnapshot(None, {"url": "a"}, metadata, raw_source=source)
+
+    release = threading.Event()
+    writer = SnapshotWriter(workers=1)
+    writer.submit(FakeSnapshot(release), "blocked")
+    writer.submit(snapshot, tmp_path / "saved")
+
+    # Scoring and sorting while the save is queued does not change what is saved
+    for i, element in enumerate(snapshot.elements):
+        element.set_score("x", i, raw_score=i * 2)
+    snapshot.elements.sort_by("y", reverse=True)
+    snapshot.page_metadata["url"] = "b"
+    release.set()
+    writer.close()
+
+    saved = PageSnapshot.load(tmp_path / "saved")
+    assert saved.elements_metadata == [{"wtl_uid": 1, "wtl_parent_uid": -1}, {"wtl_uid": 2, "wtl_parent_uid": 1}]
+    assert saved.page_metadata["url"] == "a"
@@ -33,7 +33,7 @@ from typing import Union
 from .color import Color
 from .geometry import Point
 from .selector import Selector
-from .snapshot import Elements, PageElement
+from .snapshot import Elements, PageElement, page_dom, query_selector
 
 
 @dataclass(frozen=True)
@@ -88,8 +88,7 @@ class Actions(list):
                 action
                 for action in self
                 if isinstance(action, ElementAction)
-                and name in action.target.raw_scores  # type: ignore
-                and action.target.raw_scores[name] > limit  # type: ignore
+                and action.target.metadata.get("raw_scores", {}).get(name, limit) > limit  # type: ignore
             ]
         )
 
@@ -109,16 +108,17 @@ class Actions(list):
         if not element_actions:
             return Actions([])
 
-        tags = set(element_actions[0].target.page.page_source.html.select(selector.css))
+        tags, wtl_uids = query_selector(element_actions[0].target.page, selector)
         if not tags:
             return Actions([])
 
-        wtl_uids = set(int(x.attrs["wtl-uid"]) for x in tags if "wtl-uid" in x.attrs)
         actions = Actions([action for action in element_actions if action.target.wtl_uid in wtl_uids])
 
-        # Falls back on BS4 tags if selector matches something that hasn't been snapshotted yet
+        # Falls back on DOM nodes if selector matches something that hasn't been snapshotted yet
         if not actions:
-            actions = Actions([action for action in element_actions if action.target.tag in tags])
+            dom = page_dom(element_actions[0].target.page)
+            tag_ids = {id(tag) for tag in tags}
+            actions = Actions([a for a in element_actions if id(dom.by_uid(a.target.wtl_uid)) in tag_ids])
 
         return actions
 
@@ -126,7 +126,7 @@ class Actions(list):
         """
         Sorts by a certain action (raw) score. If given name does not exist the element gets (raw) score 0.
         """
-        self.sort(key=lambda action: action.target.raw_scores.get(name, 0), reverse=reverse)
+        self.sort(key=lambda action: action.target.metadata.get("raw_scores", {}).get(name, 0), reverse=reverse)
         return self
 
     def unique(self) -> Action:
@@ -150,8 +150,9 @@ class ElementAction(Action):
         selector = self.target
         tags = elements.by_selector(selector)
         assert tags, f"Failed to perform {self.__class__.__name__}: Selector '{selector.css}' matches no tags"
-        page_element = replace(tags[0])
-        object.__setattr__(page_element, "selector", selector)
+        # A new element for the same metadata, reporting the stored selector rather than a generated one
+        page_element = PageElement(tags[0].page, tags[0].metadata)
+        object.__setattr__(page_element, "_selector", selector)
         return replace(self, target=page_element)
 
     @property
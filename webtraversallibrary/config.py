@@ -28,6 +28,8 @@ from typing import Any, Dict, Iterable, List, Union
 
 from prodict import Prodict  # pylint: disable=syntax-error
 
+from .container import CODECS
+from .dom import BACKENDS as DOM_BACKENDS
 from .driver_check import Drivers, is_driver_installed
 
 logger = logging.getLogger("wtl")
@@ -41,6 +43,7 @@ class Config:
     REQUIRED_PARAMS = dict(
         [
             ("bs_html_parser", str),
+            ("dom_backend", str),
             ("timeout", int),
             ("actions.abort.close", bool),
             ("scraping.disable_animations", bool),
@@ -55,6 +58,11 @@ class Config:
             ("scraping.mhtml_timeout", int),
             ("scraping.history", bool),
             ("scraping.full_history", bool),
+            ("scraping.incremental", bool),
+            ("scraping.metadata_chunk_size", int),
+            ("scraping.fields", list),
+            ("scraping.skip_hidden_subtrees", bool),
+            ("scraping.engine", str),
             ("scrolling.max_page_height", int),
             ("browser.browser", str),
             ("browser.useragent", str),
@@ -72,7 +80,15 @@ class Config:
             ("debug.live_delay", float),
             ("debug.live_annotation", bool),
             ("debug.screenshots", bool),
+            ("debug.screenshot_format", str),
+            ("debug.screenshot_quality", int),
             ("debug.save", bool),
+            ("debug.save_format", str),
+            ("debug.save_compression", str),
+            ("debug.save_screenshot_deltas", bool),
+            ("debug.save_workers", int),
+            ("debug.save_queue", int),
+            ("debug.save_backpressure", str),
             ("debug.preserve_window", bool),
             ("debug.action_highlight_color", str),
         ]
@@ -156,13 +172,14 @@ class Config:
         assert cfg.javascript.warning in LOG_LEVELS
         assert cfg.javascript.severe in LOG_LEVELS
         assert cfg.timeout >= 0
-        assert cfg.scraping.attempts >= 1
-        assert cfg.scraping.page_load_timeout >= 0
+        self._validate_scraping()
         assert cfg.scrolling.max_page_height >= 0
         assert cfg.browser.width >= 1
         assert cfg.browser.height >= 1
         assert cfg.debug.live_delay >= 0
         assert cfg.browser.browser in BROWSERS
+        assert cfg.dom_backend in DOM_BACKENDS
+        self._validate_saving()
 
         if cfg.browser.browser == "chrome":
             assert is_driver_installed(Drivers.GOOGLE_CHROME) or is_driver_installed(Drivers.CHROMIUM)
@@ -171,6 +188,27 @@ class Config:
             assert is_driver_installed(Drivers.FIREFOX)
             assert is_driver_installed(Drivers.GECKODRIVER)
 
+    def _validate_scraping(self):
+        """Checks the settings used for loading and scraping pages."""
+        cfg = self._instance.scraping
+
+        assert cfg.attempts >= 1
+        assert cfg.page_load_timeout >= 0
+        assert cfg.metadata_chunk_size >= 0
+        assert cfg.engine in ["js", "cdp"]
+
+    def _validate_saving(self):
+        """Checks the formats, codecs and writer settings used for screenshots and snapshots."""
+        cfg = self._instance.debug
+
+        assert cfg.screenshot_format in ["png", "jpeg", "webp"]
+        assert 0 <= cfg.screenshot_quality <= 100
+        assert cfg.save_format in ["directory", "container", "store"]
+        assert cfg.save_compression in [""] + CODECS
+        assert cfg.save_workers >= 0
+        assert cfg.save_queue >= 1
+        assert cfg.save_backpressure in ["block", "sync", "drop"]
+
     @staticmethod
     def default(cfg: List[Union[str, Path, dict]] = None) -> Config:
         """Creates a Config object based on all default values"""
@@ -0,0 +1,207 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Single-file container format for saved snapshots.
+
+A container holds a number of named, individually compressed sections followed by an index, so that a single
+section (say, the element metadata or one screenshot) can be read without decoding the rest of the file.
+
+Layout::
+
+    MAGIC | section | section | ... | index (JSON) | index offset (uint64, little-endian) | MAGIC
+
+Sections are compressed with zstd if the optional ``zstandard`` package is installed, otherwise with gzip.
+Data that is already compressed, such as PNG screenshots, is best stored with the "none" codec.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, List
+
+from .error import Error
+
+try:
+    import zstandard
+
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+MAGIC = b"WTLSNAP1"
+SUFFIX = ".wtl"
+CODECS = ["none", "gzip", "zstd"]
+DEFAULT_CODEC = "zstd" if HAS_ZSTD else "gzip"
+
+_FOOTER = struct.Struct("<Q8s")
+
+
+class ContainerError(Error):
+    """Any error related to reading or writing snapshot containers."""
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    """Compresses data with the given codec, one of :data:`CODECS`."""
+    if codec == "none":
+        return data
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if codec == "zstd":
+        if not HAS_ZSTD:
+            raise ContainerError("The zstd codec requires the zstandard package")
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    raise ContainerError(f"Unknown codec '{codec}'")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """Reverses :func:`compress`."""
+    if codec == "none":
+        return data
+    if codec == "gzip":
+        return gzip.decompress(data)
+    if codec == "zstd":
+        if not HAS_ZSTD:
+            raise ContainerError("Reading zstd compressed sections requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ContainerError(f"Unknown codec '{codec}'")
+
+
+def read_section(path: Path, name: str) -> bytes:
+    """Reads a single section of the container at the given path."""
+    with ContainerReader(path) as reader:
+        return reader.read(name)
+
+
+def is_container(path: Path) -> bool:
+    """Returns True if the given path is a file starting with the container magic bytes."""
+    if not path.is_file():
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class ContainerWriter:
+    """
+    Writes a container file section by section. The file is written under a temporary name and
+    only moved into place when the writer is closed, so readers never see a partial container.
+
+    Use as a context manager::
+
+        with ContainerWriter(path) as container:
+            container.add("page_metadata.json", data)
+    """
+
+    def __init__(self, path: Path, codec: str = DEFAULT_CODEC):
+        if codec not in CODECS:
+            raise ContainerError(f"Unknown codec '{codec}'")
+        self.path = path
+        self.codec = codec
+        self.sections: Dict[str, dict] = {}
+        self._temp_path = path.with_name(path.name + ".tmp")
+        self._file: BinaryIO = open(self._temp_path, "wb")  # pylint: disable=consider-using-with
+        self._file.write(MAGIC)
+
+    def add(self, name: str, data: bytes, codec: str = None):
+        """Compresses and appends a section. Uses the codec of the writer unless another one is given."""
+        if name in self.sections:
+            raise ContainerError(f"Duplicate section '{name}'")
+        codec = codec or self.codec
+        compressed = compress(data, codec)
+        self.sections[name] = {"offset": self._file.tell(), "length": len(compressed), "codec": codec}
+        self._file.write(compressed)
+
+    def close(self):
+        """Writes the index and moves the file into place."""
+        index_offset = self._file.tell()
+        self._file.write(json.dumps({"sections": self.sections}).encode("utf8"))
+        self._file.write(_FOOTER.pack(index_offset, MAGIC))
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+
+    def abort(self):
+        """Discards everything written so far."""
+        self._file.close()
+        os.remove(self._temp_path)
+
+    def __enter__(self) -> ContainerWriter:
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ContainerReader:
+    """
+    Reads individual sections of a container file. Only the index is read when opening the container.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file: BinaryIO = open(path, "rb")  # pylint: disable=consider-using-with
+        try:
+            self.sections = self._read_index()
+        except Exception:
+            self._file.close()
+            raise
+
+    def _read_index(self) -> Dict[str, dict]:
+        if self._file.read(len(MAGIC)) != MAGIC:
+            raise ContainerError(f"{self.path} is not a snapshot container")
+        footer_offset = -1 * _FOOTER.size
+        try:
+            self._file.seek(footer_offset, os.SEEK_END)
+        except OSError:
+            raise ContainerError(f"{self.path} is truncated or corrupt") from None
+        index_end = self._file.tell()
+        index_offset, magic = _FOOTER.unpack(self._file.read(_FOOTER.size))
+        if magic != MAGIC:
+            raise ContainerError(f"{self.path} is truncated or corrupt")
+        self._file.seek(index_offset)
+        return json.loads(self._file.read(index_end - index_offset).decode("utf8"))["sections"]
+
+    @property
+    def names(self) -> List[str]:
+        """Returns the names of all sections, in the order they were written."""
+        return list(self.sections)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sections
+
+    def read(self, name: str) -> bytes:
+        """Reads and decompresses a single section."""
+        if name not in self.sections:
+            raise KeyError(name)
+        section = self.sections[name]
+        self._file.seek(section["offset"])
+        return decompress(self._file.read(section["length"]), section["codec"])
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> ContainerReader:
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -0,0 +1,196 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+
+"""
+DOM backends used by snapshots to answer structural queries (selector matching, selector generation, subtrees)
+about the page source. The default backend uses BeautifulSoup, the same tree exposed as ``PageSnapshot.page_source``.
+The lxml backend parses the raw HTML with ``lxml.html`` instead and relies on compiled XPath and native parent
+pointers, which is considerably faster on large pages. It requires the optional ``lxml`` and ``cssselect`` packages.
+"""
+from __future__ import annotations
+
+import functools
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, FrozenSet, List, Set, Tuple
+
+import bs4
+
+from .selector import Selector
+
+try:
+    import cssselect
+    import lxml.etree
+    import lxml.html
+
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+logger = logging.getLogger("wtl")
+
+BACKENDS = ["bs4", "lxml"]
+
+
+class DomBackend(ABC):
+    """Structural queries about a single page source."""
+
+    @abstractmethod
+    def by_uid(self, wtl_uid: int) -> Any:
+        """Returns the node with the given wtl-uid, or None."""
+
+    @abstractmethod
+    def query(self, selector: Selector) -> Tuple[List[Any], FrozenSet[int]]:
+        """Returns all nodes below the root element matching the selector, and the wtl-uids among them."""
+
+    @abstractmethod
+    def selector(self, wtl_uid: int) -> Selector:
+        """Computes the selector of the node with the given wtl-uid, see :func:`Selector.build`."""
+
+    @abstractmethod
+    def selectors(self) -> Dict[int, Selector]:
+        """Computes the selectors of all nodes with a wtl-uid, see :func:`Selector.build_all`."""
+
+    @abstractmethod
+    def subtree_uids(self, wtl_uid: int) -> Set[int]:
+        """Returns the wtl-uids of all (strict) descendants of the node with the given wtl-uid."""
+
+    @staticmethod
+    def _uids(nodes: List[Any], get: Callable[[Any], str]) -> FrozenSet[int]:
+        return frozenset(int(get(node)) for node in nodes if get(node) is not None)
+
+
+class BeautifulSoupBackend(DomBackend):
+    """DOM backend working on a parsed bs4.BeautifulSoup."""
+
+    def __init__(self, soup: bs4.BeautifulSoup):
+        self.soup = soup
+        self._tags_by_uid: Dict[int, bs4.Tag] = None
+
+    @property
+    def tags_by_uid(self) -> Dict[int, bs4.Tag]:
+        """Maps each wtl-uid to its bs4.Tag, built with a single pass over the soup on first access."""
+        if self._tags_by_uid is None:
+            self._tags_by_uid = {}
+            for tag in self.soup.find_all(attrs={"wtl-uid": True}):
+                try:
+                    self._tags_by_uid.setdefault(int(tag.attrs["wtl-uid"]), tag)
+                except ValueError:
+                    logger.warning(f"Ignoring non-integer wtl-uid={tag.attrs['wtl-uid']}")
+        return self._tags_by_uid
+
+    def by_uid(self, wtl_uid: int) -> bs4.Tag:
+        return self.tags_by_uid.get(wtl_uid)
+
+    def query(self, selector: Selector) -> Tuple[List[bs4.Tag], FrozenSet[int]]:
+        tags = selector.select(self.soup.html)
+        return tags, self._uids(tags, lambda tag: tag.attrs.get("wtl-uid"))
+
+    def selector(self, wtl_uid: int) -> Selector:
+        return Selector.build(self.soup, wtl_uid, self.tags_by_uid)
+
+    def selectors(self) -> Dict[int, Selector]:
+        return Selector.build_all(self.soup)
+
+    def subtree_uids(self, wtl_uid: int) -> Set[int]:
+        return set(self._uids(self.by_uid(wtl_uid).find_all(attrs={"wtl-uid": True}), lambda tag: tag["wtl-uid"]))
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_xpath(css: str) -> "lxml.etree.XPath":
+    """
+    Translates a CSS selector to a compiled XPath expression, with caching shared by all snapshots.
+    Raises ``cssselect.SelectorError`` for selectors that cssselect does not support.
+    """
+    return lxml.etree.XPath(cssselect.HTMLTranslator().css_to_xpath(css))
+
+
+class LxmlBackend(DomBackend):
+    """
+    DOM backend parsing the raw page source with ``lxml.html``.
+    Selectors that cssselect cannot translate are answered by the given fallback backend instead.
+    """
+
+    def __init__(self, html: str, fallback: Callable[[], DomBackend] = None):
+        if not HAS_LXML:
+            raise ImportError("The lxml DOM backend requires the lxml and cssselect packages")
+
+        try:
+            self.root = lxml.html.document_fromstring(html)
+        except ValueError:
+            # lxml refuses unicode strings with an encoding declaration
+            self.root = lxml.html.document_fromstring(html.encode("utf8"))
+
+        self._fallback = fallback
+        self._by_uid: Dict[int, Any] = {}
+        for node in self.root.iter(lxml.etree.Element):
+            wtl_uid = node.get("wtl-uid")
+            if wtl_uid is not None:
+                try:
+                    self._by_uid.setdefault(int(wtl_uid), node)
+                except ValueError:
+                    logger.warning(f"Ignoring non-integer wtl-uid={wtl_uid}")
+
+    def by_uid(self, wtl_uid: int) -> Any:
+        return self._by_uid.get(wtl_uid)
+
+    def query(self, selector: Selector) -> Tuple[List[Any], FrozenSet[int]]:
+        try:
+            xpath = compile_xpath(selector.css)
+        except cssselect.SelectorError:
+            if self._fallback is None:
+                raise
+            logger.debug(f"Selector '{selector.css}' not supported by cssselect, falling back")
+            return self._fallback().query(selector)
+
+        nodes = [node for node in xpath(self.root) if node is not self.root]
+        return nodes, self._uids(nodes, lambda node: node.get("wtl-uid"))
+
+    def selector(self, wtl_uid: int) -> Selector:
+        node = self.by_uid(wtl_uid)
+        if node is None:
+            logger.error("Invalid wtl-uid given to Selector.build, returning blank selector")
+            return Selector(css="bad_wtl_uid_no_matches", xpath="bad_wtl_uid_no_matches")
+
+        css_components, xpath_components = [], []
+        while node is not None:
+            parent = node.getparent()
+            siblings = [node] if parent is None else [child for child in parent if child.tag == node.tag]
+            name = Selector._safe_tag_name(node.tag)  # pylint: disable=protected-access
+            if len(siblings) == 1:
+                css_components.append(name)
+                xpath_components.append(name)
+            else:
+                index = 1 + siblings.index(node)
+                css_components.append(f"{name}:nth-of-type({index})")
+                xpath_components.append(f"{name}[{index}]")
+            node = parent
+
+        return Selector(css=">".join(reversed(css_components)), xpath="/" + "/".join(reversed(xpath_components)))
+
+    def selectors(self) -> Dict[int, Selector]:
+        return Selector.build_tree(
+            None,
+            children=lambda node: [self.root] if node is None else list(node.iterchildren(lxml.etree.Element)),
+            name=lambda node: node.tag,
+            wtl_uid=lambda node: node.get("wtl-uid"),
+        )
+
+    def subtree_uids(self, wtl_uid: int) -> Set[int]:
+        descendants = list(self.by_uid(wtl_uid).iterdescendants(lxml.etree.Element))
+        return set(self._uids(descendants, lambda node: node.get("wtl-uid")))
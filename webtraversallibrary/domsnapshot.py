@@ -0,0 +1,364 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Element extraction through the Chrome DevTools Protocol: ``DOMSnapshot.captureSnapshot`` returns the DOM, layout
+boxes and computed styles of a page in one native call, which is converted here into the same element metadata
+as returned by :func:`JavascriptWrapper.get_element_metadata`. Only available in Chromium based browsers.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from .webdrivers import send
+
+COMPUTED_STYLES = [
+    "display",
+    "visibility",
+    "position",
+    "font-weight",
+    "font-size",
+    "background",
+    "background-image",
+    "white-space",
+    "text-transform",
+]
+"""The computed styles requested for each layout node, in the order they are returned."""
+
+ELEMENT_NODE = 1
+TEXT_NODE = 3
+
+BLOCK_DISPLAYS = {"block", "flex", "grid", "list-item", "table", "table-caption", "flow-root"}
+DEFAULT_BACKGROUND = "rgba(0, 0, 0, 0) none repeat scroll 0% 0% / auto padding-box border-box"
+DEFAULT_STYLE = {"display": "none", "background": DEFAULT_BACKGROUND, "background-image": "none", "position": "static"}
+
+# Text of a node as built by the innerText algorithm, see element_metadata.js:
+# (text without collapsible spaces at its ends, required line breaks before, after, space before, space after)
+TextItem = Tuple[str, int, int, bool, bool]
+EMPTY_TEXT: TextItem = ("", 0, 0, False, False)
+
+
+def capture_snapshot(driver: WebDriver) -> Dict[str, Any]:
+    """Captures a DOM snapshot of the current page with the computed styles needed for element metadata."""
+    return send(driver, "DOMSnapshot.captureSnapshot", {"computedStyles": COMPUTED_STYLES})
+
+
+def _rare(data: Optional[dict]) -> Dict[int, Any]:
+    """Decodes the Rare*Data structures of a snapshot, which hold values for a few node indices only."""
+    if not data:
+        return {}
+    return dict(zip(data["index"], data.get("value", [True] * len(data["index"]))))
+
+
+def _join_texts(items: Iterable[TextItem]) -> TextItem:
+    parts: List[str] = []
+    lead, space_before = 0, False
+    pending_breaks, pending_space = 0, False
+
+    for text, item_lead, item_trail, item_space_before, item_space_after in items:
+        if not text:
+            if parts:
+                pending_breaks = max(pending_breaks, item_lead)
+                pending_space = pending_space or item_space_after
+            else:
+                lead = max(lead, item_lead)
+                space_before = space_before or item_space_before
+            continue
+
+        if parts:
+            # Spaces at the start or end of a line are removed, and a run of line breaks keeps the longest
+            breaks = max(pending_breaks, item_lead)
+            parts.append("\n" * breaks if breaks else (" " if pending_space or item_space_before else ""))
+        else:
+            lead = max(lead, item_lead)
+            space_before = space_before or item_space_before
+        parts.append(text)
+        pending_breaks, pending_space = item_trail, item_space_after
+
+    if not parts:
+        return ("", lead, lead, space_before, space_before)
+    return ("".join(parts), lead, pending_breaks, space_before, pending_space)
+
+
+def _text_node_text(data: str, style: Dict[str, str]) -> TextItem:
+    if style.get("visibility") != "visible" or not data:
+        return EMPTY_TEXT
+
+    transform = style.get("text-transform")
+    if transform == "uppercase":
+        data = data.upper()
+    elif transform == "lowercase":
+        data = data.lower()
+    elif transform == "capitalize":
+        data = re.sub(r"\b\w", lambda m: m.group(0).upper(), data)
+
+    white_space = style.get("white-space", "normal")
+    if white_space in ("pre", "pre-wrap", "break-spaces"):
+        return (data, 0, 0, False, False)
+    if white_space == "pre-line":
+        data = re.sub(r" ?\n ?", "\n", re.sub(r"[ \t]+", " ", data))
+    else:
+        data = re.sub(r"[ \t\n\r\f]+", " ", data)
+    return (data.strip(" "), 0, 0, data.startswith(" "), data.endswith(" "))
+
+
+def _element_text(tag: str, style: Dict[str, str], content: TextItem, has_next_sibling: bool) -> TextItem:
+    """What an element adds to the text of its parent, given the text of its own content."""
+    display = style.get("display")
+    if tag == "br":
+        return ("\n", 0, 0, False, False)
+    if display == "table-cell" and has_next_sibling:
+        return _join_texts([content, ("\t", 0, 0, False, False)])
+    if display == "table-row" and has_next_sibling:
+        return _join_texts([content, ("\n", 0, 0, False, False)])
+
+    breaks = 2 if tag == "p" else (1 if display in BLOCK_DISPLAYS else 0)
+    if not breaks:
+        return content
+    return (content[0], max(content[1], breaks), max(content[2], breaks), False, False)
+
+
+@dataclass
+class _DomTables:
+    """The nodes of the main document of a DOM snapshot, decoded into per-node tables indexed by node."""
+
+    strings: List[str]
+    parents: List[int]
+    node_types: List[int]
+    names: List[str]
+    values: List[int]
+    input_values: Dict[int, Any]
+    # Light DOM element children and text nodes of each node, in document order
+    children: List[List[int]]
+    attributes: List[Dict[str, str]]
+    # Computed styles and bounds of the first layout object of each node
+    styles: Dict[int, Dict[str, str]]
+    bounds: Dict[int, List[float]]
+
+    def string(self, index: int) -> Optional[str]:
+        return self.strings[index] if index >= 0 else None
+
+    def element_children(self, node: int) -> List[int]:
+        return [child for child in self.children[node] if self.node_types[child] == ELEMENT_NODE]
+
+    def text_children(self, node: int) -> str:
+        return "".join(
+            self.string(self.values[child]) or ""
+            for child in self.children[node]
+            if self.node_types[child] == TEXT_NODE
+        )
+
+
+@dataclass
+class _Aggregates:
+    """Values of each node that depend on its whole subtree, see :func:`_aggregate`."""
+
+    texts: List[TextItem]
+    raw_texts: List[str]
+    num_imgs: List[int]
+    num_svgs: List[int]
+    rendered: List[bool]
+
+
+def _decode(document: Dict[str, Any], strings: List[str]) -> _DomTables:
+    nodes = document["nodes"]
+    layout = document["layout"]
+    num_nodes = len(nodes["parentIndex"])
+    pseudo = _rare(nodes.get("pseudoType"))
+
+    tables = _DomTables(
+        strings=strings,
+        parents=nodes["parentIndex"],
+        node_types=nodes["nodeType"],
+        names=[strings[index].lower() for index in nodes["nodeName"]],
+        values=nodes.get("nodeValue", []),
+        input_values=_rare(nodes.get("inputValue")),
+        children=[[] for _ in range(num_nodes)],
+        attributes=[{} for _ in range(num_nodes)],
+        styles={},
+        bounds={},
+    )
+
+    for node, parent in enumerate(tables.parents):
+        if parent >= 0 and node not in pseudo and tables.node_types[node] in (ELEMENT_NODE, TEXT_NODE):
+            tables.children[parent].append(node)
+        if tables.node_types[node] == ELEMENT_NODE:
+            flat = nodes["attributes"][node]
+            tables.attributes[node] = {
+                tables.string(flat[i]): tables.string(flat[i + 1]) for i in range(0, len(flat), 2)
+            }
+
+    for layout_index, node in enumerate(layout["nodeIndex"]):
+        if node not in tables.styles:
+            values = layout["styles"][layout_index]
+            tables.styles[node] = {name: tables.string(value) for name, value in zip(COMPUTED_STYLES, values)}
+            tables.bounds[node] = layout["bounds"][layout_index]
+
+    return tables
+
+
+def _rendered_text(tables: _DomTables, aggregates: _Aggregates, node: int) -> TextItem:
+    """The text of the content of a rendered element, from those of its children."""
+    style = tables.styles.get(node, {})
+    element_children = tables.element_children(node)
+    next_sibling = {child: i + 1 < len(element_children) for i, child in enumerate(element_children)}
+
+    items = []
+    for child in tables.children[node]:
+        if tables.node_types[child] == TEXT_NODE:
+            items.append(_text_node_text(tables.string(tables.values[child]) or "", style))
+        elif aggregates.rendered[child]:
+            child_style = tables.styles.get(child, {"display": "contents"})
+            items.append(_element_text(tables.names[child], child_style, aggregates.texts[child], next_sibling[child]))
+    return _join_texts(items)
+
+
+def _aggregate(tables: _DomTables, want_text: bool) -> _Aggregates:
+    """
+    Bottom-up pass over all nodes: text, textContent, image and svg counts, and whether anything below is rendered.
+    """
+    num_nodes = len(tables.parents)
+    aggregates = _Aggregates(
+        texts=[EMPTY_TEXT] * num_nodes,
+        raw_texts=[""] * num_nodes,
+        num_imgs=[0] * num_nodes,
+        num_svgs=[0] * num_nodes,
+        rendered=[node in tables.styles for node in range(num_nodes)],
+    )
+
+    for node in range(num_nodes - 1, -1, -1):
+        if tables.node_types[node] != ELEMENT_NODE:
+            continue
+        aggregates.num_svgs[node] += tables.names[node] == "svg"
+        for child in tables.element_children(node):
+            aggregates.rendered[node] = aggregates.rendered[node] or aggregates.rendered[child]
+            src = tables.attributes[child].get("src") or ""
+            is_img = tables.names[child] == "img"
+            aggregates.num_imgs[node] += aggregates.num_imgs[child] + (is_img and not src.endswith(".svg"))
+            aggregates.num_svgs[node] += aggregates.num_svgs[child] + (is_img and src.endswith(".svg"))
+
+        if not want_text:
+            continue
+        if aggregates.rendered[node]:
+            aggregates.texts[node] = _rendered_text(tables, aggregates, node)
+        else:
+            # Not rendered, so neither are its children: innerText gives the textContent
+            aggregates.raw_texts[node] = "".join(
+                tables.string(tables.values[child]) or ""
+                if tables.node_types[child] == TEXT_NODE
+                else aggregates.raw_texts[child]
+                for child in tables.children[node]
+            )
+
+    return aggregates
+
+
+def _element_metadata(
+    tables: _DomTables, aggregates: _Aggregates, node: int, style: Dict[str, Any], fixed: bool, scroll: Tuple[int, int]
+) -> Dict[str, Any]:
+    """The metadata of a single element, given its (possibly inherited) style and whether it is fixed."""
+    attrs = tables.attributes[node]
+    x, y, width, height = tables.bounds.get(node, (scroll[0], scroll[1], 0, 0))
+    if tables.names[node] == "input":
+        text = tables.string(tables.input_values[node]) if node in tables.input_values else attrs.get("value", "")
+    else:
+        text = aggregates.texts[node][0] if aggregates.rendered[node] else aggregates.raw_texts[node]
+
+    return {
+        "id": attrs.get("id"),
+        "tag": tables.names[node],
+        "class": attrs.get("class"),
+        "attributes": attrs,
+        "type": attrs.get("type"),
+        "href": attrs.get("href"),
+        "size": {"width": width, "height": height},
+        "location": {"x": x, "y": y},
+        "text": text,
+        "text_local": tables.text_children(node).strip(),
+        "children_count": len(tables.element_children(node)),
+        "num_imgs": aggregates.num_imgs[node],
+        "num_svgs": aggregates.num_svgs[node],
+        "background": style["background"],
+        "background_image": style["background-image"],
+        "fixed_pos": fixed,
+        "wtl_uid": int(attrs["wtl-uid"]),
+        "wtl_parent_uid": int(attrs.get("wtl-parent-uid", -1)),
+        "display": style["display"],
+        "visibility": style["visibility"],
+        "font_weight": style["font-weight"],
+        "font_size": style["font-size"],
+    }
+
+
+def _computed_style(tables: _DomTables, node: int, parent_style: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    The computed style of an element. Those without a layout box get the values of hidden elements, and inherit
+    the inherited properties from their parent.
+    """
+    style = tables.styles.get(node)
+    if style is not None:
+        return style
+    style = dict(DEFAULT_STYLE)
+    if parent_style is not None:
+        for name in ("visibility", "font-weight", "font-size", "white-space", "text-transform"):
+            style[name] = parent_style.get(name)
+    return style
+
+
+def elements_metadata_from_snapshot(
+    snapshot: Dict[str, Any], fields: Iterable[str] = None, skip_hidden_subtrees: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Converts the main document of a DOM snapshot into element metadata, for all elements with a ``wtl-uid``
+    attribute, in document order. See :func:`JavascriptWrapper.get_element_metadata` for the fields and options.
+
+    Elements without a layout box get the style values of hidden elements (inherited ones from their parent),
+    and a zero size at the scroll position, like ``getBoundingClientRect`` gives them.
+    """
+    document = snapshot["documents"][0]
+    fields = set(fields or [])
+    tables = _decode(document, snapshot["strings"])
+    aggregates = _aggregate(tables, want_text=not fields or "text" in fields)
+    scroll = (document.get("scrollOffsetX", 0), document.get("scrollOffsetY", 0))
+
+    # Top-down: fixed positioning and inherited styles, then the metadata of all tagged elements
+    num_nodes = len(tables.parents)
+    fixed = [False] * num_nodes
+    inherited: List[Dict[str, Optional[str]]] = [{} for _ in range(num_nodes)]
+    hidden_ancestor = [False] * num_nodes
+    result = []
+
+    for node in range(num_nodes):
+        if tables.node_types[node] != ELEMENT_NODE:
+            continue
+        parent = tables.parents[node]
+        has_parent = parent >= 0
+        inherited[node] = style = _computed_style(tables, node, inherited[parent] if has_parent else None)
+        fixed[node] = style["position"] in ("fixed", "sticky") or (has_parent and fixed[parent])
+        hidden_ancestor[node] = has_parent and (hidden_ancestor[parent] or not aggregates.rendered[parent])
+
+        if "wtl-uid" not in tables.attributes[node] or (skip_hidden_subtrees and hidden_ancestor[node]):
+            continue
+        metadata = _element_metadata(tables, aggregates, node, style, fixed[node], scroll)
+        if fields:
+            metadata = {key: value for key, value in metadata.items() if key in fields or key.startswith("wtl_")}
+        result.append(metadata)
+
+    return result
@@ -48,6 +48,10 @@ class ScrapingError(Error):
     """Any error related to scraping/parsing webpages."""
 
 
+class FieldNotScrapedError(ScrapingError, KeyError):
+    """Accessing element metadata that was left out when scraping, see config.scraping.fields"""
+
+
 class ElementNotFoundError(Error):
     """Any error related to finding elements on the page."""
 
@@ -56,5 +60,9 @@ class WindowClosedError(Error):
     """Trying to access a browser instance that was closed by the user"""
 
 
+class SnapshotSaveError(Error):
+    """Any error related to saving snapshots to disk"""
+
+
 class WebDriverSendError(Error):
     """Any error related to custom sending commands to a WebDriver instance"""
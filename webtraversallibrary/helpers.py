@@ -95,7 +95,8 @@ class MonkeyPatches:
         selector_elements = [(s, snapshot.elements.by_selector(s)) for s in self._data]
         selector_elements.sort(key=lambda item: len(item[1]), reverse=True)
         for selector, elements in selector_elements:
-            if element in elements:
+            # Elements for the same metadata are equal, without comparing their pages as == would
+            if any(e.metadata is element.metadata for e in elements):
                 return self._data[selector]
         return self._default
 
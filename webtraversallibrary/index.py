@@ -0,0 +1,169 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Hash-based lookup tables over the elements of a page.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from .processtools import cached_property
+from .table import ElementTable
+
+if TYPE_CHECKING:
+    from .snapshot import PageElement
+
+
+class ElementIndex:
+    """
+    Hash-based lookup tables over all elements of a page, built once per :class:`PageSnapshot`.
+    Maps wtl-uids to elements, parent wtl-uids to children, and score names to the elements carrying them.
+    Also numbers the wtl-uid tree in pre-order (see :attr:`intervals`), so that subtree and ancestor
+    tests are integer comparisons.
+
+    .. note::
+        The score tables are built on the first query for a given name and are then kept up to date
+        by :func:`PageElement.set_score`. Scores written directly into ``metadata`` after that are not seen.
+        Elements are identified by their ``metadata``, which any other element for the same metadata shares.
+    """
+
+    def __init__(self, elements: Iterable[PageElement]):
+        self.elements: List[PageElement] = list(elements)
+        self._uids: Dict[int, PageElement] = {}
+        self._children: Dict[int, List[PageElement]] = {}
+        self._positions: Dict[int, int] = {}
+        self._scores: Dict[str, Set[int]] = {}
+        self._raw_scores: Dict[str, Set[int]] = {}
+        self._table: ElementTable = None
+        self.is_tree = True
+
+        for position, element in enumerate(self.elements):
+            self._positions[id(element.metadata)] = position
+            wtl_uid = element.metadata.get("wtl_uid")
+            if wtl_uid is not None:
+                self._uids.setdefault(wtl_uid, element)
+            wtl_parent_uid = element.metadata.get("wtl_parent_uid")
+            if wtl_parent_uid is not None:
+                self._children.setdefault(wtl_parent_uid, []).append(element)
+            else:
+                self.is_tree = False
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __contains__(self, element: PageElement) -> bool:
+        return id(element.metadata) in self._positions
+
+    def by_uid(self, wtl_uid: int) -> Optional[PageElement]:
+        """Returns the element with the given wtl-uid, or None."""
+        return self._uids.get(wtl_uid)
+
+    def children(self, wtl_uid: int) -> List[PageElement]:
+        """Returns the direct children of the element with the given wtl-uid."""
+        return self._children.get(wtl_uid, [])
+
+    @property
+    def table(self) -> ElementTable:
+        """Columnar view of the metadata of all elements, built on first access."""
+        if self._table is None:
+            self._table = ElementTable([e.metadata for e in self.elements])
+        return self._table
+
+    @cached_property
+    def intervals(self) -> Dict[int, Tuple[int, int, int]]:
+        """
+        Maps each wtl-uid to its pre-order number, the last pre-order number within its subtree, and its depth.
+        Element ``a`` is an ancestor of ``b`` if and only if ``a.first < b.first <= a.last``.
+        """
+        intervals: Dict[int, Tuple[int, int, int]] = {}
+        first: Dict[int, Tuple[int, int]] = {}
+        counter = 0
+
+        roots = [
+            e.metadata["wtl_uid"]
+            for e in self.elements
+            if "wtl_uid" in e.metadata and e.metadata.get("wtl_parent_uid") not in self._uids
+        ]
+        to_visit = [(wtl_uid, 0, False) for wtl_uid in reversed(roots)]
+
+        while to_visit:
+            wtl_uid, depth, leaving = to_visit.pop()
+            if leaving:
+                intervals[wtl_uid] = (first[wtl_uid][0], counter - 1, first[wtl_uid][1])
+                continue
+            if wtl_uid in first:
+                continue
+
+            first[wtl_uid] = (counter, depth)
+            counter += 1
+            to_visit.append((wtl_uid, depth, True))
+            for child in reversed(self._children.get(wtl_uid, [])):
+                if "wtl_uid" in child.metadata:
+                    to_visit.append((child.metadata["wtl_uid"], depth + 1, False))
+
+        return intervals
+
+    @cached_property
+    def preorder(self) -> List[PageElement]:
+        """Returns all elements in the wtl-uid tree, in pre-order."""
+        preorder: List[PageElement] = [None] * len(self.intervals)
+        for wtl_uid, (first, _, _) in self.intervals.items():
+            preorder[first] = self._uids[wtl_uid]
+        return preorder
+
+    def is_ancestor(self, ancestor_uid: int, wtl_uid: int) -> bool:
+        """Returns True if the first wtl-uid is a (strict) ancestor of the second one."""
+        if ancestor_uid not in self.intervals or wtl_uid not in self.intervals:
+            return False
+        first, last, _ = self.intervals[ancestor_uid]
+        return first < self.intervals[wtl_uid][0] <= last
+
+    def depth(self, wtl_uid: int) -> int:
+        """Returns the depth of the given wtl-uid in the tree, where roots have depth 0."""
+        return self.intervals[wtl_uid][2]
+
+    def descendants(self, wtl_uid: int) -> List[PageElement]:
+        """Returns all (strict) descendants of the given wtl-uid, in pre-order."""
+        first, last, _ = self.intervals[wtl_uid]
+        return self.preorder[first + 1 : last + 1]
+
+    def with_score(self, name: str, raw: bool = False) -> List[PageElement]:
+        """Returns all elements carrying the given (raw) score name, in document order."""
+        table = self._raw_scores if raw else self._scores
+        if name not in table:
+            if raw:
+                table[name] = {i for i, e in enumerate(self.elements) if name in e.metadata.get("raw_scores", {})}
+            else:
+                table[name] = {i for i, e in enumerate(self.elements) if name in e.metadata}
+        return [self.elements[i] for i in sorted(table[name])]
+
+    def add_score(self, element: PageElement, name: str, raw: bool = False):
+        """Registers that the given element now carries the given score (and raw score, if ``raw`` is set)."""
+        position = self._positions.get(id(element.metadata))
+        if position is None:
+            # Not an element of this page, so the tables for the name are rebuilt on the next query instead
+            self._scores.pop(name, None)
+            self._raw_scores.pop(name, None)
+            self._table = None
+            return
+        if name in self._scores:
+            self._scores[name].add(position)
+        if raw and name in self._raw_scores:
+            self._raw_scores[name].add(position)
+        if self._table is not None:
+            self._table.set_score(position, name, element.metadata[name])
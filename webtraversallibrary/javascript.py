@@ -21,12 +21,14 @@ files instead of embedding it in Python code is convenience: it is more readable
 """
 
 import functools
+import json
 import logging
 import os
+from contextlib import contextmanager
 from datetime import datetime
 from functools import wraps
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Union
+from typing import Any, Dict, Iterable, List, Optional, Union
 
 from selenium.common.exceptions import (
     JavascriptException,
@@ -39,7 +41,7 @@ from selenium.webdriver.remote.webdriver import WebDriver
 
 from .color import Color
 from .config import Config
-from .error import WindowClosedError
+from .error import ScrapingError, WindowClosedError
 from .geometry import Point, Rectangle
 from .selector import Selector
 
@@ -92,7 +94,9 @@ def safe_selenium_method(func):
         finally:
             log_records = []
             try:
-                log_records = self.driver.get_log("browser")
+                # Deferred records are fetched along with those of the next script, see JavascriptWrapper.deferred_logs
+                if not getattr(self, "defer_logs", False):
+                    log_records = self.driver.get_log("browser")
             except (WebDriverException, WindowClosedError):
                 logger.warning("Failed to fetch log records from the driver")
 
@@ -123,6 +127,19 @@ class JavascriptWrapper:
         config = config or Config.default()
         self.driver = driver
         self.config = config
+        self.defer_logs = False
+
+    @contextmanager
+    def deferred_logs(self):
+        """
+        Context in which the browser log is not fetched after each script, which takes another round trip to the
+        browser. The records are kept by the driver, and logged after the next script that is run outside of it.
+        """
+        defer_logs, self.defer_logs = self.defer_logs, True
+        try:
+            yield
+        finally:
+            self.defer_logs = defer_logs
 
     def save_mhtml(self, filename: str):
         """
@@ -159,7 +176,9 @@ class JavascriptWrapper:
 
         return Rectangle.from_list([result["x"], result["y"], result["x"] + result["w"], result["y"] + result["h"]])
 
-    def get_element_metadata(self) -> List[Dict[str, Any]]:
+    def get_element_metadata(
+        self, chunk_size: int = 0, fields: Iterable[str] = None, skip_hidden_subtrees: bool = False
+    ) -> List[Dict[str, Any]]:
         """
         Collects metadata about web page DOM elements: their tags, some of the HTML attributes, position and size on the
         page, CSS styles and classes, inner text.
@@ -168,10 +187,111 @@ class JavascriptWrapper:
         has a pointer to the parent DOM element in the ``wtl_parent_uid`` field and are not to be confused
         with ``id`` attribute in HTML which is neither unique nor mandatory.
 
-        :return: a list of JSON objects (in their Python dict form) with HTML attributes, additionally calculated
-                properties and unique IDs. Refer to the script code for the keys' names.
+        If ``chunk_size`` is given and there are more elements than that, the metadata is kept in the page and
+        transferred ``chunk_size`` elements at a time, see :func:`read_element_metadata`, instead of in a single
+        response. This keeps responses small, but does not lower the memory used by the page while extracting.
+
+        If ``fields`` are given, only those are computed (along with ``wtl_uid`` and ``wtl_parent_uid``), which can be
+        much faster as e.g. ``text`` forces a layout. With ``skip_hidden_subtrees``, the descendants of elements with
+        ``display: none`` are left out.
+
+        :return: a list of JSON objects (in their Python dict form, in document order) with HTML attributes,
+                additionally calculated properties and unique IDs. Refer to the script code for the keys' names.
         """
-        return self.execute_file(Path("get_element_metadata.js"))
+        options = {"fields": list(fields or []), "skip_hidden_subtrees": skip_hidden_subtrees}
+        result = self.execute_file([Path("element_metadata.js"), Path("get_element_metadata.js")], chunk_size, options)
+        return self.read_element_metadata(result)
+
+    def get_element_metadata_incremental(
+        self,
+        known_ids: Iterable[str],
+        chunk_size: int = 0,
+        fields: Iterable[str] = None,
+        skip_hidden_subtrees: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Like :func:`get_element_metadata`, but only extracts the subtrees that changed since the previous call on the
+        same document, as recorded by a MutationObserver the script installs in the page.
+
+        Each call returns a dict with the ``id`` of the observed document state and a ``full`` flag. If ``full`` is
+        set, ``elements`` holds the metadata of all elements, as from :func:`get_element_metadata`. Otherwise
+        ``roots`` holds one list of element metadata for each changed subtree (starting with its root) and
+        ``ancestors`` the metadata of the elements above them. A full scrape is made unless the id of the previous
+        call is one of ``known_ids``, or if the viewport has been scrolled or resized since.
+        """
+        options = {"fields": list(fields or []), "skip_hidden_subtrees": skip_hidden_subtrees}
+        result = self.execute_file(
+            [Path("element_metadata.js"), Path("incremental_metadata.js"), Path("get_element_metadata_incremental.js")],
+            list(known_ids),
+            chunk_size,
+            options,
+        )
+        if result and result["full"]:
+            result["elements"] = self.read_element_metadata(result["elements"])
+        return result
+
+    def scrape_page(
+        self,
+        chunk_size: int = 0,
+        fields: Iterable[str] = None,
+        skip_hidden_subtrees: bool = False,
+        known_ids: Iterable[str] = None,
+        tag_only: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Collects everything needed for a page snapshot in a single call: a dict with the element metadata in
+        ``elements`` (as from :func:`get_element_metadata`, or from :func:`get_element_metadata_incremental` if
+        ``known_ids`` are given), the HTML of the page in ``source``, its ``title``, ``url`` and ``full_height``, and
+        the time in milliseconds spent in the browser on each of these in ``timings``.
+
+        Only element metadata that does not fit in one chunk takes more calls, see :func:`read_element_metadata`.
+        The browser log is left to the next call, see :func:`deferred_logs`.
+
+        With ``tag_only``, elements are only assigned their ``wtl_uid``, for extraction outside of the page (see
+        :mod:`webtraversallibrary.domsnapshot`), and ``elements`` is the number of elements.
+        """
+        options = {"fields": list(fields or []), "skip_hidden_subtrees": skip_hidden_subtrees}
+        with self.deferred_logs():
+            result = self.execute_file(
+                [Path("element_metadata.js"), Path("incremental_metadata.js"), Path("scrape_page.js")],
+                chunk_size,
+                options,
+                None if known_ids is None else list(known_ids),
+                tag_only,
+            )
+            if not result or tag_only:
+                return result
+
+            if known_ids is None:
+                result["elements"] = self.read_element_metadata(result["elements"])
+            elif result["elements"] and result["elements"]["full"]:
+                result["elements"]["elements"] = self.read_element_metadata(result["elements"]["elements"])
+        return result
+
+    def read_element_metadata(self, result: Any) -> Optional[List[Dict[str, Any]]]:
+        """
+        Pulls the element metadata buffered in the page by a chunked call to :func:`get_element_metadata`, given its
+        result, one chunk per call. The chunks are kept serialized in the page and released once read, so neither
+        side holds the full response in memory at once. Results that were not buffered are returned as they are.
+        Raises a :class:`ScrapingError` if a chunk is missing or cannot be parsed.
+
+        .. note::
+            The page still holds the metadata of all elements at once while extracting it, before it is buffered.
+        """
+        buffered = isinstance(result, dict) and "chunks" in result
+        if not buffered:
+            return result
+
+        elements: List[Dict[str, Any]] = []
+        for index in range(result["chunks"]):
+            chunk = self.execute_file(Path("read_element_metadata.js"), index)
+            if chunk is None:
+                raise ScrapingError(f"Failed to read chunk {index} of {result['chunks']} of element metadata")
+            try:
+                elements.extend(json.loads(chunk))
+            except ValueError as e:
+                raise ScrapingError(f"Malformed chunk {index} of {result['chunks']} of element metadata") from e
+        return elements
 
     def hide_position_fixed_elements(self, elements: List[str] = None) -> dict:
         """
@@ -185,6 +305,18 @@ class JavascriptWrapper:
         elements = elements or []
         return self.execute_file(Path("hide_position_fixed_elements.js"), elements)
 
+    def hide_fixed_elements(self) -> Dict[str, str]:
+        """
+        Hides all page elements that are fixed or sticky by setting their visibility to "hidden", finding them in
+        one pass over the page. Unlike :func:`hide_position_fixed_elements`, does not depend on other elements.
+
+        Returns a map from element ids (wtl-hidden-uid) to the old visibility values,
+        for :func:`show_position_fixed_elements`.
+
+        Mutates the web page.
+        """
+        return self.execute_file(Path("hide_fixed_elements.js")) or {}
+
     def show_position_fixed_elements(self, id_to_visibility: dict):
         """
         Set the specified visibility to the elements with ids listed in ``id_to_visibility``.
@@ -232,6 +364,14 @@ class JavascriptWrapper:
         """
         self.execute_script(f"scrollTo({int(x)}, {int(y)});")
 
+    def scroll_to_settled(self, x: float, y: float, timeout: float = 1.0) -> Optional[float]:
+        """
+        Scroll the page to given coordinates, and wait until it has settled: until the scroll position and page
+        height stay the same for two animation frames, or for at most ``timeout`` seconds.
+        Returns the vertical scroll position reached, which is less than ``y`` at the end of the page.
+        """
+        return self.execute_file(Path("scroll_to_settled.js"), int(x), int(y), 1000 * timeout, execute_async=True)
+
     def make_canvas(self):
         """
         Create viewport and page canvases and add them to the DOM.
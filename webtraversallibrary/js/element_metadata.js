@@ -0,0 +1,444 @@
+// Licensed to the Apache Software Foundation (ASF) under one
+// or more contributor license agreements.  See the NOTICE file
+// distributed with this work for additional information
+// regarding copyright ownership.  The ASF licenses this file
+// to you under the Apache License, Version 2.0 (the
+// "License"); you may not use this file except in compliance
+// with the License.  You may obtain a copy of the License at
+//
+//   http://www.apache.org/licenses/LICENSE-2.0
+//
+// Unless required by applicable law or agreed to in writing,
+// software distributed under the License is distributed on an
+// "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+// KIND, either express or implied.  See the License for the
+// specific language governing permissions and limitations
+// under the License.
+
+
+// Helpers shared by the element metadata scripts, prepended to them by JavascriptWrapper
+
+function asArray(something) {
+    return [].slice.call(something);
+}
+
+let createCustomAttribute = (name, value) => {
+    // Note: .setAttribute is cleaner but doesn't always work on iframe elements
+    let attr = document.createAttribute(name);
+    attr.value = value;
+    return attr;
+};
+
+Array.prototype.flatMap = function (lambda) {
+    return Array.prototype.concat.apply([], this.map(lambda));
+};
+
+function isFixedPos(el) {
+    while (el) {
+        const computedStyle = window.getComputedStyle(el);
+        const position = computedStyle.getPropertyValue('position');
+        if (position === 'fixed' || position === 'sticky') return true;
+        el = el.parentElement;
+    }
+    return false;
+}
+
+// Fields to extract (null for all) and whether to skip the descendants of elements with display: none,
+// see setExtractionOptions
+let metadataFields = null;
+let skipHiddenSubtrees = false;
+
+function setExtractionOptions(options) {
+    options = options || {};
+    metadataFields = options.fields && options.fields.length ? new Set(options.fields) : null;
+    skipHiddenSubtrees = Boolean(options.skip_hidden_subtrees);
+}
+
+function wants(field) {
+    return metadataFields === null || metadataFields.has(field);
+}
+
+// Only the fields in metadataFields are computed, wtl_uid and wtl_parent_uid are always included.
+// parentFixedPos is the fixed_pos flag of the parent element, if known. Otherwise the ancestors are checked.
+// If aggregated is set, text, num_imgs and num_svgs are left to the caller, see aggregateSubtree.
+function extractMetadata(el, parentFixedPos, aggregated) {
+    const tag = el.tagName.toLowerCase();
+    const computedStyle = window.getComputedStyle(el);
+    const res = {};
+
+    if (wants('id')) res.id = el.getAttribute('id');
+    if (wants('tag')) res.tag = tag;
+    if (wants('class')) res['class'] = el.getAttribute('class');
+    if (wants('attributes')) res.attributes = Object.fromEntries(Array.from(el.attributes).map(x => [x.name, x.value]));
+    if (wants('type')) res.type = el.getAttribute('type');
+    if (wants('href')) res.href = el.getAttribute('href');
+
+    if (wants('size') || wants('location')) {
+        const boundingBox = el.getBoundingClientRect();
+        if (wants('size')) {
+            res.size = {
+                width: boundingBox.width,
+                height: boundingBox.height
+            };
+        }
+        if (wants('location')) {
+            res.location = {
+                x: boundingBox.left + window.scrollX,
+                y: boundingBox.top + window.scrollY
+            };
+        }
+    }
+
+    if (wants('text') && !aggregated) res.text = (tag == 'input' ? el.value : el.innerText);
+    if (wants('text_local')) {
+        res.text_local = Array.from(el.childNodes)
+            .filter(childEl => childEl instanceof Text)
+            .map(textEl => textEl.textContent)
+            .join("")
+            .trim();
+    }
+    if (wants('children_count')) res.children_count = el.childElementCount;
+
+    if ((wants('num_imgs') || wants('num_svgs')) && !aggregated) {
+        const svgChildren = asArray(el.getElementsByTagName('svg'));
+        const imgChildren = asArray(el.getElementsByTagName('img'));
+        const imgSvgChildren = imgChildren.filter(ch => ch.src && ch.src.endsWith(".svg"));
+        if (wants('num_imgs')) res.num_imgs = imgChildren.length - imgSvgChildren.length;
+        if (wants('num_svgs')) res.num_svgs = svgChildren.length + imgSvgChildren.length + (tag === 'svg');
+    }
+
+    if (wants('background')) res.background = computedStyle.getPropertyValue('background');
+    if (wants('background_image')) res.background_image = computedStyle.getPropertyValue('background-image');
+
+    if (wants('fixed_pos')) {
+        // not enough to just check the computedStyle for "position" because it doesn't take into account
+        // parent elements
+        const position = computedStyle.getPropertyValue('position');
+        if (parentFixedPos === undefined) parentFixedPos = isFixedPos(el.parentElement);
+        res.fixed_pos = position === 'fixed' || position === 'sticky' || parentFixedPos;
+    }
+
+    res.wtl_uid = parseInt(el.getAttribute('wtl-uid'));
+    res.wtl_parent_uid = parseInt(el.getAttribute('wtl-parent-uid'));
+
+    if (wants('display')) res.display = computedStyle.getPropertyValue("display");
+    if (wants('visibility')) res.visibility = computedStyle.getPropertyValue("visibility");
+    if (wants('font_weight')) res.font_weight = computedStyle.getPropertyValue("font-weight");
+    if (wants('font_size')) res.font_size = computedStyle.getPropertyValue("font-size");
+
+    return res;
+}
+
+function tagElement(el, uid) {
+    el.attributes.setNamedItem(createCustomAttribute('wtl-uid', uid));
+}
+
+function latestAssignedUid() {
+    // Kept up to date by tagSubtree, so the page only needs to be searched once per document
+    if (window.wtlLatestUid !== undefined) return window.wtlLatestUid;
+
+    let latest = 0;
+    for (const element of document.querySelectorAll('[wtl-uid]')) {
+        latest = Math.max(latest, parseInt(element.getAttribute('wtl-uid')) || 0);
+    }
+    return latest;
+}
+
+// Displays of elements that are surrounded by a line break in their parent's text
+const BLOCK_DISPLAYS = new Set(['block', 'flex', 'grid', 'list-item', 'table', 'table-caption', 'flow-root']);
+
+// The text of a node as built by the innerText algorithm, composable from the texts of its children:
+// text without collapsible spaces at its ends, whether such a space was there, and the number of required
+// line breaks before and after it. Items without text only hold a number of line breaks and possibly a space.
+const EMPTY_TEXT = {text: '', lead: 0, trail: 0, spaceBefore: false, spaceAfter: false};
+
+function joinText(a, b) {
+    if (b.text === '') {
+        return {
+            text: a.text,
+            lead: a.text === '' ? Math.max(a.lead, b.lead) : a.lead,
+            trail: Math.max(a.trail, b.trail),
+            spaceBefore: a.spaceBefore || (a.text === '' && b.spaceBefore),
+            spaceAfter: a.spaceAfter || b.spaceAfter
+        };
+    }
+    if (a.text === '') {
+        return {
+            text: b.text,
+            lead: Math.max(a.lead, b.lead),
+            trail: b.trail,
+            spaceBefore: a.spaceBefore || b.spaceBefore,
+            spaceAfter: b.spaceAfter
+        };
+    }
+    // Spaces at the start or end of a line are removed, and a run of line breaks keeps the longest
+    const breaks = Math.max(a.trail, b.lead);
+    const separator = breaks > 0 ? '\n'.repeat(breaks) : (a.spaceAfter || b.spaceBefore ? ' ' : '');
+    return {
+        text: a.text + separator + b.text,
+        lead: a.lead,
+        trail: b.trail,
+        spaceBefore: a.spaceBefore,
+        spaceAfter: b.spaceAfter
+    };
+}
+
+function plainText(text) {
+    return {text: text, lead: 0, trail: 0, spaceBefore: false, spaceAfter: false};
+}
+
+function textNodeText(data, style) {
+    if (style.visibility !== 'visible' || data === '') return EMPTY_TEXT;
+
+    if (style.textTransform === 'uppercase') data = data.toUpperCase();
+    else if (style.textTransform === 'lowercase') data = data.toLowerCase();
+    else if (style.textTransform === 'capitalize') data = data.replace(/\b\w/g, c => c.toUpperCase());
+
+    if (style.whiteSpace.startsWith('pre') && style.whiteSpace !== 'pre-line' || style.whiteSpace === 'break-spaces') {
+        return plainText(data);
+    }
+    data = style.whiteSpace === 'pre-line' ?
+        data.replace(/[ \t]+/g, ' ').replace(/ ?\n ?/g, '\n') :
+        data.replace(/[ \t\n\r\f]+/g, ' ');
+    const core = data.trim();
+    return {
+        text: core,
+        lead: 0,
+        trail: 0,
+        spaceBefore: data.startsWith(' '),
+        spaceAfter: data.endsWith(' ')
+    };
+}
+
+// What an element adds to the text of its parent, given its display and the text of its own content
+// The differences to the innerText of the browser are listed with the text field, see ELEMENT_FIELDS in scraper.py.
+function elementText(el, display, content) {
+    if (el.localName === 'br') return plainText('\n');
+    if (display === 'table-cell' && el.nextElementSibling) return joinText(content, plainText('\t'));
+    if (display === 'table-row' && el.nextElementSibling) return joinText(content, plainText('\n'));
+
+    const breaks = el.localName === 'p' ? 2 :
+        (BLOCK_DISPLAYS.has(display) ? 1 : 0);
+    if (breaks === 0) return content;
+    return {
+        text: content.text,
+        lead: Math.max(content.lead, breaks),
+        trail: Math.max(content.trail, breaks),
+        spaceBefore: false,
+        spaceAfter: false
+    };
+}
+
+function textStyle(el) {
+    const computedStyle = window.getComputedStyle(el);
+    return {
+        display: computedStyle.getPropertyValue('display'),
+        visibility: computedStyle.getPropertyValue('visibility'),
+        whiteSpace: computedStyle.getPropertyValue('white-space'),
+        textTransform: computedStyle.getPropertyValue('text-transform')
+    };
+}
+
+function isRendered(el) {
+    for (; el; el = el.parentElement) {
+        if (window.getComputedStyle(el).getPropertyValue('display') === 'none') return false;
+    }
+    return true;
+}
+
+function isSvgImage(el) {
+    return el.localName === 'img' && Boolean(el.src) && el.src.endsWith('.svg');
+}
+
+// The text and image counts of an element, composed from its text nodes and what childInfo returns for its child
+// elements (undefined for those that were not extracted). Without a style, only the image counts are composed.
+// Returns the text of its content, its textContent if not rendered, its display, and its image and svg counts.
+function composeElement(el, style, rendered, childInfo) {
+    const info = {
+        text: EMPTY_TEXT,
+        rawText: '',
+        rendered: rendered,
+        display: style ? style.display : null,
+        imgs: 0,
+        svgs: el.localName === 'svg' ? 1 : 0
+    };
+
+    for (let child = el.firstChild; child; child = child.nextSibling) {
+        if (child.nodeType === Node.TEXT_NODE) {
+            if (!style) continue;
+            if (rendered) info.text = joinText(info.text, textNodeText(child.data, style));
+            else info.rawText += child.data;
+            continue;
+        }
+        const childEl = child.nodeType === Node.ELEMENT_NODE ? childInfo(child) : undefined;
+        if (childEl === undefined) continue;
+        if (style) {
+            if (childEl.rendered) info.text = joinText(info.text, elementText(child, childEl.display, childEl.text));
+            else if (!rendered) info.rawText += childEl.rawText;
+        }
+        info.imgs += childEl.imgs + (child.localName === 'img' && !isSvgImage(child) ? 1 : 0);
+        info.svgs += childEl.svgs + (isSvgImage(child) ? 1 : 0);
+    }
+    return info;
+}
+
+// Sets the aggregated fields of an element's metadata from what composeElement returned for it
+function setAggregated(el, res, info) {
+    if (wants('text')) res.text = el.localName === 'input' ? el.value : (info.rendered ? info.text.text : info.rawText);
+    if (wants('num_imgs')) res.num_imgs = info.imgs;
+    if (wants('num_svgs')) res.num_svgs = info.svgs;
+}
+
+// Fills in text, num_imgs and num_svgs of the elements of a subtree, as extracted in pre-order by readSubtree,
+// in a single post-order pass that reuses the results of the children instead of walking every subtree again.
+// Elements that are not rendered get their textContent, like innerText does. If a cache (a WeakMap) is given,
+// the result of composeElement is kept there for every element, see incremental_metadata.js.
+function aggregateSubtree(elements, res, visitedChildren, cache) {
+    const withText = wants('text');
+    const withCounts = wants('num_imgs') || wants('num_svgs');
+    if (!withText && !withCounts) return;
+
+    const indices = new Map(elements.map((el, i) => [el, i]));
+    const styles = withText ? elements.map(textStyle) : null;
+    const rendered = new Array(elements.length);
+    if (withText) {
+        for (let i = 0; i < elements.length; i++) {
+            const parentIndex = indices.get(elements[i].parentElement);
+            const parentRendered = parentIndex === undefined ?
+                isRendered(elements[i].parentElement) : rendered[parentIndex];
+            rendered[i] = parentRendered && styles[i].display !== 'none';
+        }
+    }
+
+    const infos = new Array(elements.length);
+    const childInfo = child => {
+        const j = indices.get(child);
+        return j === undefined ? undefined : infos[j];
+    };
+
+    for (let i = elements.length - 1; i >= 0; i--) {
+        const el = elements[i];
+        const info = composeElement(el, withText ? styles[i] : null, rendered[i], childInfo);
+
+        if (!visitedChildren[i]) {
+            // The descendants of hidden elements may have been skipped
+            info.rawText = el.textContent;
+            const imgChildren = asArray(el.getElementsByTagName('img'));
+            const imgSvgChildren = imgChildren.filter(isSvgImage);
+            info.imgs = imgChildren.length - imgSvgChildren.length;
+            info.svgs = el.getElementsByTagName('svg').length + imgSvgChildren.length
+                + (el.localName === 'svg' ? 1 : 0);
+        }
+
+        infos[i] = info;
+        if (cache) cache.set(el, info);
+        setAggregated(el, res[i], info);
+    }
+}
+
+// Write phase: assigns uids to untagged elements below root, and updates the parent uids of elements moved since
+// they were tagged. Nothing is read from style or layout here, as every read after a write can force the browser to
+// recalculate style, so all attributes are set first and the page is restyled at most once for the reads after.
+// Returns the elements of the subtree in pre-order, and the index of the parent of each one (-1 for the root).
+// The counter object holds the latest assigned uid and is updated in place.
+function tagSubtree(root, counter) {
+    const elements = [];
+    const parents = [];
+
+    const toVisit = [root];
+    const toVisitParents = [-1];
+
+    while (toVisit.length > 0) {
+        const el = toVisit.pop();
+        const parent = toVisitParents.pop();
+        if (parent >= 0) {
+            if (!el.hasAttribute('wtl-uid')) {
+                tagElement(el, ++counter.latestWTLUid);
+            }
+            const parentUid = elements[parent].getAttribute('wtl-uid');
+            if (el.getAttribute('wtl-parent-uid') !== parentUid) {
+                el.attributes.setNamedItem(createCustomAttribute('wtl-parent-uid', parentUid));
+            }
+        }
+
+        const index = elements.length;
+        elements.push(el);
+        parents.push(parent);
+        for (let child = el.lastElementChild; child; child = child.previousElementSibling) {
+            toVisit.push(child);
+            toVisitParents.push(index);
+        }
+    }
+
+    window.wtlLatestUid = counter.latestWTLUid;
+    return {elements: elements, parents: parents};
+}
+
+// Read phase: returns the metadata of a subtree tagged by tagSubtree, in pre-order.
+// With skipHiddenSubtrees, the descendants of elements with display: none are left out.
+// The result of aggregateSubtree for every element is kept in cache, if given.
+function readSubtree(tagged, cache) {
+    const elements = [];
+    const res = [];
+    const visitedChildren = [];
+
+    // Per tagged element: its metadata, and whether its children are extracted
+    const metadata = new Array(tagged.elements.length);
+    const expanded = new Array(tagged.elements.length);
+
+    for (let i = 0; i < tagged.elements.length; i++) {
+        const el = tagged.elements[i];
+        const parent = tagged.parents[i];
+        if (parent >= 0 && !expanded[parent]) {
+            expanded[i] = false;
+            continue;
+        }
+
+        metadata[i] = extractMetadata(el, parent >= 0 ? metadata[parent].fixed_pos === true : undefined, true);
+        expanded[i] = !skipHiddenSubtrees || window.getComputedStyle(el).getPropertyValue('display') !== 'none';
+        elements.push(el);
+        res.push(metadata[i]);
+        visitedChildren.push(expanded[i]);
+    }
+
+    aggregateSubtree(elements, res, visitedChildren, cache);
+    return res;
+}
+
+// Assigns uids to untagged elements below root and returns the metadata of the subtree in pre-order.
+function extractSubtree(root, counter, cache) {
+    return readSubtree(tagSubtree(root, counter), cache);
+}
+
+// Only assigns uids to all elements of the page, for extraction engines outside of the page (see domsnapshot.py).
+// Returns the number of elements.
+function tagPage(counter) {
+    document.body.setAttribute('wtl-uid', 0);
+    document.body.setAttribute('wtl-parent-uid', -1);
+    counter.latestWTLUid = latestAssignedUid();
+    return tagSubtree(document.body, counter).elements.length;
+}
+
+function extractPage(counter, cache) {
+    document.body.setAttribute('wtl-uid', 0);
+    document.body.setAttribute('wtl-parent-uid', -1);
+    counter.latestWTLUid = latestAssignedUid();
+    return extractSubtree(document.body, counter, cache);
+}
+
+// With a chunk size, metadata that does not fit in one chunk is kept in the page to be read by
+// read_element_metadata.js, a chunk at a time, instead of being returned in one (possibly huge) response.
+// Each chunk is kept serialized, so that the metadata objects are released as soon as they are, and the
+// buffer holds compact JSON strings until they are read.
+// This does not lower the peak memory use of the page while extracting, as the text and image counts of an element
+// depend on its whole subtree: all elements are extracted before the first chunk is serialized.
+function deliver(elements, chunkSize) {
+    if (!chunkSize || elements.length <= chunkSize) return elements;
+    const chunks = [];
+    for (let offset = 0; offset < elements.length; offset += chunkSize) {
+        chunks.push(JSON.stringify(elements.slice(offset, offset + chunkSize)));
+        elements.fill(null, offset, offset + chunkSize);
+    }
+    window.wtlMetadataBuffer = chunks;
+    return {buffered: elements.length, chunks: chunks.length};
+}
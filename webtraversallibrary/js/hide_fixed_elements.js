@@ -0,0 +1,54 @@
+// Licensed to the Apache Software Foundation (ASF) under one
+// or more contributor license agreements.  See the NOTICE file
+// distributed with this work for additional information
+// regarding copyright ownership.  The ASF licenses this file
+// to you under the Apache License, Version 2.0 (the
+// "License"); you may not use this file except in compliance
+// with the License.  You may obtain a copy of the License at
+//
+//   http://www.apache.org/licenses/LICENSE-2.0
+//
+// Unless required by applicable law or agreed to in writing,
+// software distributed under the License is distributed on an
+// "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+// KIND, either express or implied.  See the License for the
+// specific language governing permissions and limitations
+// under the License.
+
+
+// Hides all elements that are fixed or sticky (the ones that stay in the viewport when you scroll) by setting their
+// visibility to "hidden". They are found in a single pass over the page, in which the descendants of such elements
+// are skipped, and all of them are hidden after it, so that reading styles does not alternate with changing them.
+// Returns a map from wtl-hidden-uid to the old visibility values, for show_position_fixed_elements.js.
+
+function nextOutsideOf(walker) {
+    let next = walker.nextSibling();
+    while (!next && walker.parentNode()) {
+        next = walker.nextSibling();
+    }
+    return next;
+}
+
+const fixedElements = [];
+const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_ELEMENT);
+let el = walker.nextNode();
+while (el) {
+    const position = window.getComputedStyle(el).getPropertyValue('position');
+    if (position === 'fixed' || position === 'sticky') {
+        fixedElements.push(el);
+        el = nextOutsideOf(walker);
+    } else {
+        el = walker.nextNode();
+    }
+}
+
+const hiddenElementStates = {};
+window.wtlHiddenUid = window.wtlHiddenUid || 0;
+for (const element of fixedElements) {
+    if (!element.hasAttribute('wtl-hidden-uid')) {
+        element.setAttribute('wtl-hidden-uid', window.wtlHiddenUid++);
+    }
+    hiddenElementStates[element.getAttribute('wtl-hidden-uid')] = element.style.visibility;
+    element.style.visibility = 'hidden';
+}
+return hiddenElementStates;
@@ -0,0 +1,153 @@
+// Licensed to the Apache Software Foundation (ASF) under one
+// or more contributor license agreements.  See the NOTICE file
+// distributed with this work for additional information
+// regarding copyright ownership.  The ASF licenses this file
+// to you under the Apache License, Version 2.0 (the
+// "License"); you may not use this file except in compliance
+// with the License.  You may obtain a copy of the License at
+//
+//   http://www.apache.org/licenses/LICENSE-2.0
+//
+// Unless required by applicable law or agreed to in writing,
+// software distributed under the License is distributed on an
+// "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+// KIND, either express or implied.  See the License for the
+// specific language governing permissions and limitations
+// under the License.
+
+
+// Tracks changes to the page with a MutationObserver between scrapes, so that only the subtrees that changed
+// need to be extracted again. Requires element_metadata.js.
+
+function currentLayout() {
+    const root = document.documentElement;
+    return [window.innerWidth, window.innerHeight, window.scrollX, window.scrollY, root.scrollWidth, root.scrollHeight];
+}
+
+function recordMutations(state, records) {
+    for (const record of records) {
+        if (record.type === 'attributes' && record.attributeName.startsWith('wtl-')) continue;
+        const node = record.target.nodeType === Node.ELEMENT_NODE ? record.target : record.target.parentElement;
+        if (node) state.dirty.add(node);
+    }
+}
+
+function finish(state) {
+    // Forget the mutations caused by tagging new elements
+    state.observer.takeRecords();
+    state.dirty.clear();
+    state.layout = currentLayout();
+}
+
+function fullScrape(previous, reason, chunkSize) {
+    if (previous) previous.observer.disconnect();
+
+    const state = {
+        id: Date.now().toString(36) + Math.random().toString(36).slice(2),
+        body: document.body,
+        dirty: new Set(),
+        // What aggregateSubtree composed for each element, to compose the ancestors of changed subtrees from
+        texts: new WeakMap(),
+        latestWTLUid: 0
+    };
+    const elements = extractPage(state, state.texts);
+
+    state.observer = new MutationObserver(records => recordMutations(state, records));
+    state.observer.observe(document.documentElement, {
+        subtree: true, childList: true, attributes: true, characterData: true
+    });
+    finish(state);
+    window.wtlMutationState = state;
+
+    return {id: state.id, full: true, reason: reason, elements: deliver(elements, chunkSize)};
+}
+
+function isDirty(state, el) {
+    return state.dirty.has(el) && el.isConnected;
+}
+
+// Returns the metadata of the ancestors of changed subtrees, whose texts and image counts are composed from those of
+// their children like in a full scrape (see aggregateSubtree), or null if a child was not extracted before.
+// The changed subtrees must have been read, so that the results for them are in state.texts.
+function readAncestors(state, ancestors) {
+    // Descendants come after their ancestors in document order, so this composes every element after its children
+    const ordered = Array.from(ancestors).sort((a, b) =>
+        a.compareDocumentPosition(b) & Node.DOCUMENT_POSITION_FOLLOWING ? 1 : -1);
+    const withText = wants('text');
+    const withAggregated = withText || wants('num_imgs') || wants('num_svgs');
+
+    const res = [];
+    for (const el of ordered) {
+        const metadata = extractMetadata(el, undefined, true);
+        if (withAggregated) {
+            for (let child = el.firstElementChild; child; child = child.nextElementSibling) {
+                if (!state.texts.has(child)) return null;
+            }
+            const info = composeElement(el, withText ? textStyle(el) : null, withText && isRendered(el),
+                child => state.texts.get(child));
+            state.texts.set(el, info);
+            setAggregated(el, metadata, info);
+        }
+        res.push(metadata);
+    }
+    return res.reverse();
+}
+
+// Extracts only the subtrees that changed since the last scrape of this document, as recorded by a
+// MutationObserver installed on the previous call. A full scrape is made (and the observer installed) if
+// the page has no observer yet, if Python does not know the previous scrape, if the viewport was resized
+// or scrolled, or if something outside the body changed.
+function extractIncremental(knownIds, chunkSize) {
+    const previous = window.wtlMutationState;
+
+    if (!previous || previous.body !== document.body) return fullScrape(previous, 'new document', chunkSize);
+    if (!knownIds.includes(previous.id)) return fullScrape(previous, 'unknown scrape', chunkSize);
+
+    recordMutations(previous, previous.observer.takeRecords());
+
+    const layout = currentLayout();
+    if (layout.some((value, i) => value !== previous.layout[i])) {
+        return fullScrape(previous, 'layout changed', chunkSize);
+    }
+
+    // The topmost dirty elements, everything below them is extracted again
+    const roots = [];
+    for (const el of previous.dirty) {
+        if (!el.isConnected) continue;
+        if (!document.body.contains(el) || !el.hasAttribute('wtl-uid')) {
+            return fullScrape(previous, 'outside body', chunkSize);
+        }
+
+        let covered = false;
+        for (let ancestor = el.parentElement; ancestor && !covered; ancestor = ancestor.parentElement) {
+            covered = isDirty(previous, ancestor);
+        }
+        if (!covered) roots.push(el);
+    }
+
+    // Ancestors of changed subtrees have new texts and counts, and are checked for geometry changes by the caller
+    const ancestors = new Set();
+    for (const root of roots) {
+        for (let ancestor = root.parentElement; ancestor && ancestor !== document.documentElement;
+             ancestor = ancestor.parentElement) {
+            if (ancestors.has(ancestor)) break;
+            ancestors.add(ancestor);
+        }
+    }
+
+    // All changed subtrees are tagged before any of them is read
+    const tagged = roots.map(root => tagSubtree(root, previous));
+    const subtrees = tagged.map(subtree => readSubtree(subtree, previous.texts));
+    const ancestorsMetadata = readAncestors(previous, ancestors);
+    if (!ancestorsMetadata) return fullScrape(previous, 'unknown children', chunkSize);
+
+    const result = {
+        id: previous.id,
+        full: false,
+        roots: subtrees,
+        ancestors: ancestorsMetadata
+    };
+
+    finish(previous);
+    return result;
+}
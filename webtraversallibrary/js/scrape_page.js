@@ -0,0 +1,55 @@
+// Licensed to the Apache Software Foundation (ASF) under one
+// or more contributor license agreements.  See the NOTICE file
+// distributed with this work for additional information
+// regarding copyright ownership.  The ASF licenses this file
+// to you under the Apache License, Version 2.0 (the
+// "License"); you may not use this file except in compliance
+// with the License.  You may obtain a copy of the License at
+//
+//   http://www.apache.org/licenses/LICENSE-2.0
+//
+// Unless required by applicable law or agreed to in writing,
+// software distributed under the License is distributed on an
+// "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+// KIND, either express or implied.  See the License for the
+// specific language governing permissions and limitations
+// under the License.
+
+
+// Requires element_metadata.js and incremental_metadata.js
+//
+// Gathers everything a page snapshot needs from the browser in one call: the element metadata (see
+// get_element_metadata.js, or get_element_metadata_incremental.js if known scrape ids are given), the page
+// source, title, URL and height, along with how long each part took in milliseconds. With tagOnly, elements are
+// only assigned uids, and their number is returned instead of their metadata.
+
+const chunkSize = arguments[0];
+setExtractionOptions(arguments[1]);
+const knownIds = arguments[2];
+const tagOnly = arguments[3];
+
+const timings = {};
+let start = performance.now();
+let elements;
+if (tagOnly) {
+    elements = tagPage({latestWTLUid: 0});
+} else if (knownIds) {
+    elements = extractIncremental(knownIds, chunkSize);
+} else {
+    elements = deliver(extractPage({latestWTLUid: 0}), chunkSize);
+}
+timings.metadata = performance.now() - start;
+
+start = performance.now();
+const html = document.documentElement;
+const source = html.innerHTML;
+timings.source = performance.now() - start;
+
+return {
+    elements: elements,
+    source: source,
+    title: document.title,
+    url: window.location.href,
+    full_height: Math.max(html.scrollHeight, html.offsetHeight, document.body.scrollHeight, document.body.offsetHeight),
+    timings: timings
+};
@@ -0,0 +1,42 @@
+// Licensed to the Apache Software Foundation (ASF) under one
+// or more contributor license agreements.  See the NOTICE file
+// distributed with this work for additional information
+// regarding copyright ownership.  The ASF licenses this file
+// to you under the Apache License, Version 2.0 (the
+// "License"); you may not use this file except in compliance
+// with the License.  You may obtain a copy of the License at
+//
+//   http://www.apache.org/licenses/LICENSE-2.0
+//
+// Unless required by applicable law or agreed to in writing,
+// software distributed under the License is distributed on an
+// "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+// KIND, either express or implied.  See the License for the
+// specific language governing permissions and limitations
+// under the License.
+
+
+// This script must be executed asynchronously, with the coordinates to scroll to and a timeout in milliseconds.
+// Instead of sleeping for a fixed time after scrolling, it waits until the page has settled: until the scroll
+// position and the height of the page have stayed the same for two animation frames, or the timeout has passed.
+// Calls back with the vertical scroll position reached.
+
+const [x, y, timeout, callback] = arguments;
+window.scrollTo(x, y);
+
+const start = performance.now();
+let previous = null;
+let stableFrames = 0;
+
+function check() {
+    const state = [window.scrollX, window.scrollY, document.documentElement.scrollHeight].join();
+    stableFrames = state === previous ? stableFrames + 1 : 0;
+    previous = state;
+    if (stableFrames >= 2 || performance.now() - start > timeout) {
+        callback(window.scrollY);
+    } else {
+        requestAnimationFrame(check);
+    }
+}
+
+requestAnimationFrame(check);
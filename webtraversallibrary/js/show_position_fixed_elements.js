@@ -20,6 +20,7 @@
 
 let changedElements = arguments[0];
 
-Array.from(changedElements).forEach(uid => {
-    document.querySelector("[wtl-hidden-uid='" + uid + "']").style.visibility = changedElements[uid];
+Object.keys(changedElements || {}).forEach(uid => {
+    const element = document.querySelector("[wtl-hidden-uid='" + uid + "']");
+    if (element) element.style.visibility = changedElements[uid];
 });
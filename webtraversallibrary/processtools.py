@@ -55,6 +55,27 @@ class cached_property:
         return result
 
 
+class cached_slot_property(cached_property):
+    """
+    Variant of :class:`cached_property` for classes using ``__slots__``.
+    The value is cached in the slot with the same name prefixed by an underscore, which the class must declare.
+    """
+
+    def __init__(self, method):
+        super().__init__(method)
+        self.slot = "_" + self.name
+
+    def __get__(self, inst, cls):
+        if inst is None:
+            return self
+        try:
+            return getattr(inst, self.slot)
+        except AttributeError:
+            result = self.method(inst)
+            object.__setattr__(inst, self.slot, result)
+            return result
+
+
 class Alarm(Thread):
     """Helper class to run a timeout thread on Windows"""
 
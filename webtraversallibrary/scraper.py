@@ -21,12 +21,12 @@ Module for scraping a website and saving contents to file.
 
 import logging
 import os.path
+from collections import OrderedDict, defaultdict
 from datetime import datetime
 from pathlib import Path
-from time import sleep
-from typing import Callable, Dict, List
+from time import perf_counter, sleep
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
-import bs4
 from selenium.common.exceptions import TimeoutException, UnexpectedAlertPresentException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webdriver import WebDriver
@@ -34,6 +34,8 @@ from selenium.webdriver.support.wait import WebDriverWait
 from urllib3.util import parse_url
 
 from .config import Config
+from .domsnapshot import capture_snapshot, elements_metadata_from_snapshot
+from .error import ScrapingError, WebDriverSendError
 from .javascript import JavascriptWrapper
 from .processtools import TimeoutContext
 from .screenshot import Screenshot
@@ -42,6 +44,117 @@ from .version import __version__
 
 logger = logging.getLogger("wtl")
 
+ELEMENT_FIELDS = (
+    "id",
+    "tag",
+    "class",
+    "attributes",
+    "type",
+    "href",
+    "size",
+    "location",
+    "text",
+    "text_local",
+    "children_count",
+    "num_imgs",
+    "num_svgs",
+    "background",
+    "background_image",
+    "fixed_pos",
+    "wtl_uid",
+    "wtl_parent_uid",
+    "display",
+    "visibility",
+    "font_weight",
+    "font_size",
+)
+"""
+The fields of element metadata extracted by the browser. Anything else is added afterwards, e.g. by classifiers.
+
+The ``text`` of an element is its ``innerText`` (or ``value`` for inputs), but composed from the texts of its
+children in a single pass over the page instead of being computed by the browser for every element (by either
+scraping engine, see :mod:`webtraversallibrary.domsnapshot`). It follows the innerText algorithm, and differs from
+what the browser returns in these cases only:
+
+- Collapsible white space is collapsed within and between text nodes, and removed around forced line breaks.
+  Line breaks between characters of East Asian scripts are turned into spaces, where the browser may drop them.
+- Block elements are those with a computed ``display`` of block, flex, grid, list-item, table, table-caption or
+  flow-root. Other block-level displays (e.g. ``table-row-group``) add no line breaks.
+- A table cell or row is followed by a tab or line break if it has a next sibling element, even one that is not a
+  cell or row, or is not rendered.
+- ``text-transform: capitalize`` only capitalizes ASCII letters at word boundaries, and ``full-width`` and
+  ``full-size-kana`` are ignored.
+- The text of form controls other than inputs, e.g. the default value of a ``<textarea>`` or the options of a
+  ``<select>``, is included like that of any other element.
+- Elements with a shadow root get the text of their own children, not of what is rendered from the shadow tree.
+
+Hidden descendants are left out like the browser does: text in elements with ``visibility`` other than ``visible``,
+and elements with ``display: none`` and everything below them. An element that is not rendered itself gets its
+``textContent``, also like the browser.
+"""
+
+INCREMENTAL_HISTORY = 8
+"""How many previous scrapes are remembered by a scraper for incremental scraping, one per tab."""
+
+
+def merge_incremental_metadata(
+    previous: List[Dict[str, Any]], result: Dict[str, Any]
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Combines the element metadata of a previous scrape with the result of an incremental scrape, see
+    :func:`JavascriptWrapper.get_element_metadata_incremental`. The changed subtrees replace the old ones,
+    all other elements are copied from ``previous`` without any fields added after scraping.
+
+    Returns None if a changed element or one of its ancestors has moved or been resized, since other elements may
+    then have moved as well, or if the result does not fit the previous scrape. A full scrape is needed instead.
+    """
+    subtrees = {elements[0]["wtl_uid"]: elements for elements in result["roots"]}
+    changed = {metadata["wtl_uid"]: metadata for metadata in result["ancestors"]}
+    changed.update((uid, elements[0]) for uid, elements in subtrees.items())
+    if _have_moved(previous, changed):
+        return None
+
+    removed = _descendants(previous, subtrees)
+    merged = []
+    for metadata in previous:
+        uid = metadata["wtl_uid"]
+        if uid in subtrees:
+            merged.extend(subtrees[uid])
+        elif uid in changed:
+            merged.append(changed[uid])
+        elif uid not in removed:
+            merged.append({key: metadata[key] for key in ELEMENT_FIELDS if key in metadata})
+
+    # Elements copied by page scripts keep their wtl-uid attribute, which must not clash with an unchanged element
+    if len({metadata["wtl_uid"] for metadata in merged}) != len(merged):
+        return None
+
+    return merged
+
+
+def _have_moved(previous: List[Dict[str, Any]], changed: Dict[int, Dict[str, Any]]) -> bool:
+    """Checks if any changed element is new, or has moved or been resized since the previous scrape."""
+    old = {metadata["wtl_uid"]: metadata for metadata in previous}
+    for uid, metadata in changed.items():
+        before = old.get(uid)
+        if before is None or before["location"] != metadata["location"] or before["size"] != metadata["size"]:
+            return True
+    return False
+
+
+def _descendants(previous: List[Dict[str, Any]], roots: Iterable[int]) -> Set[int]:
+    """Returns the wtl-uids of all elements of the previous scrape below the given ones."""
+    children = defaultdict(list)
+    for metadata in previous:
+        children[metadata["wtl_parent_uid"]].append(metadata["wtl_uid"])
+    descendants = set()
+    to_visit = [uid for root in roots for uid in children[root]]
+    while to_visit:
+        uid = to_visit.pop()
+        descendants.add(uid)
+        to_visit.extend(children[uid])
+    return descendants
+
 
 class Scraper:
     """
@@ -57,6 +170,16 @@ class Scraper:
         self.js = JavascriptWrapper(self.driver, config)
         self.postload_callbacks = postload_callbacks
         self.device_pixel_ratio = self.js.execute_script("return window.devicePixelRatio;") or 1.0
+        self._previous_scrapes: OrderedDict[str, List[Dict[str, Any]]] = OrderedDict()
+
+        self.use_cdp = config.scraping.engine == "cdp" and not config.scraping.incremental
+        if self.use_cdp and driver.name != "chrome":
+            logger.warning(f"The cdp scraping engine is not available in {driver.name}, using javascript instead")
+            self.use_cdp = False
+
+        unknown_fields = set(config.scraping.fields) - set(ELEMENT_FIELDS)
+        if unknown_fields:
+            raise ValueError(f"Unknown element fields in config.scraping.fields: {sorted(unknown_fields)}")
 
     def scrape_current_page(self) -> PageSnapshot:
         """
@@ -72,7 +195,7 @@ class Scraper:
                 attempts -= 1
                 snapshot = self._create_snapshot()
                 break
-            except WebDriverException as e:
+            except (WebDriverException, ScrapingError) as e:
                 logger.error(e)
                 if attempts <= 0:
                     raise
@@ -156,7 +279,12 @@ class Scraper:
         Captures the screenshot of the current rendering in the browser window.
         """
         return Screenshot.capture(
-            name=name, driver=self.driver, scale=1 / self.device_pixel_ratio, max_page_height=max_page_height
+            name=name,
+            driver=self.driver,
+            scale=1 / self.device_pixel_ratio,
+            max_page_height=max_page_height,
+            image_format=self.config.debug.screenshot_format,
+            quality=self.config.debug.screenshot_quality,
         )
 
     def get_page_as_mhtml(self) -> bytes:
@@ -189,12 +317,114 @@ class Scraper:
         with open(folder / filename, "rb") as f:
             return f.read()
 
+    def get_elements_metadata(self) -> List[Dict[str, Any]]:
+        """
+        Gathers the metadata of all elements on the current page. With ``config.scraping.incremental``, only the
+        parts of the page that changed since the previous scrape of the same document are extracted again,
+        falling back to a full scrape if the page has been scrolled or resized, or elements have moved.
+        """
+        chunk_size, options = self._metadata_options()
+        if not self.config.scraping.incremental:
+            return self.js.get_element_metadata(chunk_size, **options) or []
+        return self._incremental_metadata(
+            self.js.get_element_metadata_incremental(self._previous_scrapes.keys(), chunk_size, **options)
+        )
+
+    def _metadata_options(self) -> Tuple[int, Dict[str, Any]]:
+        options = {
+            "fields": self.config.scraping.fields,
+            "skip_hidden_subtrees": self.config.scraping.skip_hidden_subtrees,
+        }
+        if self.config.scraping.incremental and options["fields"]:
+            # Needed to detect elements that have moved
+            options["fields"] = list(options["fields"]) + ["location", "size"]
+        return self.config.scraping.metadata_chunk_size, options
+
+    def _incremental_metadata(self, result: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merges the result of an incremental scrape with the previous one, see :func:`get_elements_metadata`."""
+        if not result:
+            return []
+
+        if result["full"]:
+            logger.debug(f"Full scrape of the page ({result['reason']})")
+            elements_metadata = result["elements"] or []
+        else:
+            elements_metadata = merge_incremental_metadata(self._previous_scrapes[result["id"]], result)
+            if elements_metadata is None:
+                logger.debug("Elements have moved since the previous scrape, falling back to a full scrape")
+                chunk_size, options = self._metadata_options()
+                result = self.js.get_element_metadata_incremental([], chunk_size, **options)
+                if not result:
+                    return []
+                elements_metadata = result["elements"] or []
+            else:
+                logger.debug(f"Incremental scrape of {len(result['roots'])} changed subtrees")
+
+        self._previous_scrapes[result["id"]] = elements_metadata
+        self._previous_scrapes.move_to_end(result["id"])
+        while len(self._previous_scrapes) > INCREMENTAL_HISTORY:
+            self._previous_scrapes.popitem(last=False)
+
+        return elements_metadata
+
+    def _scrape_page(self) -> Dict[str, Any]:
+        """
+        Collects the element metadata, page source, title, URL and height of the current page, in a single
+        round trip to the browser if possible.
+        """
+        chunk_size, options = self._metadata_options()
+        if self.use_cdp:
+            result = self._scrape_page_cdp(options)
+            if result:
+                return result
+
+        known_ids = list(self._previous_scrapes) if self.config.scraping.incremental else None
+        result = self.js.scrape_page(chunk_size, known_ids=known_ids, **options)
+
+        if result:
+            if known_ids is not None:
+                result["elements"] = self._incremental_metadata(result["elements"])
+            result["elements"] = result["elements"] or []
+            return result
+
+        # Fall back to separate calls, e.g. if the script failed
+        return {
+            "elements": self.get_elements_metadata(),
+            "source": self.driver.find_element(By.XPATH, "/html").get_attribute("innerHTML"),
+            "title": self.driver.title,
+            "url": self.driver.current_url,
+            "full_height": self.js.get_full_height(),
+            "timings": {},
+        }
+
+    def _scrape_page_cdp(self, options: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Like :func:`_scrape_page`, but with the element metadata extracted from a DOM snapshot of the page
+        (see :mod:`webtraversallibrary.domsnapshot`). Returns None if that fails.
+        """
+        result = self.js.scrape_page(tag_only=True)
+        if not result:
+            return None
+
+        start = perf_counter()
+        try:
+            snapshot = capture_snapshot(self.driver)
+        except WebDriverSendError as e:
+            logger.warning(f"Failed to capture a DOM snapshot, using javascript instead: {e}")
+            return None
+        result["timings"]["capture"] = 1000 * (perf_counter() - start)
+
+        start = perf_counter()
+        result["elements"] = elements_metadata_from_snapshot(snapshot, **options)
+        result["timings"]["metadata"] = 1000 * (perf_counter() - start)
+        return result
+
     def _create_snapshot(self) -> PageSnapshot:
         before = datetime.now()
-
-        logger.debug(f"Page title: {self.driver.title}")
+        timings: Dict[str, float] = {}
 
         # Create screenshots if required
+        start = perf_counter()
         screenshots: Dict[str, Screenshot] = {}
         if self.config.debug.screenshots:
             max_page_height = self.config.scrolling.max_page_height
@@ -203,24 +433,29 @@ class Scraper:
                 screenshots["full"] = screenshots["first"].copy("full")
             else:
                 screenshots["full"] = self.capture_screenshot("full", max_page_height=max_page_height)
+        timings["screenshots"] = 1000 * (perf_counter() - start)
+
+        # Gather element and page metadata
+        start = perf_counter()
+        page = self._scrape_page()
+        timings["scrape"] = 1000 * (perf_counter() - start)
+        timings.update(page["timings"])
 
-        # Gather element metadata
-        elements_metadata = self.js.get_element_metadata() or []
+        elements_metadata = page["elements"]
         num_elements = len(elements_metadata)
+        logger.debug(f"Page title: {page['title']}")
 
-        # Gather page metadata
-        inner_html = self.driver.find_element(By.XPATH, "/html").get_attribute("innerHTML")
-        page_source = bs4.BeautifulSoup(f"<!DOCTYPE html><html>{inner_html}</html>", self.config.bs_html_parser)
         page_metadata = {
             "timestamp": before.isoformat(),
-            "url": self.driver.current_url,
-            "title": self.driver.title,
+            "url": page["url"],
+            "title": page["title"],
             "driver": self.driver.name,
-            "full_page_size": (self.config.browser.width, self.js.get_full_height()),
+            "full_page_size": (self.config.browser.width, page["full_height"]),
             "device_pixel_ratio": self.device_pixel_ratio,
             "num_elements": num_elements,
             "screenshots": list(screenshots.keys()),
             "wtl_version": __version__,
+            "timings": timings,
         }
 
         milliseconds_passed = (datetime.now() - before).total_seconds() * 1000
@@ -229,15 +464,21 @@ class Scraper:
         else:
             logger.info(f"Found {num_elements} " f"elements in {milliseconds_passed:.2f}ms")
 
+        start = perf_counter()
         mhtml_source = self.get_page_as_mhtml() if self.config.scraping.save_mhtml else None
+        if self.config.scraping.save_mhtml:
+            timings["mhtml"] = 1000 * (perf_counter() - start)
 
         # Assemble snapshot
         snapshot = PageSnapshot(
-            page_source=page_source,
+            page_source=None,
+            raw_source=f"<!DOCTYPE html><html>{page['source']}</html>",
             page_metadata=page_metadata,
             elements_metadata=elements_metadata,
             screenshots=screenshots,
             mhtml_source=mhtml_source,
+            bs4_parser=self.config.bs_html_parser,
+            dom_backend=self.config.dom_backend,
         )
 
         return snapshot
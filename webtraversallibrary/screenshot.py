@@ -19,110 +19,306 @@
 
 from __future__ import annotations
 
+import base64
 import io
+import logging
 import os
-import time
-from math import ceil
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
+import numpy as np
 from PIL import Image
 from selenium.webdriver.remote.webdriver import WebDriver
 
 from .color import Color
+from .error import WebDriverSendError
 from .geometry import Point, Rectangle
 from .graphics import draw_rect, draw_text
 from .javascript import JavascriptWrapper
+from .webdrivers import send
+
+logger = logging.getLogger("wtl")
+
+
+IMAGE_FORMATS = {"png": "PNG", "jpeg": "JPEG", "webp": "WEBP"}
+"""Supported screenshot encodings, and their names in PIL."""
+
+SUFFIXES = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+
+SETTLE_TIMEOUT = 1.0
+"""The longest time to wait for a page to settle after scrolling, in seconds."""
+
+
+def encoded_format(data: bytes) -> str:
+    """Returns the format of an encoded image, from its signature."""
+    if data[:2] == b"\xff\xd8":
+        return "jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "png"
+
+
+def encode_image(image: Image.Image, image_format: str = "png", quality: int = None) -> bytes:
+    """Encodes an image in one of the :data:`IMAGE_FORMATS`, with a quality (0-100) for the lossy ones."""
+    buffer = io.BytesIO()
+    if quality is not None and image_format != "png":
+        image.save(buffer, format=IMAGE_FORMATS[image_format], quality=quality)
+    else:
+        image.save(buffer, format=IMAGE_FORMATS[image_format])
+    return buffer.getvalue()
+
+
+def screenshot_file(name: str, exists: Callable[[str], bool]) -> str:
+    """Returns the file name of a saved screenshot in any of the formats, given a test for whether a file exists."""
+    for suffix in SUFFIXES.values():
+        if exists(name + suffix):
+            return name + suffix
+    return name + SUFFIXES["png"]
 
 
 class Screenshot:
-    """Abstraction layer for a screenshot of a site, allowing for various annotations."""
+    """
+    Abstraction layer for a screenshot of a site, allowing for various annotations.
+    Instead of an image, a function returning it may be given, which is called when ``image`` is first accessed,
+    or the encoded image, which is kept as is until the pixels are modified: it is only decoded when the pixels
+    are needed, and saved without encoding it again.
+    """
 
-    def __init__(self, name: str, image: Image.Image):
+    def __init__(
+        self, name: str, image: Image.Image = None, loader: Callable[[], Image.Image] = None, data: bytes = None
+    ):
+        assert image is not None or loader is not None or data is not None, "Either an image or a loader is required"
         self.name = name
-        self.image = image
+        self._image = image
+        self._loader = loader
+        self._data = bytes(data) if data is not None else None
+        # Set when the image object is also used by a copy of this screenshot, see copy
+        self._shared = False
+        self._pixels: Optional[np.ndarray] = None
+
+    @property
+    def image(self) -> Image.Image:
+        """
+        The screenshot image, loaded on first access if the screenshot was created with a loader or encoded data.
+        It may be modified: it is copied first if it is shared with copies of this screenshot, and the encoded data
+        is dropped. Use :attr:`readonly_image` to only read the pixels.
+        """
+        image = self.readonly_image
+        if self._shared:
+            image = image.copy()
+            self._shared = False
+        self._image = image
+        self._data = None
+        self._pixels = None
+        return image
+
+    @image.setter
+    def image(self, image: Image.Image):
+        self._image = image
+        self._loader = None
+        self._data = None
+        self._shared = False
+        self._pixels = None
+
+    @property
+    def readonly_image(self) -> Image.Image:
+        """The screenshot image, like :attr:`image`, but which must not be modified."""
+        if self._image is None:
+            if self._data is not None:
+                self._image = Image.open(io.BytesIO(self._data)).convert("RGB")
+            else:
+                self._image = self._loader()
+                self._loader = None
+        return self._image
+
+    @property
+    def pixels(self) -> np.ndarray:
+        """
+        The pixels of the screenshot as a read-only (height, width, channels) array, converted once from
+        :attr:`readonly_image` and kept until the image is modified.
+        """
+        if self._pixels is None:
+            self._pixels = np.asarray(self.readonly_image)
+            self._pixels.flags.writeable = False
+        return self._pixels
+
+    def crops(
+        self, rects: Union[Iterable[Rectangle], np.ndarray], size: Tuple[int, int] = None
+    ) -> Union[List[Optional[np.ndarray]], np.ndarray]:
+        """
+        Crops many rectangles at once from :attr:`pixels`. The rectangles, or rows of (min x, min y, max x, max y),
+        are clipped to the screenshot like :attr:`PageElement.screenshot` does, and rounded like PIL.
+
+        Returns a list of read-only views into :attr:`pixels`, with None for rectangles outside the screenshot.
+        With a (width, height) ``size``, returns one (rectangles, height, width, channels) array instead, where each
+        crop is cut to the size at its top left corner and padded with zeros.
+        """
+        pixels = self.pixels
+        height, width = pixels.shape[:2]
+        rows = rects if isinstance(rects, np.ndarray) else [rect.bounds for rect in rects]
+        boxes = np.asarray(rows, dtype=float).reshape(-1, 4)
+
+        clipped = np.clip(boxes, 0, [width, height, width, height])
+        inside = (clipped[:, 2] > clipped[:, 0]) & (clipped[:, 3] > clipped[:, 1])
+        bounds = np.rint(clipped).astype(int)
+
+        if size is None:
+            return [
+                pixels[y0:y1, x0:x1] if is_inside else None
+                for (x0, y0, x1, y1), is_inside in zip(bounds.tolist(), inside.tolist())
+            ]
+
+        crop_width, crop_height = size
+        batch = np.zeros((len(boxes), crop_height, crop_width) + pixels.shape[2:], dtype=pixels.dtype)
+        for row in np.flatnonzero(inside):
+            x0, y0, x1, y1 = bounds[row]
+            crop = pixels[y0 : min(y1, y0 + crop_height), x0 : min(x1, x0 + crop_width)]
+            batch[row, : crop.shape[0], : crop.shape[1]] = crop
+        return batch
+
+    @property
+    def encoded(self) -> Optional[memoryview]:
+        """The encoded image the screenshot was created with, if its pixels have not been modified since."""
+        return memoryview(self._data) if self._data is not None else None
+
+    @property
+    def image_format(self) -> str:
+        """The format the screenshot is saved in, one of :data:`IMAGE_FORMATS`."""
+        return encoded_format(self._data) if self._data is not None else "png"
+
+    @property
+    def is_loaded(self) -> bool:
+        """Returns True if the image is in memory, i.e. it was given or has been loaded."""
+        return self._image is not None or self._data is not None
 
     @classmethod
-    def capture_viewport(cls, name: str, driver: WebDriver, scale: float = 1.0) -> Screenshot:
+    def capture_viewport(
+        cls, name: str, driver: WebDriver, scale: float = 1.0, image_format: str = "png", quality: int = None
+    ) -> Screenshot:
         """
         Creates a screenshot of the current viewport of a given webdriver.
-        Scales the image by some pixel ratio, if given.
-        Uses PIL as a backend.
+        Scales the image by some pixel ratio, if given, and encodes it in some format with some quality, if given.
+        Uses PIL as a backend, but leaves unscaled PNG screenshots encoded.
         """
         page_screenshot_png_bytes = driver.get_screenshot_as_png()
+        if scale == 1.0 and image_format == "png":
+            return Screenshot(name, data=page_screenshot_png_bytes)
+
         image = Image.open(io.BytesIO(page_screenshot_png_bytes)).convert("RGB")
         if scale != 1.0:
             new_size = [int(x * scale) for x in image.size]
             image = image.resize(new_size)
-        return Screenshot(name, image)
+        if image_format == "png":
+            return Screenshot(name, image)
+        return Screenshot(name, data=encode_image(image, image_format, quality))
 
     @classmethod
-    def capture(cls, name: str, driver: WebDriver, scale: float = 1.0, max_page_height: int = 0) -> Screenshot:
+    def capture_area(
+        cls,
+        name: str,
+        driver: WebDriver,
+        area: Rectangle,
+        scale: float = 1.0,
+        image_format: str = "png",
+        quality: int = None,
+        beyond_viewport: bool = True,
+    ) -> Screenshot:
+        """
+        Creates a screenshot of an area of the page, in CSS pixels relative to the document, even beyond the
+        viewport, with one ``Page.captureScreenshot`` call to the DevTools Protocol. Only available in Chromium.
+        Scales the image by some pixel ratio, if given, like :func:`capture_viewport`.
+        The image is encoded by the browser, and left encoded.
+        """
+        params = {
+            "format": image_format,
+            "captureBeyondViewport": beyond_viewport,
+            "clip": {"x": area.x, "y": area.y, "width": area.width, "height": area.height, "scale": scale},
+        }
+        if quality is not None and image_format != "png":
+            params["quality"] = quality
+        return Screenshot(name, data=base64.b64decode(send(driver, "Page.captureScreenshot", params)["data"]))
+
+    @classmethod
+    def capture(
+        cls,
+        name: str,
+        driver: WebDriver,
+        scale: float = 1.0,
+        max_page_height: int = 0,
+        image_format: str = "png",
+        quality: int = None,
+    ) -> Screenshot:
         """
         Creates a snapshot on the given webdriver under certain conditions.
+        In Chromium, the screenshot is taken in one go (see :func:`capture_area`), and otherwise pages longer than
+        the viewport are captured by scrolling through them and stitching screenshots of the viewport, with fixed
+        elements only at the top.
         """
         js = JavascriptWrapper(driver)
         viewport = js.find_viewport()
         if max_page_height < viewport.height:
-            return cls.capture_viewport(name, driver, scale)
-
-        # Capture at least one viewport's height, at most the page's height
-        minimum_length = max(int(viewport.height), js.get_full_height())
-        page_height = min(max_page_height, minimum_length)
-        num_shots = ceil(page_height / viewport.height)
-        viewport_screenshots: List[Image.Image] = []
-        hidden_elements: Dict[int, str] = js.hide_position_fixed_elements()
-
-        try:
-            # We start from bottom, and go up!
-            for shot_idx in range(num_shots, -1, -1):
-                # Don't hide elements at the top
-                if shot_idx == 0 or viewport.height > page_height:
-                    js.show_position_fixed_elements(hidden_elements)
+            page_height = 0
+        else:
+            # Capture at least one viewport's height, at most the page's height
+            minimum_length = max(int(viewport.height), js.get_full_height())
+            page_height = min(max_page_height, minimum_length)
 
-                # Scroll, hide sticky elements, and take viewport screenshot
-                hidden = Screenshot._scroll_to(js, shot_idx * int(viewport.height))
-                hidden_elements.update(hidden)
-                viewport_screenshot = cls.capture_viewport("temp", driver, scale).image
-
-                if shot_idx * viewport.height > page_height - viewport.height:
-                    new_viewport_area = (
-                        0,
-                        0,
-                        viewport.width,
-                        page_height - shot_idx * viewport.height,
-                    )
-                    viewport_screenshot = viewport_screenshot.crop(new_viewport_area)
-
-                # Append screenshot of the current viewport at the top of the image
-                viewport_screenshots.insert(0, viewport_screenshot)
-        finally:
-            # Unhide everything and scroll back to the top
-            js.show_position_fixed_elements(hidden_elements)
+        if getattr(driver, "name", None) == "chrome":
+            if page_height:
+                area, beyond_viewport = Rectangle(Point(0, 0), Point(viewport.width, page_height)), True
+            else:
+                area, beyond_viewport = viewport, False
+            try:
+                return cls.capture_area(name, driver, area, scale, image_format, quality, beyond_viewport)
+            except WebDriverSendError as e:
+                logger.warning(f"Failed to capture the page in one screenshot, using webdriver instead: {e}")
 
-        total_height = sum(image.height for image in viewport_screenshots)
-        final_screenshot = Image.new("RGB", (viewport_screenshots[0].width, total_height))
+        if not page_height:
+            return cls.capture_viewport(name, driver, scale, image_format, quality)
 
-        offset = 0
-        for viewport_screenshot in viewport_screenshots:
-            final_screenshot.paste(viewport_screenshot, (0, offset))
-            offset += viewport_screenshot.height
-
-        return Screenshot(name, final_screenshot)
+        final_screenshot = cls._capture_stitched(driver, js, viewport, page_height, scale)
+        if image_format == "png":
+            return Screenshot(name, final_screenshot)
+        return Screenshot(name, data=encode_image(final_screenshot, image_format, quality))
 
     @classmethod
     def load(cls, name: str, path: Path) -> Screenshot:
-        return cls(name, Image.open(str(path)))
+        """Returns a screenshot of the image at the given path, which is only opened when first needed."""
+        return cls(name, loader=partial(Image.open, str(path)))
+
+    @classmethod
+    def from_bytes(cls, name: str, data: bytes) -> Screenshot:
+        """Creates a screenshot from an encoded image, as returned by :func:`to_bytes`, decoded when first needed."""
+        return cls(name, data=data)
+
+    def to_bytes(self) -> bytes:
+        """Returns the encoded screenshot: the data it was created with if unmodified, otherwise encoded as PNG."""
+        if self._data is not None:
+            return self._data
+        return encode_image(self.readonly_image)
+
+    def filename(self, suffix: str = "") -> str:
+        """The name of the file the screenshot is saved as: its name, an optional suffix, and the format suffix."""
+        stem = f"{self.name}_{suffix}" if suffix else self.name
+        return stem + SUFFIXES[self.image_format]
 
     def save(self, path: Path, suffix: str = ""):
-        """Saves screenshot to given path. Filename consists of the screenshot name
-        and an optional suffix."""
+        """Saves screenshot to given path, see :func:`filename`. Encoded screenshots are written as they are."""
         os.makedirs(path, exist_ok=True)
-        filename = f"{self.name}_{suffix}.png" if suffix else f"{self.name}.png"
-        self.image.save(str(path / filename))
+        if self._data is not None:
+            with open(path / self.filename(suffix), "wb") as f:
+                f.write(self._data)
+        else:
+            self.readonly_image.save(str(path / self.filename(suffix)))
 
     def copy(self, new_name: str) -> Screenshot:
-        return Screenshot(new_name, self.image.copy())
+        """Returns a copy of the screenshot, which shares the image with this one until either is modified."""
+        copy = Screenshot(new_name, self._image, self._loader, self._data)
+        if self._image is not None:
+            self._shared = copy._shared = True
+        return copy
 
     def highlight(self, rect: Rectangle, color: Color, text: str = "", width: int = 1):
         """
@@ -147,20 +343,61 @@ class Screenshot:
 
     @property
     def height(self) -> int:
-        return self.image.height
+        return self._size()[1]
 
     @property
     def width(self) -> int:
-        return self.image.width
+        return self._size()[0]
+
+    def _size(self) -> Tuple[int, int]:
+        if self._image is None and self._data is not None:
+            # Only the header of the image is read
+            with Image.open(io.BytesIO(self._data)) as image:
+                return image.size
+        return self.readonly_image.size
 
     @staticmethod
-    def _scroll_to(js: JavascriptWrapper, y_pos: int, elements: List[str] = None):
-        waiting_time = 0.1
-        hidden: Dict[int, str] = {}
+    def _capture_stitched(
+        driver: WebDriver, js: JavascriptWrapper, viewport: Rectangle, page_height: int, scale: float
+    ) -> Image.Image:
+        """
+        Captures the top ``page_height`` pixels of the page by scrolling through it, one viewport at a time.
+        Fixed and sticky elements are only shown in the first viewport. The screenshots are decoded and pasted
+        into the image on a worker thread while the browser scrolls to the next position.
+        """
+        canvas: List[Image.Image] = []
 
-        js.scroll_to(0, y_pos)
-        time.sleep(waiting_time)
-        hidden = js.hide_position_fixed_elements(elements=elements if elements else [])
-        time.sleep(waiting_time)
+        def paste(png: bytes, offset: float, top: float):
+            # Pastes the part of a viewport screenshot, taken at a scroll position of top, that shows the page from
+            # offset and down. The scroll position is less than the offset if the end of the page was reached.
+            image = Image.open(io.BytesIO(png)).convert("RGB")
+            if scale != 1.0:
+                image = image.resize([int(x * scale) for x in image.size])
+            ratio = image.width / viewport.width
+            if not canvas:
+                canvas.append(Image.new("RGB", (image.width, int(page_height * ratio))))
+            skip = int((offset - top) * ratio)
+            height = min(image.height - skip, canvas[0].height - int(offset * ratio))
+            if height > 0:
+                canvas[0].paste(image.crop((0, skip, image.width, skip + height)), (0, int(offset * ratio)))
+
+        hidden_elements: Dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pasted = []
+            try:
+                for offset in range(0, page_height, int(viewport.height)):
+                    top = js.scroll_to_settled(0, offset, SETTLE_TIMEOUT)
+                    pasted.append(
+                        executor.submit(paste, driver.get_screenshot_as_png(), offset, offset if top is None else top)
+                    )
+                    if offset == 0 and page_height > viewport.height:
+                        hidden_elements = js.hide_fixed_elements()
+            finally:
+                # Unhide everything and scroll back
+                if hidden_elements:
+                    js.show_position_fixed_elements(hidden_elements)
+                js.scroll_to(viewport.x, viewport.y)
+                for future in pasted:
+                    future.result()
 
-        return hidden
+        return canvas[0]
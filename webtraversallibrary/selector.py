@@ -20,16 +20,28 @@ This module contains heuristics for generating selectors.
 """
 from __future__ import annotations
 
+import functools
 import logging
+from collections import Counter
 from dataclasses import dataclass
 from functools import total_ordering
-from typing import Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import bs4
+import soupsieve
 
 logger = logging.getLogger("wtl")
 
 
+@functools.lru_cache(maxsize=1024)
+def compile_css(css: str, namespaces: Tuple[Tuple[str, str], ...] = ()) -> soupsieve.SoupSieve:
+    """
+    Compiles a CSS selector with soupsieve, with caching shared by all snapshots.
+    Use ``compile_css.cache_info()`` to inspect hits and misses.
+    """
+    return soupsieve.compile(css, namespaces=dict(namespaces) or None)
+
+
 @total_ordering
 @dataclass(frozen=True)
 class Selector:
@@ -49,15 +61,32 @@ class Selector:
             return self.xpath < other.xpath
         return len(self.css) < len(other.css)
 
+    def select(self, tag: bs4.Tag) -> List[bs4.Tag]:
+        """
+        Returns all tags below ``tag`` matching the CSS of this selector.
+        Equivalent to ``tag.select(self.css)``, but reuses the compiled pattern between calls.
+        """
+        namespaces = getattr(tag, "_namespaces", None) or {}
+        return compile_css(self.css, tuple(sorted(namespaces.items()))).select(tag)
+
     @classmethod
-    def build(cls, bs4_soup: bs4.BeautifulSoup, target: Union[bs4.Tag, int]) -> Selector:
+    def build(
+        cls, bs4_soup: bs4.BeautifulSoup, target: Union[bs4.Tag, int], tags_by_uid: Dict[int, bs4.Tag] = None
+    ) -> Selector:
         """
         Compute xpath and css of a ``target`` in a bs4.BeautifulSoup.
         Will be verbose. Use a separate generalizer if you want reusable selectors.
+        If ``tags_by_uid`` is given (see :attr:`PageSnapshot.tags_by_uid`), wtl-uid targets are looked up
+        there instead of searching the whole soup.
         """
         # Identify target
         if isinstance(target, bs4.Tag):
             element = target
+        elif tags_by_uid is not None:
+            if target not in tags_by_uid:
+                logger.error("Invalid wtl-uid given to Selector.build, returning blank selector")
+                return cls(css="bad_wtl_uid_no_matches", xpath="bad_wtl_uid_no_matches")
+            element = tags_by_uid[target]
         else:
             options = bs4_soup.find_all(attrs={"wtl-uid": target})
             if len(options) != 1:
@@ -84,6 +113,65 @@ class Selector:
         xpath = "/" + "/".join(reversed(xpath_components)).strip()
         return Selector(css=css, xpath=xpath)
 
+    @classmethod
+    def build_all(cls, bs4_soup: bs4.BeautifulSoup) -> Dict[int, Selector]:
+        """
+        Compute selectors for every tag with a wtl-uid in a bs4.BeautifulSoup, mapped by wtl-uid.
+        Gives the same result as calling :func:`build` on each tag, but in a single top-down pass
+        where each list of siblings is only counted once.
+        """
+        return cls.build_tree(
+            bs4_soup,
+            children=lambda tag: [child for child in tag.children if isinstance(child, bs4.Tag)],
+            name=lambda tag: tag.name,
+            wtl_uid=lambda tag: tag.attrs.get("wtl-uid"),
+        )
+
+    @classmethod
+    def build_tree(
+        cls,
+        root: Any,
+        children: Callable[[Any], List[Any]],
+        name: Callable[[Any], str],
+        wtl_uid: Callable[[Any], Optional[str]],
+    ) -> Dict[int, Selector]:
+        """
+        Generic version of :func:`build_all` for any DOM representation, given functions returning
+        the element children, tag name and wtl-uid attribute of a node.
+        The ``root`` itself (the document) is not part of the selectors.
+        """
+        selectors: Dict[int, Selector] = {}
+        to_visit = [(root, "", "")]
+
+        while to_visit:
+            parent, css, xpath = to_visit.pop()
+            parent_children = children(parent)
+            counts = Counter(name(child) for child in parent_children)
+            indices: Counter = Counter()
+
+            for child in parent_children:
+                child_name = name(child)
+                indices[child_name] += 1
+                safe_name = cls._safe_tag_name(child_name)
+                if counts[child_name] == 1:
+                    css_component, xpath_component = safe_name, safe_name
+                else:
+                    index = indices[child_name]
+                    css_component, xpath_component = f"{safe_name}:nth-of-type({index})", f"{safe_name}[{index}]"
+
+                child_css = f"{css}>{css_component}" if css else css_component
+                child_xpath = f"{xpath}/{xpath_component}"
+                to_visit.append((child, child_css, child_xpath))
+
+                child_uid = wtl_uid(child)
+                if child_uid is not None:
+                    try:
+                        selectors.setdefault(int(child_uid), cls(css=child_css, xpath=child_xpath))
+                    except ValueError:
+                        pass
+
+        return selectors
+
     @classmethod
     def _safe_tag_name(cls, name: str) -> str:
         if ":" in name or "=" in name:
@@ -20,95 +20,221 @@ Static snapshot of a web page. Contains source, screenshots, element images, and
 """
 from __future__ import annotations
 
+import io
 import json
 import logging
 import os
 import re
-from dataclasses import dataclass, field
+import sys
+import threading
+from copy import deepcopy
+from dataclasses import FrozenInstanceError, dataclass, field
+from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Union
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
 
 import bs4
+import numpy as np
 from PIL import Image
 
+from . import container
 from .config import Config
-from .error import ScrapingError
+from .dom import BeautifulSoupBackend, DomBackend, LxmlBackend
+from .error import FieldNotScrapedError, ScrapingError
 from .geometry import Point, Rectangle
 from .graphics import crop_image
-from .processtools import cached_property
-from .screenshot import Screenshot
+from .index import ElementIndex
+from .processtools import cached_property, cached_slot_property
+from .screenshot import Screenshot, screenshot_file
 from .selector import Selector
+from .store import MANIFEST_SUFFIX, SnapshotStore
+from .table import ElementTable
 
 logger = logging.getLogger("wtl")
 
+# Metadata fields whose (string) values repeat across elements and snapshots, and are therefore interned
+INTERNED_FIELDS = (
+    "tag",
+    "class",
+    "type",
+    "display",
+    "visibility",
+    "font_weight",
+    "font_size",
+    "background",
+    "background_image",
+)
+
 
-@dataclass(frozen=True)
 class PageElement:
     """
     Represents an element with associated and structured `metadata` on a given `page`.
+
+    Elements are immutable and kept small, as a page may have many thousands of them: attributes are
+    stored in ``__slots__`` and derived values are cached in their own slots on first access.
     """
 
-    page: "PageSnapshot" = field(repr=False)
-    metadata: dict = field(repr=False)
+    __slots__ = (
+        "page",
+        "metadata",
+        "_tag",
+        "_parent",
+        "_children",
+        "_depth",
+        "_location",
+        "_size",
+        "_bounds",
+        "_selector",
+        "_font_size",
+        "_screenshot",
+    )
+
+    page: PageSnapshot
+    metadata: dict
+
+    # Same semantics as a frozen dataclass: compared by value, but unhashable as metadata is a dict
+    __hash__ = None  # type: ignore
+
+    def __init__(self, page: "PageSnapshot", metadata: dict):
+        object.__setattr__(self, "page", page)
+        object.__setattr__(self, "metadata", metadata)
+
+    def __setattr__(self, name: str, value: Any):
+        raise FrozenInstanceError(f"cannot assign to field '{name}'")
+
+    def __delattr__(self, name: str):
+        raise FrozenInstanceError(f"cannot delete field '{name}'")
+
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.page, self.metadata) == (other.page, other.metadata)
+
+    def __repr__(self) -> str:
+        return f"PageElement(wtl_uid={self.metadata.get('wtl_uid')})"
+
+    def __reduce__(self):
+        return PageElement, (self.page, self.metadata)
+
+    def field(self, name: str) -> Any:
+        """
+        Returns the value of a scraped metadata field, raising :class:`FieldNotScrapedError` if it was left out
+        when scraping (see ``config.scraping.fields``).
+        """
+        try:
+            return self.metadata[name]
+        except KeyError:
+            raise FieldNotScrapedError(
+                f"Field '{name}' was not scraped for {self!r}, add it to config.scraping.fields"
+            ) from None
 
     @property
     def raw_scores(self) -> Dict[str, float]:
-        """Returns all raw classifier scores."""
+        """
+        Returns all raw classifier scores, adding an empty dict to the metadata if there are none so that scores
+        can be stored in it. Lookups that should not modify the metadata read ``metadata.get("raw_scores", {})``.
+        """
         if "raw_scores" not in self.metadata:
             self.metadata["raw_scores"] = {}
         return self.metadata["raw_scores"]
 
-    @cached_property
+    @cached_slot_property
     def tag(self) -> bs4.Tag:
         """Returns the bs4.Tag associated with this PageElement"""
-        tag = self.page.page_source.find(attrs={"wtl-uid": self.wtl_uid})
+        tags_by_uid = getattr(self.page, "tags_by_uid", None)
+        if tags_by_uid is not None:
+            tag = tags_by_uid.get(self.wtl_uid)
+        else:
+            tag = self.page.page_source.find(attrs={"wtl-uid": self.wtl_uid})
         if not tag:
             logger.warning(f"No bs4.tag with wtl-uid={self.wtl_uid}!")
         return tag
 
-    @cached_property
+    @property
     def wtl_uid(self) -> int:
         """Returns the wtl-uid associated with this PageElement."""
         return self.metadata["wtl_uid"]
 
-    @cached_property
+    @property
     def wtl_parent_uid(self) -> int:
         """Returns the wtl-uid associated with the parent of this PageElement."""
         return self.metadata["wtl_parent_uid"]
 
-    @cached_property
+    @cached_slot_property
     def parent(self) -> PageElement:
         """Returns the parent of this PageElement."""
         return self.page.elements.by_uid(self.wtl_parent_uid)
 
-    @cached_property
+    @cached_slot_property
+    def children(self) -> Elements:
+        """Returns the direct children of this PageElement."""
+        return self.page.elements.by_parent_uid(self.wtl_uid)
+
+    @cached_slot_property
+    def depth(self) -> int:
+        """Returns the depth of this PageElement in the page, where the body has depth 0."""
+        index = self._index()
+        if index is not None and self.wtl_uid in index.intervals:
+            return index.depth(self.wtl_uid)
+        return 0 if self.parent is None else self.parent.depth + 1
+
+    def is_ancestor_of(self, other: PageElement) -> bool:
+        """Returns True if this PageElement is a (strict) ancestor of the other one."""
+        index = self._index()
+        if index is not None and index.is_tree:
+            return index.is_ancestor(self.wtl_uid, other.wtl_uid)
+        parent = other.parent
+        while parent is not None:
+            if parent.wtl_uid == self.wtl_uid:
+                return True
+            parent = parent.parent
+        return False
+
+    @cached_slot_property
     def location(self) -> Point:
         """Returns the top-left position of this PageElement."""
-        location = self.metadata["location"]
+        location = self.field("location")
         return Point(location["x"], location["y"])
 
-    @cached_property
+    @cached_slot_property
     def size(self) -> Point:
         """Returns the wtl-uid associated with this PageElement."""
-        size = self.metadata["size"]
+        size = self.field("size")
         return Point(size["width"], size["height"])
 
-    @cached_property
+    @cached_slot_property
     def bounds(self) -> Rectangle:
         """Returns the bounding box of this PageElement."""
         return Rectangle(self.location, self.location + self.size)
 
-    @cached_property
+    @cached_slot_property
     def selector(self) -> Selector:
         """CSS Selector for the element without attributes."""
-        return Selector.build(self.page.page_source, self.wtl_uid)
+        selectors = getattr(self.page, "selectors", None)
+        if selectors is not None and self.wtl_uid in selectors:
+            return selectors[self.wtl_uid]
+        return page_dom(self.page).selector(self.wtl_uid)
 
-    @cached_property
+    def set_score(self, name: str, score: Any, raw_score: Any = None):
+        """
+        Stores a classifier score (and optionally the raw score) on this element.
+        Prefer this over writing to ``metadata`` directly, as it keeps the page's score index up to date.
+        """
+        self.metadata[name] = score
+        if raw_score is not None:
+            self.raw_scores[name] = raw_score
+
+        index = self._index()
+        if index is not None:
+            index.add_score(self, name, raw=raw_score is not None)
+
+    @cached_slot_property
     def font_size(self) -> float:
         """Returns resolved font size property in pixels."""
-        return PageElement.parse_resolved_size(self.metadata["font_size"])
+        return PageElement.parse_resolved_size(self.field("font_size"))
 
-    @cached_property
+    @cached_slot_property
     def screenshot(self) -> Image.Image:
         """
         Returns element screenshot for the given element, cropped from the page screenshot.
@@ -116,7 +242,7 @@ class PageElement:
         .. warning::
             Screenshotting must have been enabled (and run) on the page for this to work!
         """
-        fixed_pos = self.metadata["fixed_pos"]
+        fixed_pos = self.field("fixed_pos")
         page_screenshot = self.page.screenshots["first"] if fixed_pos else self.page.screenshots["full"]
         assert page_screenshot, "Page screenshotting must be enabled if requesting element screenshot"
 
@@ -127,7 +253,10 @@ class PageElement:
         if intersection_box.area == 0:
             return None
 
-        return crop_image(page_screenshot.image, intersection_box)
+        return crop_image(page_screenshot.readonly_image, intersection_box)
+
+    def _index(self) -> Optional[ElementIndex]:
+        return getattr(getattr(self.page, "elements", None), "element_index", None)
 
     @staticmethod
     def parse_resolved_size(value: str) -> float:
@@ -142,18 +271,124 @@ class PageElement:
         return float(value[:-2])
 
 
+class QueryCache:
+    """
+    Memoizes selector queries against the DOM of a single snapshot, keyed by the selector's CSS.
+    Compiled patterns are additionally shared between all snapshots, see :func:`selector.compile_css`.
+    The ``hits`` and ``misses`` counters tell how often a query could be answered from the cache.
+    """
+
+    def __init__(self, page: PageSnapshot):
+        self.page = page
+        self.hits = 0
+        self.misses = 0
+        self._results: Dict[str, Tuple[List[Any], FrozenSet[int]]] = {}
+
+    def query(self, selector: Selector) -> Tuple[List[Any], FrozenSet[int]]:
+        """Returns all nodes matching the selector, and the wtl-uids among them."""
+        if selector.css in self._results:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._results[selector.css] = self.page.dom.query(selector)
+        return self._results[selector.css]
+
+
+def page_dom(page: PageSnapshot) -> DomBackend:
+    """Returns the DOM backend of a page, or a BeautifulSoup backend over its page source if it has none."""
+    dom = getattr(page, "dom", None)
+    return dom if dom is not None else BeautifulSoupBackend(page.page_source)
+
+
+def query_selector(page: PageSnapshot, selector: Selector) -> Tuple[List[Any], FrozenSet[int]]:
+    """
+    Returns all nodes on the page matching the selector, and the wtl-uids among them.
+    Uses the query cache of the page, if it has one.
+    """
+    cache = getattr(page, "query_cache", None)
+    if cache is not None:
+        return cache.query(selector)
+    return page_dom(page).query(selector)
+
+
 class Elements(list):
     """Helper class for a list of elements from the same page"""
 
+    def __init__(self, elements: Iterable[PageElement] = (), element_index: ElementIndex = None, is_page: bool = False):
+        """
+        The ``element_index`` is that of the page the elements belong to. ``is_page`` is set for the list of all
+        elements of a page, as created by :class:`PageSnapshot`, which can use the index for its own queries.
+        """
+        super().__init__(elements)
+        self._element_index = element_index
+        self._is_page = is_page
+
+    @property
+    def element_index(self) -> Optional[ElementIndex]:
+        """Returns the index of the page these elements belong to, if there is one."""
+        if self._element_index is not None:
+            return self._element_index
+        page = self[0].page if self else None
+        elements = getattr(page, "elements", None)
+        return getattr(elements, "_element_index", None)
+
+    def _is_full_page(self) -> bool:
+        # Elements may have been removed from the page list since it was created. Reordering it, or adding
+        # elements (possibly after removing others), clears _is_page through the methods below.
+        return self._is_page and len(self) == len(self._element_index)
+
+    def sort(self, *args, **kwargs):
+        self._is_page = False
+        super().sort(*args, **kwargs)
+
+    def reverse(self):
+        self._is_page = False
+        super().reverse()
+
+    def __setitem__(self, key, value):
+        self._is_page = False
+        super().__setitem__(key, value)
+
+    def __iadd__(self, other):  # type: ignore
+        self._is_page = False
+        return super().__iadd__(other)
+
+    def append(self, element):
+        self._is_page = False
+        super().append(element)
+
+    def extend(self, elements):
+        self._is_page = False
+        super().extend(elements)
+
+    def insert(self, index, element):
+        self._is_page = False
+        super().insert(index, element)
+
+    def _filter_indexed(self, candidates: List[PageElement]) -> Elements:
+        # The full page list can use the index directly, subsets keep their own order and members
+        if self._is_full_page():
+            return Elements(candidates)
+        candidate_ids = {id(e) for e in candidates}
+        return Elements([e for e in self if id(e) in candidate_ids])
+
     def by_score(self, name: Union[str, Iterable[str]], limit: float = 0.0) -> Elements:
         """Return elements tagged with all given scores over a certain limit"""
         if name == "all":
             return self
 
+        index = self.element_index
+
         if isinstance(name, str):
-            return Elements([e for e in self if name in e.metadata and e.metadata[name] > limit])
+            candidates = index.with_score(name) if index is not None else self
+            return self._filter_indexed([e for e in candidates if name in e.metadata and e.metadata[name] > limit])
 
-        return Elements([e for e in self if set(name) <= set(e.metadata.keys())])
+        names = set(name)
+        if index is not None and names:
+            candidates = min((index.with_score(n) for n in names), key=len)
+            return self._filter_indexed([e for e in candidates if names <= e.metadata.keys()])
+
+        return Elements([e for e in self if names <= set(e.metadata.keys())])
 
     def by_raw_score(self, name: Union[str, Iterable[str]], limit: float = 0.0) -> Elements:
         """Return elements tagged with all given raw scores over a certain limit"""
@@ -161,7 +396,11 @@ class Elements(list):
             return self
 
         if isinstance(name, str):
-            return Elements([e for e in self if name in e.raw_scores and e.raw_scores[name] > limit])
+            index = self.element_index
+            candidates = index.with_score(name, raw=True) if index is not None else self
+            return self._filter_indexed(
+                [e for e in candidates if e.metadata.get("raw_scores", {}).get(name, limit) > limit]
+            )
 
         return Elements([e for e in self if set(name) <= set(e.metadata.keys())])
 
@@ -170,16 +409,17 @@ class Elements(list):
         if not self:
             return Elements([])
 
-        tags = set(self[0].page.page_source.html.select(selector.css))
+        tags, wtl_uids = query_selector(self[0].page, selector)
         if not tags:
             return Elements([])
 
-        wtl_uids = set(int(x.attrs["wtl-uid"]) for x in tags if "wtl-uid" in x.attrs)
         elements = Elements([e for e in self if e.wtl_uid in wtl_uids])
 
-        # Falls back on BS4 tags if selector matches something that hasn't been snapshotted yet
+        # Falls back on DOM nodes if selector matches something that hasn't been snapshotted yet
         if not elements:
-            elements = Elements([e for e in self if e.tag in tags])
+            dom = page_dom(self[0].page)
+            tag_ids = {id(tag) for tag in tags}
+            elements = Elements([e for e in self if id(dom.by_uid(e.wtl_uid)) in tag_ids])
 
         return elements
 
@@ -194,21 +434,86 @@ class Elements(list):
             target = targets[0]
 
         assert isinstance(target, PageElement)
-        tags = set(target.tag.descendants)
-        return Elements([e for e in self if e.tag in tags] + ([target] if include_root else []))
+        root = [target] if include_root else []
+
+        index = self.element_index
+        if index is not None and index.is_tree and target.wtl_uid in index.intervals:
+            return Elements(self._filter_indexed(index.descendants(target.wtl_uid)) + root)
+
+        wtl_uids = page_dom(target.page).subtree_uids(target.wtl_uid)
+        return Elements([e for e in self if e.wtl_uid in wtl_uids] + root)
+
+    def by_mask(self, mask: np.ndarray) -> Elements:
+        """
+        Return elements selected by a boolean mask over the rows of the page's :class:`ElementTable`,
+        e.g. ``elements.by_mask(snapshot.table.width > 50)``.
+        """
+        index = self.element_index
+        assert index is not None, "Filtering by mask requires elements belonging to a PageSnapshot"
+        assert len(mask) == len(index), "Mask length does not match the number of elements on the page"
+        return self._filter_indexed([index.elements[row] for row in np.flatnonzero(mask)])
 
     def by_uid(self, wtl_uid: int) -> PageElement:
         """Returns the element with the given wtl_uid"""
+        if self._is_full_page():
+            return self._element_index.by_uid(wtl_uid)
+
         for e in self:
             if e.wtl_uid == wtl_uid:
                 return e
         return None
 
+    def by_parent_uid(self, wtl_uid: int) -> Elements:
+        """Returns all elements whose parent has the given wtl_uid"""
+        index = self.element_index
+        if index is not None:
+            return self._filter_indexed(index.children(wtl_uid))
+        return Elements([e for e in self if e.wtl_parent_uid == wtl_uid])
+
+    def screenshots(self, size: Tuple[int, int] = None) -> Union[List[Optional[np.ndarray]], np.ndarray]:
+        """
+        Returns the screenshots of all elements at once, cropped from the page screenshots like
+        :attr:`PageElement.screenshot`, but as NumPy arrays (see :func:`Screenshot.crops`): a list of read-only views,
+        with None for elements outside the page screenshot, or with a (width, height) ``size``, one array of them
+        all cut and padded to that size.
+
+        .. warning::
+            Screenshotting must have been enabled (and run) on the page for this to work!
+        """
+        rows: Dict[str, List[int]] = {"first": [], "full": []}
+        boxes: Dict[str, List[Tuple[float, float, float, float]]] = {"first": [], "full": []}
+        for row, element in enumerate(self):
+            name = "first" if element.field("fixed_pos") else "full"
+            location, element_size = element.field("location"), element.field("size")
+            x, y = location["x"], location["y"]
+            rows[name].append(row)
+            boxes[name].append((x, y, x + element_size["width"], y + element_size["height"]))
+
+        views: List[Optional[np.ndarray]] = [None] * len(self)
+        batch: Optional[np.ndarray] = None
+        for name, screenshot_rows in rows.items():
+            if not screenshot_rows:
+                continue
+            page_screenshot = self[0].page.screenshots.get(name)
+            assert page_screenshot, "Page screenshotting must be enabled if requesting element screenshot"
+            crops = page_screenshot.crops(np.array(boxes[name]), size)
+            if size is None:
+                for row, crop in zip(screenshot_rows, crops):
+                    views[row] = crop
+            else:
+                if batch is None:
+                    batch = np.zeros((len(self),) + crops.shape[1:], dtype=crops.dtype)
+                batch[screenshot_rows] = crops
+
+        if size is None:
+            return views
+        return batch if batch is not None else np.zeros((0, size[1], size[0], 3), dtype=np.uint8)
+
     def sort_by(self, name: str = None, reverse: bool = False) -> Elements:
         """
         Sorts by a certain (raw) score. If given name does not exist the element gets (raw) score 0.
         """
-        self.sort(key=lambda e: e.raw_scores.get(name, 0), reverse=reverse)
+        self.sort(key=lambda e: e.metadata.get("raw_scores", {}).get(name, 0), reverse=reverse)
         return self
 
     def unique(self) -> PageElement:
@@ -217,12 +522,64 @@ class Elements(list):
         return self[0]
 
 
+def _read_container_text(path: Path, name: str) -> str:
+    return container.read_section(path, name).decode("utf8")
+
+
+def _read_container_image(path: Path, name: str) -> Image.Image:
+    return Image.open(io.BytesIO(container.read_section(path, name)))
+
+
+def _read_store_text(store: SnapshotStore, descriptor: dict) -> str:
+    return store.get(descriptor).decode("utf8")
+
+
+def intern_metadata(elements_metadata: List[dict]):
+    """
+    Interns the string values of :data:`INTERNED_FIELDS` in place, so that all elements (of all snapshots)
+    share a single copy of each distinct value instead of one per element.
+    """
+    for metadata in elements_metadata:
+        for key in INTERNED_FIELDS:
+            value = metadata.get(key)
+            if value.__class__ is str:
+                metadata[key] = sys.intern(value)
+
+
+# Attributes of a PageSnapshot that its detached copies start from, see PageSnapshot.detached_copy
+_DETACHED_ATTRIBUTES = {
+    "page_source",
+    "raw_source",
+    "page_metadata",
+    "elements_metadata",
+    "mhtml_source",
+    "mhtml_loader",
+    "bs4_parser",
+    "dom_backend",
+    "parse_milliseconds",
+}
+
+
 @dataclass(repr=False, frozen=True)
 class PageSnapshot:
     """
     Static snapshot of a web page.
     Contains source (DOM), screenshots, elements and metadata.
 
+    Instead of a parsed ``page_source``, the raw HTML may be given as ``raw_source`` (with ``page_source`` None),
+    in which case it is only parsed (with ``bs4_parser``) the first time ``page_source`` is accessed.
+    The time spent parsing is then available in ``parse_milliseconds``.
+    Likewise, ``elements`` are only created the first time they are accessed.
+
+    ``raw_source`` may also be given as a function without arguments returning it, and the MHTML as such a function
+    ``mhtml_loader`` instead of ``mhtml_source``. They are only called when needed, which is how :func:`load` avoids
+    reading parts that are never used.
+    The lazy attributes are loaded at most once, also when accessed from several threads. Pickling (or deep-copying)
+    a snapshot loads them first.
+
+    Selector queries, selector generation and subtree lookups go through a DOM backend, chosen with
+    ``dom_backend`` (see :mod:`webtraversallibrary.dom`). The default, "bs4", works on ``page_source``.
+
     .. note::
         Not _all_ parts of the website (separate CSS and JS files, for example) are
         represented here. If that's what you need, consider storing MHTML snapshots
@@ -234,15 +591,160 @@ class PageSnapshot:
     elements_metadata: List[dict]
     elements: Elements = field(init=False)
     screenshots: Dict[str, Screenshot] = field(default_factory=dict)
-    mhtml_source: bytes = None
+    # No class-level default, so that MHTML that is yet to be loaded goes through __getattr__
+    mhtml_source: bytes = field(default_factory=lambda: None)
+    bs4_parser: str = field(default=None, repr=False, compare=False)
+    dom_backend: str = field(default=None, repr=False, compare=False)
+    raw_source: Union[str, Callable[[], str]] = field(default=None, repr=False, compare=False)
+    mhtml_loader: Optional[Callable[[], bytes]] = field(default=None, repr=False, compare=False)
+
+    # Time spent lazily parsing the page source, overridden per instance once that has happened
+    parse_milliseconds = 0.0
 
     def __post_init__(self):
-        page_elements = Elements([PageElement(self, metadata) for metadata in self.elements_metadata])
-        object.__setattr__(self, "elements", page_elements)
+        intern_metadata(self.elements_metadata)
 
         if "screenshots" not in self.page_metadata:
             self.page_metadata["screenshots"] = []
 
+        # Guards the one-time loading of lazy attributes, see __getattr__
+        object.__setattr__(self, "_lazy_lock", threading.RLock())
+
+        # Defer reading and parsing until the page source is first needed
+        if self.page_source is None:
+            assert self.raw_source is not None, "Either a page source or a raw source is required"
+            object.__delattr__(self, "page_source")
+
+        if self.mhtml_loader is not None:
+            assert self.mhtml_source is None, "Either MHTML or a function loading it may be given, not both"
+            object.__delattr__(self, "mhtml_source")
+
+    def __getattr__(self, name: str):
+        # Only called for missing attributes, i.e. elements that have not been created,
+        # MHTML that has not been loaded or a page source that has not been parsed yet
+        if name not in ("mhtml_source", "elements", "page_source") or "_lazy_lock" not in self.__dict__:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        with self._lazy_lock:
+            # Another thread may have loaded the attribute while this one was waiting for the lock
+            if name in self.__dict__:
+                return self.__dict__[name]
+
+            value: Any
+            if name == "mhtml_source":
+                value = self.mhtml_loader()
+            elif name == "elements":
+                page_elements = [PageElement(self, metadata) for metadata in self.elements_metadata]
+                value = Elements(page_elements, element_index=ElementIndex(page_elements), is_page=True)
+            else:
+                value = self._parse_raw_source()
+
+            object.__setattr__(self, name, value)
+            return value
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Loaders may not be picklable, so what they load is pickled instead. The lock and derived attributes
+        # (elements, DOM backends, caches) are left out, and recreated on first access after unpickling.
+        with self._lazy_lock:
+            state = {name: value for name, value in self.__dict__.items() if name in _DETACHED_ATTRIBUTES}
+            if self.is_parsed:
+                state.pop("raw_source", None)
+            else:
+                state["raw_source"] = self._read_raw_source()
+            state["mhtml_source"] = self.mhtml_source
+            state["mhtml_loader"] = None
+        state["screenshots"] = self.screenshots
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        object.__setattr__(self, "_lazy_lock", threading.RLock())
+
+    def _parse_raw_source(self) -> bs4.BeautifulSoup:
+        before = datetime.now()
+        page_source = bs4.BeautifulSoup(self._read_raw_source(), self.bs4_parser or Config.default().bs_html_parser)
+        milliseconds_passed = (datetime.now() - before).total_seconds() * 1000
+        object.__setattr__(self, "parse_milliseconds", milliseconds_passed)
+        logger.debug(f"Parsed page source in {milliseconds_passed:.2f}ms")
+        return page_source
+
+    @property
+    def is_parsed(self) -> bool:
+        """Returns True if the page source has been parsed into a bs4.BeautifulSoup."""
+        return "page_source" in self.__dict__
+
+    @property
+    def source_html(self) -> str:
+        """Returns the page source as an HTML string, without parsing it if it hasn't been already."""
+        return str(self.page_source) if self.is_parsed else self._read_raw_source()
+
+    def _read_raw_source(self) -> str:
+        with self._lazy_lock:
+            raw_source = self.raw_source
+            if callable(raw_source):
+                raw_source = raw_source()
+                object.__setattr__(self, "raw_source", raw_source)
+            return raw_source
+
+    @cached_property
+    def soup_dom(self) -> BeautifulSoupBackend:
+        """DOM backend over the parsed ``page_source``."""
+        return BeautifulSoupBackend(self.page_source)
+
+    @cached_property
+    def dom(self) -> DomBackend:
+        """DOM backend used for selector queries, selector generation and subtree lookups."""
+        if self.dom_backend in (None, "bs4"):
+            return self.soup_dom
+        if self.dom_backend == "lxml":
+            return LxmlBackend(self.source_html, fallback=lambda: self.soup_dom)
+        raise ValueError(f"Unknown DOM backend '{self.dom_backend}'")
+
+    @property
+    def tags_by_uid(self) -> Dict[int, bs4.Tag]:
+        """
+        Maps each wtl-uid in the page source to its bs4.Tag.
+        Built with a single pass over the page source on first access.
+        """
+        return self.soup_dom.tags_by_uid
+
+    @property
+    def table(self) -> ElementTable:
+        """
+        Columnar, NumPy-backed view of the element metadata, for vectorized filtering with :func:`Elements.by_mask`.
+        """
+        return self.elements.element_index.table
+
+    @cached_property
+    def query_cache(self) -> QueryCache:
+        """Memoized selector queries against this snapshot's page source."""
+        return QueryCache(self)
+
+    @cached_property
+    def selectors(self) -> Dict[int, Selector]:
+        """
+        Maps each wtl-uid in the page source to its selector.
+        Computed for the whole page in one pass on first access, using the DOM backend.
+        """
+        return self.dom.selectors()
+
+    def detached_copy(self) -> PageSnapshot:
+        """
+        Returns a copy that can be used on another thread while this snapshot is still in use, as when it is being
+        saved in the background. It shares the page source, but has its own lazy attributes, copies of the
+        metadata (which scores are written to), and copies of the screenshots, which share their images until
+        either of them is modified.
+        """
+        copy = object.__new__(PageSnapshot)
+        with self._lazy_lock:
+            state = {name: value for name, value in self.__dict__.items() if name in _DETACHED_ATTRIBUTES}
+        state["page_metadata"] = deepcopy(self.page_metadata)
+        state["elements_metadata"] = deepcopy(self.elements_metadata)
+        state["screenshots"] = {name: scr.copy(name) for name, scr in self.screenshots.items()}
+        state["_lazy_lock"] = threading.RLock()
+        copy.__dict__.update(state)
+        return copy
+
     def new_screenshot(self, name: str, of: str) -> Screenshot:
         """
         Creates a new screenshot from a copy of a previous one.
@@ -253,51 +755,113 @@ class PageSnapshot:
         return self.screenshots[name]
 
     @classmethod
-    def load(cls, path: Path, bs4_parser: str = None) -> PageSnapshot:
+    def load(cls, path: Path, bs4_parser: str = None, dom_backend: str = None) -> PageSnapshot:
         """
-        Returns a PageSnapshot at given path (directory) in the format
-        as stored in :func:`save`.
+        Returns a PageSnapshot at given path in any of the formats stored by :func:`save`, which is detected
+        automatically. For containers and stores, the path may be given with or without the file suffix.
         """
-        assert path.exists()
-        screenshots: Dict[str, Screenshot] = {}
-        mhtml_source: bytes = None
-
+        path = Path(path)
         if bs4_parser is None:
             bs4_parser = Config.default().bs_html_parser
 
-        with open(path / "source.html", encoding="utf8") as f:
-            page_source = bs4.BeautifulSoup(f.read(), bs4_parser)
+        container_path = PageSnapshot._suffixed_path(path, container.SUFFIX)
+        manifest_path = PageSnapshot._suffixed_path(path, MANIFEST_SUFFIX)
+        if container_path and container.is_container(container_path):
+            parts = PageSnapshot._load_container(container_path)
+        elif manifest_path:
+            parts = PageSnapshot._load_store(manifest_path)
+        else:
+            assert path.exists()
+            parts = PageSnapshot._load_directory(path)
+
+        return PageSnapshot(None, **parts, bs4_parser=bs4_parser, dom_backend=dom_backend)
+
+    @staticmethod
+    def _suffixed_path(path: Path, suffix: str) -> Optional[Path]:
+        for candidate in (path, path.with_name(path.name + suffix)):
+            if candidate.name.endswith(suffix) and candidate.is_file():
+                return candidate
+        return None
+
+    @staticmethod
+    def _load_directory(path: Path) -> Dict[str, Any]:
         with open(path / "page_metadata.json", encoding="utf8") as f:
             page_metadata = json.load(f)
         with open(path / "elements_metadata.json", encoding="utf8") as f:
             elements_metadata = json.load(f)
-        for f in page_metadata["screenshots"]:
-            screenshots[str(f)] = Screenshot.load(str(f), path / f"{f}.png")
-        try:
-            with open(path / "page.mhtml", "rb") as f:  # type: ignore
-                mhtml_source = f.read()  # type: ignore
-        except OSError:
-            pass
 
-        snapshot = PageSnapshot(
-            page_source=page_source,
-            page_metadata=page_metadata,
-            elements_metadata=elements_metadata,
-            screenshots=screenshots,
-            mhtml_source=mhtml_source,
-        )
+        return {
+            "raw_source": partial(Path.read_text, path / "source.html", encoding="utf8"),
+            "page_metadata": page_metadata,
+            "elements_metadata": elements_metadata,
+            "screenshots": {
+                str(f): Screenshot.load(str(f), path / screenshot_file(str(f), lambda name: (path / name).exists()))
+                for f in page_metadata["screenshots"]
+            },
+            "mhtml_loader": partial(Path.read_bytes, path / "page.mhtml") if (path / "page.mhtml").exists() else None,
+        }
 
-        return snapshot
+    @staticmethod
+    def _load_container(path: Path) -> Dict[str, Any]:
+        with container.ContainerReader(path) as reader:
+            page_metadata = json.loads(reader.read("page_metadata.json"))
+            elements_metadata = json.loads(reader.read("elements_metadata.json"))
+            has_mhtml = "page.mhtml" in reader
+            screenshot_files = {
+                str(f): screenshot_file(str(f), lambda name: name in reader) for f in page_metadata["screenshots"]
+            }
+
+        return {
+            "raw_source": partial(_read_container_text, path, "source.html"),
+            "page_metadata": page_metadata,
+            "elements_metadata": elements_metadata,
+            "screenshots": {
+                name: Screenshot(name, loader=partial(_read_container_image, path, file))
+                for name, file in screenshot_files.items()
+            },
+            "mhtml_loader": partial(container.read_section, path, "page.mhtml") if has_mhtml else None,
+        }
 
-    def save(self, path: Path):
+    @staticmethod
+    def _load_store(path: Path) -> Dict[str, Any]:
+        store, parts = SnapshotStore.read_manifest(path)
+
+        return {
+            "raw_source": partial(_read_store_text, store, parts["source.html"]),
+            "page_metadata": json.loads(store.get(parts["page_metadata.json"])),
+            "elements_metadata": json.loads(store.get(parts["elements_metadata.json"])),
+            "screenshots": {
+                name: Screenshot(name, loader=partial(store.get_image, descriptor))
+                for name, descriptor in parts["screenshots"].items()
+            },
+            "mhtml_loader": partial(store.get, parts["page.mhtml"]) if "page.mhtml" in parts else None,
+        }
+
+    def save(self, path: Path, file_format: str = "directory", compression: str = None, store: SnapshotStore = None):
         """
-        Saves the current PageSnapshot instance to a folder.
-        The number of files depends on whether screenshots were taken or not.
+        Saves the current PageSnapshot instance to disk, in one of three formats:
+
+        - "directory": one file per part in a folder at ``path``. The number of files depends on
+          whether screenshots were taken or not.
+        - "container": a single file at ``path`` with the container suffix appended, see :mod:`container`.
+          Parts are compressed with ``compression`` (defaults to zstd if available, otherwise gzip).
+        - "store": each part is added to the given content-addressed ``store`` (see :mod:`store`),
+          and a manifest listing them is written at ``path`` with the manifest suffix appended.
         """
+        path = Path(path)
+        if file_format == "container":
+            self._save_container(path, compression or container.DEFAULT_CODEC)
+            return
+        if file_format == "store":
+            assert store is not None, "Saving to a snapshot store requires a store"
+            self._save_store(path, store)
+            return
+        assert file_format == "directory", f"Unknown snapshot format '{file_format}'"
+
         os.makedirs(path, exist_ok=True)
 
         with open(path / "source.html", "w", encoding="utf8") as f:
-            f.write(str(self.page_source))
+            f.write(self.source_html)
         with open(path / "page_metadata.json", "w", encoding="utf8") as f:
             json.dump(self.page_metadata, f)
         with open(path / "elements_metadata.json", "w", encoding="utf8") as f:
@@ -307,3 +871,37 @@ class PageSnapshot:
         if self.mhtml_source:
             with open(path / "page.mhtml", "wb") as f:  # type: ignore
                 f.write(self.mhtml_source)  # type: ignore
+
+    def _save_container(self, path: Path, codec: str):
+        if path.suffix != container.SUFFIX:
+            path = path.with_name(path.name + container.SUFFIX)
+        os.makedirs(path.parent, exist_ok=True)
+
+        with container.ContainerWriter(path, codec) as writer:
+            writer.add("page_metadata.json", json.dumps(self.page_metadata).encode("utf8"))
+            writer.add("elements_metadata.json", json.dumps(self.elements_metadata).encode("utf8"))
+            writer.add("source.html", self.source_html.encode("utf8"))
+            for scr in self.screenshots.values():
+                writer.add(scr.filename(), scr.to_bytes(), codec="none")
+            if self.mhtml_source:
+                writer.add("page.mhtml", self.mhtml_source)
+
+    @staticmethod
+    def _put_screenshot(store: SnapshotStore, scr: Screenshot) -> dict:
+        if store.screenshot_deltas:
+            return store.put_image(scr.name, scr.readonly_image)
+        return store.put(scr.to_bytes(), codec="none")
+
+    def _save_store(self, path: Path, store: SnapshotStore):
+        parts: Dict[str, Any] = {
+            "page_metadata.json": store.put(json.dumps(self.page_metadata).encode("utf8")),
+            "elements_metadata.json": store.put(json.dumps(self.elements_metadata).encode("utf8")),
+            "source.html": store.put(self.source_html.encode("utf8")),
+            "screenshots": {scr.name: self._put_screenshot(store, scr) for scr in self.screenshots.values()},
+        }
+        if self.mhtml_source:
+            parts["page.mhtml"] = store.put(self.mhtml_source)
+
+        if not path.name.endswith(MANIFEST_SUFFIX):
+            path = path.with_name(path.name + MANIFEST_SUFFIX)
+        store.write_manifest(path, parts)
@@ -0,0 +1,148 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Content-addressed store for saved snapshots.
+
+Each part of a snapshot (page source, metadata, screenshots, MHTML) is stored once as an object named by the
+SHA-256 hash of its content, so identical parts of consecutive steps are written only once. A small manifest
+per snapshot lists the objects it is made of, see :func:`PageSnapshot.save`.
+
+Screenshots can optionally be stored as deltas against the previous screenshot with the same name and size:
+the XOR of the two pixel arrays, which is mostly zeros (and compresses very well) for near-identical pages.
+At most ``max_delta_chain`` deltas are stacked on top of a full screenshot before a new full one is stored.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .container import DEFAULT_CODEC, compress, decompress
+
+MANIFEST_SUFFIX = ".snapshot.json"
+DELTA_MODES = ["RGB", "RGBA", "L"]
+
+
+class SnapshotStore:
+    """Directory of content-addressed, compressed objects shared by many snapshots."""
+
+    def __init__(self, root: Path, compression: str = None, screenshot_deltas: bool = False, max_delta_chain: int = 8):
+        self.root = Path(root)
+        self.codec = compression or DEFAULT_CODEC
+        self.screenshot_deltas = screenshot_deltas
+        self.max_delta_chain = max_delta_chain
+        self.objects_written = 0
+        self.objects_reused = 0
+        self.bytes_written = 0
+        self._previous: Dict[Tuple[str, Tuple[int, int], str], Tuple[dict, np.ndarray]] = {}
+
+    def _object_path(self, digest: str, codec: str) -> Path:
+        return self.root / digest[:2] / f"{digest[2:]}.{codec}"
+
+    def put(self, data: bytes, codec: str = None) -> dict:
+        """
+        Stores data, unless an identical object already exists, and returns its descriptor.
+        """
+        codec = codec or self.codec
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest, codec)
+
+        if path.exists():
+            self.objects_reused += 1
+        else:
+            compressed = compress(data, codec)
+            os.makedirs(path.parent, exist_ok=True)
+            temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(temp_path, "wb") as f:
+                f.write(compressed)
+            os.replace(temp_path, path)
+            self.objects_written += 1
+            self.bytes_written += len(compressed)
+
+        return {"hash": digest, "codec": codec}
+
+    def get(self, descriptor: dict) -> bytes:
+        """Returns the content of the object with the given descriptor."""
+        with open(self._object_path(descriptor["hash"], descriptor["codec"]), "rb") as f:
+            return decompress(f.read(), descriptor["codec"])
+
+    def put_image(self, name: str, image: Image.Image) -> dict:
+        """
+        Stores an image, as a delta against the previous image with the same name and size if enabled.
+        Returns its descriptor.
+        """
+        if not self.screenshot_deltas or image.mode not in DELTA_MODES:
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            return self.put(buffer.getvalue(), codec="none")
+
+        pixels = np.asarray(image)
+        key = (name, image.size, image.mode)
+        previous = self._previous.get(key)
+
+        if previous is None or previous[0].get("depth", 0) >= self.max_delta_chain:
+            descriptor = {**self.put(pixels.tobytes()), "size": list(image.size), "mode": image.mode}
+        else:
+            base, base_pixels = previous
+            delta = np.bitwise_xor(pixels, base_pixels)
+            descriptor = {
+                **self.put(delta.tobytes()),
+                "size": list(image.size),
+                "mode": image.mode,
+                "base": base,
+                "depth": base.get("depth", 0) + 1,
+            }
+
+        self._previous[key] = (descriptor, pixels)
+        return descriptor
+
+    def get_image(self, descriptor: dict) -> Image.Image:
+        """Returns the image with the given descriptor, as stored by :func:`put_image`."""
+        if "size" not in descriptor:
+            return Image.open(io.BytesIO(self.get(descriptor)))
+        pixels = self._get_pixels(descriptor)
+        return Image.fromarray(pixels[:, :, 0] if descriptor["mode"] == "L" else pixels, descriptor["mode"])
+
+    def _get_pixels(self, descriptor: dict) -> np.ndarray:
+        width, height = descriptor["size"]
+        pixels = np.frombuffer(self.get(descriptor), dtype=np.uint8).reshape(height, width, -1)
+        if "base" in descriptor:
+            pixels = np.bitwise_xor(pixels, self._get_pixels(descriptor["base"]))
+        return pixels
+
+    def write_manifest(self, path: Path, parts: Dict[str, Any]):
+        """Writes the manifest of a snapshot, referring to this store with a relative path."""
+        os.makedirs(path.parent, exist_ok=True)
+        manifest = {"store": os.path.relpath(self.root, path.parent), "parts": parts}
+        with open(path, "w", encoding="utf8") as f:
+            json.dump(manifest, f)
+
+    @staticmethod
+    def read_manifest(path: Path) -> Tuple[SnapshotStore, Dict[str, Any]]:
+        """Returns the store a manifest refers to, and the parts listed in it."""
+        with open(path, encoding="utf8") as f:
+            manifest = json.load(f)
+        return SnapshotStore(path.parent / manifest["store"]), manifest["parts"]
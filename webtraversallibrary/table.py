@@ -0,0 +1,145 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Columnar view of element metadata, with one NumPy array per field for vectorized filtering.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from .geometry import Rectangle
+
+
+class ElementTable:
+    """
+    Columnar view of the metadata of all elements on a page.
+
+    Rows are in the same order as the elements of the page, so boolean masks computed from the columns
+    can be turned back into elements with :func:`Elements.by_mask`. Missing numeric values are NaN.
+    Categorical fields (``display`` and ``visibility``) are stored as integer codes, see :func:`equals`.
+    """
+
+    CATEGORICAL = ("display", "visibility")
+
+    def __init__(self, elements_metadata: List[dict]):
+        self._metadata = elements_metadata
+        n = len(elements_metadata)
+
+        self.x = np.full(n, np.nan)
+        self.y = np.full(n, np.nan)
+        self.width = np.full(n, np.nan)
+        self.height = np.full(n, np.nan)
+        self.font_size = np.full(n, np.nan)
+        self.fixed_pos = np.zeros(n, dtype=bool)
+        self.wtl_uid = np.full(n, -1, dtype=np.int64)
+        self.wtl_parent_uid = np.full(n, -1, dtype=np.int64)
+        self.codes: Dict[str, Dict[str, int]] = {name: {} for name in ElementTable.CATEGORICAL}
+        self.display = np.full(n, -1, dtype=np.int32)
+        self.visibility = np.full(n, -1, dtype=np.int32)
+        self._scores: Dict[str, np.ndarray] = {}
+
+        for row, metadata in enumerate(elements_metadata):
+            location = metadata.get("location")
+            if location:
+                self.x[row], self.y[row] = location["x"], location["y"]
+            size = metadata.get("size")
+            if size:
+                self.width[row], self.height[row] = size["width"], size["height"]
+            self.font_size[row] = ElementTable._parse_px(metadata.get("font_size"))
+            self.fixed_pos[row] = bool(metadata.get("fixed_pos"))
+            self.wtl_uid[row] = metadata.get("wtl_uid", -1)
+            self.wtl_parent_uid[row] = metadata.get("wtl_parent_uid", -1)
+            for name in ElementTable.CATEGORICAL:
+                value = metadata.get(name)
+                if value is not None:
+                    getattr(self, name)[row] = self.codes[name].setdefault(value, len(self.codes[name]))
+
+    def __len__(self):
+        return len(self._metadata)
+
+    @property
+    def right(self) -> np.ndarray:
+        return self.x + self.width
+
+    @property
+    def bottom(self) -> np.ndarray:
+        return self.y + self.height
+
+    @property
+    def area(self) -> np.ndarray:
+        return self.width * self.height
+
+    def equals(self, name: str, value: str) -> np.ndarray:
+        """Returns a mask of all rows where the categorical field ``name`` has the given value."""
+        code = self.codes[name].get(value)
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return getattr(self, name) == code
+
+    def isin(self, name: str, values: Iterable[str]) -> np.ndarray:
+        """Returns a mask of all rows where the categorical field ``name`` has one of the given values."""
+        codes = [self.codes[name][value] for value in values if value in self.codes[name]]
+        return np.isin(getattr(self, name), codes)
+
+    def intersects(self, rect: Rectangle) -> np.ndarray:
+        """Returns a mask of all rows whose bounds overlap the given rectangle with a non-zero area."""
+        return (
+            (self.x < rect.maxima.x)
+            & (self.right > rect.minima.x)
+            & (self.y < rect.maxima.y)
+            & (self.bottom > rect.minima.y)
+        )
+
+    def inside(self, rect: Rectangle) -> np.ndarray:
+        """Returns a mask of all rows whose bounds are fully contained in the given rectangle."""
+        return (
+            (self.x >= rect.minima.x)
+            & (self.right <= rect.maxima.x)
+            & (self.y >= rect.minima.y)
+            & (self.bottom <= rect.maxima.y)
+        )
+
+    def score(self, name: str) -> np.ndarray:
+        """
+        Returns the given classifier score as a column, NaN where missing.
+        Built on first access, then kept up to date by :func:`PageElement.set_score`.
+        """
+        if name not in self._scores:
+            column = np.full(len(self), np.nan)
+            for row, metadata in enumerate(self._metadata):
+                value = metadata.get(name)
+                if isinstance(value, (bool, int, float)):
+                    column[row] = value
+            self._scores[name] = column
+        return self._scores[name]
+
+    def set_score(self, row: int, name: str, value: Any):
+        """Updates a score column, if it has been built."""
+        if name in self._scores:
+            self._scores[name][row] = value if isinstance(value, (bool, int, float)) else np.nan
+
+    @staticmethod
+    def _parse_px(value: str) -> float:
+        if not isinstance(value, str) or not value.strip().endswith("px"):
+            return np.nan
+        try:
+            return float(value.strip()[:-2])
+        except ValueError:
+            return np.nan
@@ -23,7 +23,7 @@ import json
 import logging
 import os.path
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Iterable
 
 from selenium import webdriver
 from selenium.webdriver import DesiredCapabilities
@@ -183,9 +183,9 @@ def setup_driver(config: Config, profile_path: Path = None, preload_callbacks: I
     return driver
 
 
-def send(driver: WebDriver, cmd: str, params: dict = None) -> int:
+def send(driver: WebDriver, cmd: str, params: dict = None) -> Any:
     """
-    Send command to the webdriver, return resulting status code.
+    Send a Chrome DevTools Protocol command to the webdriver, return its result.
     """
     # pylint: disable=protected-access
     params = params or {}
@@ -195,7 +195,7 @@ def send(driver: WebDriver, cmd: str, params: dict = None) -> int:
     response = driver.command_executor._request("POST", url, body)
     value = response.get("value")
 
-    if response.get("status", False):
+    if response.get("status", False) or (isinstance(value, dict) and "error" in value):
         raise WebDriverSendError(f"Command '{cmd}' returned status={value}")
 
     return value
@@ -25,6 +25,7 @@ import itertools
 import logging
 import os
 from dataclasses import replace
+from datetime import datetime
 from pathlib import Path
 from time import sleep
 from typing import Any, Callable, Dict, List, Union
@@ -45,8 +46,10 @@ from .processtools import TimeoutContext
 from .scraper import Scraper
 from .selector import Selector
 from .snapshot import PageElement, PageSnapshot
+from .store import SnapshotStore
 from .view import View
 from .window import Window
+from .writer import SnapshotWriter
 
 logger = logging.getLogger("wtl")
 
@@ -109,6 +112,24 @@ class Workflow:
         if self.config.debug.save:
             assert self.output, "Saving debug output requires specifying an output path!"
 
+        # Snapshots saved in the "store" format share one content-addressed store for the whole run
+        self.snapshot_store: SnapshotStore = None
+        if self.config.debug.save and self.config.debug.save_format == "store":
+            self.snapshot_store = SnapshotStore(
+                self.output / "objects",
+                compression=self.config.debug.save_compression or None,
+                screenshot_deltas=self.config.debug.save_screenshot_deltas,
+            )
+
+        # Snapshots are saved in the background unless debug.save_workers is 0
+        self.snapshot_writer: SnapshotWriter = None
+        if self.config.debug.save and self.config.debug.save_workers > 0:
+            self.snapshot_writer = SnapshotWriter(
+                workers=self.config.debug.save_workers,
+                max_pending=self.config.debug.save_queue,
+                backpressure=self.config.debug.save_backpressure,
+            )
+
         # Setup starting points
         if isinstance(url, str):
             # Convert url type from str to Dict[str, str]
@@ -165,6 +186,11 @@ class Workflow:
         :return: The boolean output from the goal function.
         """
         self._populate_tabs_cache()
+        before = datetime.now()
+
+        # Report errors from saving snapshots of previous steps
+        if self.snapshot_writer:
+            self.snapshot_writer.raise_errors()
 
         # Perform required snapshotting
         self.loop_idx += 1
@@ -195,10 +221,17 @@ class Workflow:
                 self.tab(tab)
                 try:
                     if self.latest_view.snapshot:
-                        self.latest_view.snapshot.save(self.output_path)
+                        self._save_snapshot(self.latest_view.snapshot, self.output_path)
                 except IndexError:
                     pass
 
+        milliseconds_passed = (datetime.now() - before).total_seconds() * 1000
+        parse_milliseconds = sum(v.snapshot.parse_milliseconds for v in all_views.values() if v and v.snapshot)
+        logger.debug(
+            f"Step {self.loop_idx} took {milliseconds_passed:.2f}ms "
+            f"(of which {parse_milliseconds:.2f}ms parsing page sources)"
+        )
+
         # Stop iterating if goal returned True
         if goal_result:
             return True
@@ -457,10 +490,33 @@ class Workflow:
         return self.tab(view.name)
 
     def quit(self):
-        """Cleans up all windows. Call this after you are done! Do not use again after this."""
+        """
+        Cleans up all windows. Call this after you are done! Do not use again after this.
+        Waits for all snapshots to be saved, and raises a :class:`SnapshotSaveError` if any of them failed.
+        """
         self._has_quit = True
-        for window in self.windows:
-            window.quit()
+        try:
+            if self.snapshot_writer:
+                self.snapshot_writer.close()
+        finally:
+            for window in self.windows:
+                window.quit()
+
+    def flush_saves(self):
+        """Waits until all snapshots of previous steps have been saved to disk."""
+        if self.snapshot_writer:
+            self.snapshot_writer.flush()
+
+    def _save_snapshot(self, snapshot: PageSnapshot, path: Path):
+        kwargs = {
+            "file_format": self.config.debug.save_format,
+            "compression": self.config.debug.save_compression or None,
+            "store": self.snapshot_store,
+        }
+        if self.snapshot_writer:
+            self.snapshot_writer.submit(snapshot, path, **kwargs)
+        else:
+            snapshot.save(path, **kwargs)
 
     def frame(self, identifier: str) -> FrameSwitcher:
         """
@@ -572,7 +628,9 @@ class Workflow:
         binary_filter = isinstance(cls_result[0], PageElement) if cls_result else True
 
         if binary_filter:
-            cls_result = [(e, 1.0 if e in cls_result else 0.0) for e in subset]
+            # Elements for the same metadata are equal, without comparing their pages as == would
+            selected = {id(e.metadata) for e in cls_result}
+            cls_result = [(e, 1.0 if id(e.metadata) in selected else 0.0) for e in subset]
 
         cls_result.sort(key=lambda x: x[1], reverse=True)
 
@@ -584,8 +642,7 @@ class Workflow:
         cls_result = [(e, r, s) for (e, r), s in zip(cls_result, scaled_result)]
 
         for element, raw_score, score in cls_result:
-            element.raw_scores[cls_name] = raw_score
-            element.metadata[cls_name] = classifier.result_type(score)
+            element.set_score(cls_name, classifier.result_type(score), raw_score)
 
         if classifier.highlight:
             self._highlight_classifier_result(classifier, cls_name, cls_result, snapshot)
@@ -602,6 +659,8 @@ class Workflow:
         """
         assert self.config.scraping.history or self.loop_idx == -1, "Cannot reset if config.scraping.history is False!"
 
+        # Saved output of replayed steps is overwritten, so earlier writes must be done first
+        self.flush_saves()
         self.loop_idx = -1
         self.previous_policy_result = None
 
@@ -0,0 +1,129 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""
+Background writer persisting snapshots off the main loop thread.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, List, Set, Tuple
+
+from .error import SnapshotSaveError
+from .snapshot import PageSnapshot
+
+logger = logging.getLogger("wtl")
+
+BACKPRESSURE_POLICIES = ["block", "sync", "drop"]
+
+
+class SnapshotWriter:
+    """
+    Saves snapshots with :func:`PageSnapshot.save` on a pool of worker threads.
+
+    At most ``max_pending`` snapshots are queued or being written at any time. When the queue is full,
+    :func:`submit` applies the ``backpressure`` policy:
+
+    - "block": wait until a snapshot has been written.
+    - "sync": save the snapshot on the calling thread instead.
+    - "drop": do not save the snapshot at all, and log a warning.
+
+    Errors raised while saving are collected and raised as a :class:`SnapshotSaveError` by :func:`raise_errors`
+    (and :func:`close`), so that they surface on the calling thread.
+
+    Workers save a :func:`PageSnapshot.detached_copy` of each snapshot, so that the caller can keep using it.
+
+    .. note::
+        The page source is shared with the copy, and must not be modified until it is written.
+    """
+
+    def __init__(self, workers: int = 1, max_pending: int = 4, backpressure: str = "block"):
+        assert workers >= 1
+        assert max_pending >= 1
+        assert backpressure in BACKPRESSURE_POLICIES, f"Unknown backpressure policy '{backpressure}'"
+
+        self.backpressure = backpressure
+        self.dropped = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wtl-writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending: Set[Future] = set()
+        self._errors: List[Tuple[Path, Exception]] = []
+
+    def submit(self, snapshot: PageSnapshot, path: Path, **kwargs: Any) -> bool:
+        """
+        Queues a snapshot to be saved at the given path, with keyword arguments passed on to :func:`PageSnapshot.save`.
+        Returns False if the snapshot was dropped due to backpressure.
+        """
+        if not self._slots.acquire(blocking=self.backpressure == "block"):
+            if self.backpressure == "drop":
+                self.dropped += 1
+                logger.warning(f"Snapshot writer queue is full, not saving {path}")
+                return False
+            self._save(snapshot, path, kwargs)
+            return True
+
+        # The caller keeps using the snapshot, so the workers get a copy with its own lazily loaded parts
+        snapshot = snapshot.detached_copy()
+        with self._lock:
+            future = self._executor.submit(self._save, snapshot, path, kwargs)
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return True
+
+    def _save(self, snapshot: PageSnapshot, path: Path, kwargs: dict):
+        try:
+            snapshot.save(path, **kwargs)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.debug(f"Failed to save snapshot to {path}: {e}")
+            with self._lock:
+                self._errors.append((path, e))
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+        self._slots.release()
+
+    @property
+    def pending(self) -> int:
+        """Number of snapshots queued or being written."""
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Waits until all queued snapshots have been written."""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+
+    def raise_errors(self):
+        """Raises a :class:`SnapshotSaveError` if any snapshot failed to save since the last call."""
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            paths = ", ".join(str(path) for path, _ in errors)
+            raise SnapshotSaveError(f"Failed to save {len(errors)} snapshot(s) to {paths}") from errors[0][1]
+
+    def close(self):
+        """Writes all queued snapshots, stops the workers and raises any remaining errors."""
+        self.flush()
+        self._executor.shutdown(wait=True)
+        self.raise_errors()